@@ -1,38 +1,132 @@
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+import json
+import os
 import pickle
+import shutil
+import tempfile
+import threading
 
+# Блокування файлу між процесами (недоступне на Windows - там лише між потоками)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from hooks import MODEL_LOAD, MODEL_PREDICT, observe
+
+# Каталог реєстру версій моделі
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "app/model_registry")
+
+# Відповідність стовпців sensor_readings назвам ознак у навчальних даних
+FEATURE_MAPPING = {
+    "pm2_5": "PM2.5",
+    "pm10": "PM10",
+    "nitrogen_dioxide": "Nitrogen Dioxide",
+    "sulfur_dioxide": "Sulfur Dioxide",
+    "carbon_monoxide": "Carbon Monoxide",
+    "ozone": "Ozone",
+    "lead": "Lead",
+    "cadmium": "Cadmium",
+    "radiation_level": "Radiation"
+}
+
+
+# scikit-learn імпортується в методах моделі: модуль (ознаки, реєстр) завантажується
+# без нього, а бібліотека - під час першого створення чи завантаження моделі
 class PollutionPredictionModel:
-    def __init__(self):
-        self.model = RandomForestRegressor(n_estimators=100, random_state=42)
+    def __init__(self, n_estimators: int = 100, n_jobs: Optional[int] = None, incremental: bool = False):
+        """
+        incremental: замість випадкового лісу - лінійна модель SGDRegressor
+        зі стандартизацією ознак, що навчається частинами (partial_fit)
+        на даних, які не вміщуються в пам'ять
+        """
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.linear_model import SGDRegressor
+        from sklearn.pipeline import make_pipeline
+        from sklearn.preprocessing import StandardScaler
+
+        if incremental:
+            self.model = make_pipeline(StandardScaler(), SGDRegressor(random_state=42))
+        else:
+            self.model = RandomForestRegressor(n_estimators=n_estimators, random_state=42, n_jobs=n_jobs)
 
-    def train(self, X, y):
+    def train(self, X, y, progress=None, trees_per_step: int = 10):
         """
         Навчання моделі на основі вхідних даних.
         X: Вхідні дані (параметри забруднення)
         y: Цільові значення (рівень забруднення)
         """
+        from sklearn.model_selection import train_test_split
+
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        self.model.fit(X_train, y_train)
-        predictions = self.model.predict(X_test)
-        mse = mean_squared_error(y_test, predictions)
+        self.fit(X_train, y_train, progress, trees_per_step)
+        mse = self.evaluate(X_test, y_test)
         print(f"Mean Squared Error: {mse}")
+        return mse
+
+    def fit(self, X, y, progress=None, trees_per_step: int = 10):
+        """
+        Навчання на всіх переданих даних.
+        progress: функція, що отримує частку побудованих дерев (0..1);
+        якщо вказана, дерева додаються частинами по trees_per_step (warm_start),
+        а виняток з progress перериває навчання. Результат збігається з
+        навчанням за один виклик fit.
+        """
+        from sklearn.ensemble import RandomForestRegressor
+
+        if progress is None or not isinstance(self.model, RandomForestRegressor):
+            self.model.fit(X, y)
+            return
+
+        total = self.model.n_estimators
+        self.model.set_params(warm_start=True)
+        try:
+            for built in range(trees_per_step, total + trees_per_step, trees_per_step):
+                self.model.set_params(n_estimators=min(built, total))
+                self.model.fit(X, y)
+                progress(min(built, total) / total)
+        finally:
+            self.model.set_params(warm_start=False, n_estimators=total)
+
+    def partial_fit(self, X, y):
+        """
+        Донавчання інкрементної моделі на черговій частині даних
+        """
+        scaler, regressor = (step for _, step in self.model.steps)
+        scaler.partial_fit(X)
+        regressor.partial_fit(scaler.transform(X), y)
+
+    def evaluate(self, X, y) -> float:
+        """
+        Середньоквадратична похибка на відкладених даних
+        """
+        from sklearn.metrics import mean_squared_error
+
+        return mean_squared_error(y, self.model.predict(X))
 
     def predict(self, X):
         """
         Прогнозування рівня забруднення.
         X: Вхідні дані для прогнозу
         """
-        return self.model.predict(X)
+        with observe(MODEL_PREDICT, rows=len(X)):
+            return self.model.predict(X)
 
     def save_model(self, filepath):
         """
         Збереження моделі у файл.
         """
         with open(filepath, 'wb') as f:
-            pickle.dump(self.model, f)
+            self.dump(f)
+
+    def dump(self, f: BinaryIO):
+        """
+        Збереження моделі у відкритий файл.
+        """
+        pickle.dump(self.model, f)
 
     def load_model(self, filepath):
         """
@@ -40,3 +134,238 @@ class PollutionPredictionModel:
         """
         with open(filepath, 'rb') as f:
             self.model = pickle.load(f)
+
+
+class ModelRegistry:
+    """
+    Реєстр версій моделі з активною версією в пам'яті.
+
+    Кожна версія зберігається окремим файлом у каталозі directory, а маніфест
+    registry.json містить метадані версій (час навчання, MSE, ознаки) та назву
+    активної версії. Модель завантажується з диска лише тоді, коли змінюється
+    маніфест (перевірка mtime), тож зміна версії в іншому процесі підхоплюється
+    без перезапуску. Зміни маніфесту виконуються під блокуванням файлу
+    registry.lock (кілька робочих процесів), а сам маніфест перезаписується
+    атомарно (os.replace унікального тимчасового файлу).
+    """
+
+    MANIFEST = "registry.json"
+    LOCK = "registry.lock"
+
+    def __init__(self, directory: str, legacy_filepath: Optional[str] = None):
+        self.directory = directory
+        self.legacy_filepath = legacy_filepath
+        self.manifest_path = os.path.join(directory, self.MANIFEST)
+        self._lock = threading.Lock()
+        self._manifest_mtime = None
+        self._active = None  # (назва версії, модель, метадані)
+        self._loaded = False
+
+    def active(self) -> Tuple[PollutionPredictionModel, Dict[str, Any]]:
+        """
+        Активна модель та її метадані. LookupError, якщо жодної версії немає.
+        """
+        mtime = self._current_mtime()
+        active = self._active
+        if active is None or mtime != self._manifest_mtime:
+            with self._lock:
+                self._reload()
+                active = self._active
+        if active is None:
+            raise LookupError("Модель не знайдена. Спочатку навчіть модель.")
+        return active[1], active[2]
+
+    @property
+    def loaded(self) -> bool:
+        """
+        Маніфест прочитано, а активна версія (якщо є) завантажена в пам'ять
+        """
+        return self._loaded
+
+    def warm_up(self) -> Optional[str]:
+        """
+        Завантажує активну версію наперед. Повертає її назву (None, якщо версій немає).
+        """
+        try:
+            return self.active()[1]["name"]
+        except LookupError:
+            return None
+
+    def register(
+        self,
+        model: PollutionPredictionModel,
+        metadata: Dict[str, Any],
+        name: Optional[str] = None,
+        activate: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Зберігає нову версію моделі з метаданими та (за замовчуванням) робить її активною
+        """
+        with self._locked():
+            manifest = self._read_manifest()
+            versions = manifest["versions"]
+            if name is not None and name in versions:
+                raise ValueError(f"Версія {name} вже існує")
+
+            # Файл версії створюється з O_EXCL: наявний файл не перезаписується
+            while True:
+                if name is None:
+                    manifest["last_version"] += 1
+                    version = f"v{manifest['last_version']}"
+                else:
+                    version = name
+                filename = f"{version}.pkl"
+                path = os.path.join(self.directory, filename)
+                try:
+                    descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+                    break
+                except FileExistsError:
+                    # Файл версії, що не потрапила в маніфест (перерване збереження),
+                    # лишається; автоматична назва береться наступна
+                    if name is not None:
+                        raise ValueError(f"Файл версії {name} вже існує")
+            try:
+                with os.fdopen(descriptor, 'wb') as f:
+                    model.dump(f)
+            except BaseException:
+                os.remove(path)
+                raise
+
+            versions[version] = {
+                "name": version,
+                "file": filename,
+                "trained_at": datetime.now().isoformat(),
+                **metadata,
+            }
+            if activate:
+                self._set_active(manifest, version)
+            self._write_manifest(manifest)
+            if activate:
+                self._active = (version, model, versions[version])
+            return versions[version]
+
+    def versions(self) -> Dict[str, Any]:
+        with self._lock:
+            manifest = self._read_manifest()
+        return {
+            "active": manifest["active"],
+            "versions": list(manifest["versions"].values()),
+        }
+
+    def activate(self, name: str) -> Dict[str, Any]:
+        """
+        Робить активною вказану версію. Модель завантажується до зміни маніфесту,
+        тож у разі помилки активна версія не змінюється.
+        """
+        with self._locked():
+            return self._activate_locked(self._read_manifest(), name)
+
+    def rollback(self) -> Dict[str, Any]:
+        """
+        Повертає попередню активну версію
+        """
+        with self._locked():
+            manifest = self._read_manifest()
+            if not manifest["history"]:
+                raise KeyError("Немає попередньої версії для відкату")
+            return self._activate_locked(manifest, manifest["history"][-1])
+
+    def import_legacy(self) -> Optional[str]:
+        """
+        Модель, збережена до появи реєстру (legacy_filepath), стає версією legacy,
+        якщо маніфесту ще немає. Викликається під час старту додатку.
+        Повертає назву версії або None, якщо імпорт не потрібен.
+        """
+        if not self.legacy_filepath or not os.path.exists(self.legacy_filepath):
+            return None
+        with self._locked():
+            if os.path.exists(self.manifest_path):
+                return None
+            shutil.copyfile(self.legacy_filepath, os.path.join(self.directory, "legacy.pkl"))
+            manifest = self._read_manifest()
+            manifest["versions"]["legacy"] = {
+                "name": "legacy",
+                "file": "legacy.pkl",
+                "trained_at": datetime.fromtimestamp(os.path.getmtime(self.legacy_filepath)).isoformat(),
+            }
+            manifest["active"] = "legacy"
+            self._write_manifest(manifest)
+            return "legacy"
+
+    @contextmanager
+    def _locked(self):
+        # Зміни реєстру: блокування потоків процесу та файлу між процесами
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, self.LOCK), "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _activate_locked(self, manifest: Dict[str, Any], name: str) -> Dict[str, Any]:
+        if name not in manifest["versions"]:
+            raise KeyError(f"Версію {name} не знайдено")
+        metadata = manifest["versions"][name]
+        model = self._load_version(metadata)
+        self._set_active(manifest, name)
+        self._write_manifest(manifest)
+        self._active = (name, model, metadata)
+        return metadata
+
+    def _current_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _reload(self):
+        mtime = self._current_mtime()
+        manifest = self._read_manifest()
+        name = manifest["active"]
+        if name is None:
+            self._active = None
+        elif self._active is None or self._active[0] != name:
+            metadata = manifest["versions"][name]
+            self._active = (name, self._load_version(metadata), metadata)
+        self._manifest_mtime = mtime
+        self._loaded = True
+
+    def _load_version(self, metadata: Dict[str, Any]) -> PollutionPredictionModel:
+        model = PollutionPredictionModel()
+        with observe(MODEL_LOAD):
+            model.load_model(os.path.join(self.directory, metadata["file"]))
+        return model
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        return {"active": None, "revision": 0, "last_version": 0, "history": [], "versions": {}}
+
+    @staticmethod
+    def _set_active(manifest: Dict[str, Any], name: str):
+        # Історія активацій - стек: повернення до попередньої версії знімає її з вершини
+        history = manifest["history"]
+        if history and history[-1] == name:
+            history.pop()
+        elif manifest["active"] and manifest["active"] != name:
+            history.append(manifest["active"])
+        manifest["active"] = name
+
+    def _write_manifest(self, manifest: Dict[str, Any]):
+        # Викликається під блокуванням _locked
+        manifest["revision"] += 1
+        descriptor, temporary_path = tempfile.mkstemp(prefix=f"{self.MANIFEST}.", suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(descriptor, "w") as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+            os.replace(temporary_path, self.manifest_path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+        self._manifest_mtime = self._current_mtime()
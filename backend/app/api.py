@@ -1,22 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import Float, cast, func, insert, literal, select
 from datetime import datetime, timedelta
 from typing import List, Optional
-import pandas as pd
+import numpy as np
 import os
 
 from db import get_db
-from models import SensorData, Location
-from services import simulate_sensor_data_for_location
-from schemas import LocationCreate
-from fuzzy_logic import AdvancedAirQualityFuzzySystem
-from app.ai_model import PollutionPredictionModel
+from models import MEASUREMENT_FIELDS, PollutionPrediction, SensorData, Location
+from services import (
+    simulate_sensor_data_for_location,
+    delete_sensor_readings,
+    ingest_sensor_lines,
+    fuzzy_system,
+)
+from ingest import BULK_CHUNK_SIZE, IngestReport, RowParser, detect_format, iter_lines
+from streaming import streaming_response
+from response_cache import cached, response_cache
+from encoding import RESPONSE_LAYOUTS, encoded_response, to_columns
+from export import EXPORT_FORMATS, arrow_streaming_response, export_statement, parquet_file_response
+from pagination import MAX_PAGE_SIZE, keyset_query, keyset_result
+from rollups import summarize_readings
+from summary import SUMMARY_FIELDS, summarize_measurements
+from downsampling import DOWNSAMPLE_METHODS, MAX_DOWNSAMPLE_POINTS, downsample_columns, format_timestamps, load_columns
+from schemas import LocationCreate, PredictionBatchRequest, TrainingFromReadingsRequest
+from training import TrainingJobManager
+from features import TRAINING_TARGETS
+from fuzzy_logic import INPUT_FIELDS, UNAVAILABLE_DESCRIPTION
+from warmup import readiness
+from profiling import stage
+from app.ai_model import FEATURE_MAPPING, MODEL_REGISTRY_DIR, ModelRegistry, PollutionPredictionModel
 
 router = APIRouter()
-model = PollutionPredictionModel()
 MODEL_FILEPATH = "app/model.pkl"
 
+# Реєстр версій моделі: активна модель тримається в пам'яті
+# і перезавантажується лише після збереження або зміни версії
+model_registry = ModelRegistry(MODEL_REGISTRY_DIR, legacy_filepath=MODEL_FILEPATH)
+
+# Фонові завдання навчання. Дерева будуються в робочому процесі API, тому за
+# замовчуванням на одному ядрі; усі ядра (-1) - лише явно через TRAINING_N_JOBS або n_jobs
+TRAINING_N_JOBS = int(os.getenv("TRAINING_N_JOBS", "1"))
+training_jobs = TrainingJobManager(model_registry, max_workers=int(os.getenv("TRAINING_WORKERS", "1")))
+
+
+@router.get("/ready")
+def ready():
+    """
+    Готовність процесу обслуговувати запити: 503, доки система нечіткої логіки
+    та активна модель не завантажені (прогрів після старту або перше використання)
+    """
+    state = readiness(model_registry)
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
 
 @router.post("/locations/")
 def create_location(location: LocationCreate, db: Session = Depends(get_db)):
@@ -34,7 +72,9 @@ def read_locations(db: Session = Depends(get_db)):
 
 
 @router.get("/locations/pollution-summary/")
+@cached(lambda params: params["location_ids"])
 def get_location_pollution_summary(
+    request: Request,
     location_ids: List[int] = Query(None),
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
@@ -45,85 +85,158 @@ def get_location_pollution_summary(
     if not end_date:
         end_date = datetime.now()
 
-    query = (
-        db.query(
-            Location.id,
-            Location.name,
-            func.avg(SensorData.nitrogen_dioxide).label("avg_nitrogen_dioxide"),
-            func.avg(SensorData.sulfur_dioxide).label("avg_sulfur_dioxide"),
-            func.avg(SensorData.pm2_5).label("avg_pm2_5"),
-        )
-        .join(SensorData)
-        .filter(SensorData.timestamp.between(start_date, end_date))
-    )
+    # Середні значення зі зведених таблиць (вимірювання - лише для неповних годин на краях періоду)
+    summary = summarize_readings(db, start_date, end_date, location_ids)
+    names = dict(db.execute(_names_statement(summary)).all()) if summary else {}
+    return _pollution_summary(summary, names)
+
 
-    if location_ids:
-        query = query.filter(Location.id.in_(location_ids))
+def _names_statement(location_ids):
+    return select(Location.id, Location.name).where(Location.id.in_(list(location_ids)))
 
-    location_pollution = query.group_by(Location.id, Location.name).all()
 
+def _pollution_summary(summary: dict, names: dict) -> list:
     return [
         {
-            "location_id": loc[0],
-            "location_name": loc[1],
-            "avg_nitrogen_dioxide": round(loc[2], 2),
-            "avg_sulfur_dioxide": round(loc[3], 2),
-            "avg_pm2_5": round(loc[4], 2),
+            "location_id": location_id,
+            "location_name": names.get(location_id),
+            "avg_nitrogen_dioxide": _round_score(stats["mean"]["nitrogen_dioxide"]),
+            "avg_sulfur_dioxide": _round_score(stats["mean"]["sulfur_dioxide"]),
+            "avg_pm2_5": _round_score(stats["mean"]["pm2_5"]),
         }
-        for loc in location_pollution
+        for location_id, stats in sorted(summary.items())
+        if location_id in names
     ]
 
 
 @router.get("/sensor-data/")
 def get_sensor_data(
+    request: Request,
     location_id: Optional[int] = Query(None),
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
+    format: Optional[str] = Query(None, enum=['ndjson', 'csv']),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    layout: str = Query('rows', enum=list(RESPONSE_LAYOUTS)),
     db: Session = Depends(get_db),
 ):
+    """
+    Дані сенсорів за період. З параметром format=ndjson|csv відповідь
+    передається потоком без завантаження всієї вибірки в пам'ять.
+    З параметром limit повертається сторінка {"sensor_data", "next_cursor"};
+    наступна сторінка запитується з cursor=next_cursor.
+    З layout=columns повертається {"sensor_data": {стовпець: [значення]}}
+    (масив на кожен стовпець, час - "timestamps"), упорядкований за часом.
+    Відповідь кодується orjson або MessagePack (Accept: application/msgpack).
+    """
     if not start_date:
         start_date = datetime.now() - timedelta(days=365)
     if not end_date:
         end_date = datetime.now()
 
-    query = db.query(SensorData).join(Location)
-
+    filters = [SensorData.timestamp.between(start_date, end_date)]
     if location_id:
-        query = query.filter(SensorData.location_id == location_id)
+        filters.append(SensorData.location_id == location_id)
+
+    if format:
+        statement = (
+            select(*SensorData.__table__.columns, Location.name.label("location_name"))
+            .join(Location)
+            .where(*filters)
+            .order_by(SensorData.timestamp, SensorData.id)
+        )
+        return streaming_response(statement, format, "sensor_data")
+
+    statement = _sensor_data_statement(filters, layout, join_location=True)
+    if limit:
+        statement = _keyset_query(statement, limit, cursor)
+    elif layout == 'columns':
+        statement = statement.order_by(SensorData.timestamp, SensorData.id)
+    rows = _sensor_rows(db.execute(statement), layout)
+    return encoded_response(request, _sensor_data(rows, layout, limit))
+
+
+# Стовпці sensor_readings для відповідей у формі layout=columns
+SENSOR_COLUMNS = tuple(SensorData.__table__.columns)
+
+
+def _sensor_columns(rows) -> dict:
+    return to_columns(rows, [column.name for column in SENSOR_COLUMNS])
+
+
+def _sensor_data_statement(filters, layout: str, join_location: bool = False):
+    # layout=columns - кортежі стовпців, rows - ORM-об'єкти
+    if layout == 'columns':
+        return select(*SENSOR_COLUMNS).where(*filters)
+    statement = select(SensorData)
+    if join_location:
+        statement = statement.join(Location)
+    return statement.where(*filters)
 
-    query = query.filter(
-        SensorData.timestamp.between(start_date, end_date)
-    )
 
-    sensor_data = query.all()
+def _sensor_rows(result, layout: str) -> list:
+    return result.all() if layout == 'columns' else result.scalars().all()
+
+
+def _sensor_data(rows: list, layout: str, limit: Optional[int]):
+    """
+    Вміст відповіді /sensor-data/: сторінка {"sensor_data", "next_cursor"},
+    {"sensor_data": стовпці} або список рядків
+    """
+    next_cursor = None
+    if limit:
+        rows, next_cursor = keyset_result(rows, limit)
+    sensor_data = _sensor_columns(rows) if layout == 'columns' else rows
+    if limit:
+        return {"sensor_data": sensor_data, "next_cursor": next_cursor}
+    if layout == 'columns':
+        return {"sensor_data": sensor_data}
     return sensor_data
 
 
-@router.get("/locations/pollution-summary/")
-def get_location_pollution_summary(db: Session = Depends(get_db)):
-    location_pollution = (
-        db.query(
-            Location.id,
-            Location.name,
-            func.avg(SensorData.nitrogen_dioxide).label("avg_nitrogen_dioxide"),
-            func.avg(SensorData.sulfur_dioxide).label("avg_sulfur_dioxide"),
-            func.avg(SensorData.pm2_5).label("avg_pm2_5"),
+@router.post("/sensor-data/bulk")
+async def bulk_upload_sensor_data(
+    request: Request,
+    format: Optional[str] = Query(None, enum=['ndjson', 'csv']),
+    db: Session = Depends(get_db)
+):
+    """
+    Масове завантаження вимірювань потоковим тілом запиту.
+
+    Формат визначається параметром format або заголовком Content-Type
+    (application/x-ndjson - один JSON-об'єкт на рядок; text/csv - перший
+    рядок є заголовком з назвами полів SensorDataCreate).
+    Рядки перевіряються та записуються частинами по BULK_CHUNK_SIZE
+    (COPY для PostgreSQL, executemany для SQLite), кожна частина - окремою
+    транзакцією. Очікувана пропускна здатність на одному ядрі з урахуванням
+    розбору, перевірки та оцінки якості повітря: 10 000-15 000 рядків/с
+    на SQLite; на PostgreSQL запис через COPY не є вузьким місцем, і
+    швидкість обмежується перевіркою рядків (близько 20 000 рядків/с).
+
+    Повертає кількість прийнятих і відхилених рядків та перші помилки.
+    """
+    data_format = format or detect_format(request.headers.get("content-type"))
+    if data_format is None:
+        raise HTTPException(
+            status_code=415,
+            detail="Вкажіть format=ndjson|csv або Content-Type application/x-ndjson чи text/csv"
         )
-        .join(SensorData)
-        .group_by(Location.id, Location.name)
-        .all()
-    )
 
-    return [
-        {
-            "location_id": loc[0],
-            "location_name": loc[1],
-            "avg_nitrogen_dioxide": round(loc[2], 2),
-            "avg_sulfur_dioxide": round(loc[3], 2),
-            "avg_pm2_5": round(loc[4], 2),
-        }
-        for loc in location_pollution
-    ]
+    parser = RowParser(data_format)
+    report = IngestReport()
+    lines = []
+    async for line_number, line in iter_lines(request.stream()):
+        if not line.strip():
+            continue
+        lines.append((line_number, line))
+        if len(lines) >= BULK_CHUNK_SIZE:
+            await run_in_threadpool(ingest_sensor_lines, db, lines, parser, report)
+            lines = []
+    if lines:
+        await run_in_threadpool(ingest_sensor_lines, db, lines, parser, report)
+
+    return report.as_dict()
 
 
 @router.post("/simulate-data/")
@@ -131,6 +244,10 @@ def simulate_environmental_data(
     location_id: int,
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
+    cadence: str = Query('day', enum=['minute', 'hour', 'day']),
+    seed: Optional[int] = Query(None),
+    diurnal: bool = Query(False),
+    seasonal: bool = Query(False),
     db: Session = Depends(get_db)
 ):
     # Встановлення діапазону дат, якщо не вказано
@@ -142,14 +259,11 @@ def simulate_environmental_data(
 
     try:
         # Видаляємо попередні дані для цієї локації в заданому діапазоні
-        db.query(SensorData).filter(
-            SensorData.location_id == location_id,
-            SensorData.timestamp.between(start_date, end_date)
-        ).delete()
+        delete_sensor_readings(db, location_id, start_date, end_date)
 
         # Симуляція даних
         generated_records = simulate_sensor_data_for_location(
-            db, location_id, start_date, end_date
+            db, location_id, start_date, end_date, cadence, seed, diurnal, seasonal
         )
 
         return {
@@ -166,11 +280,27 @@ def simulate_environmental_data(
 # Додатковий ендпоінт для отримання даних з певної локації за період
 @router.get("/sensor-data/location/{location_id}")
 def get_sensor_data_for_location(
+    request: Request,
     location_id: int,
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
+    format: Optional[str] = Query(None, enum=['ndjson', 'csv']),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    max_points: Optional[int] = Query(None, ge=3, le=MAX_DOWNSAMPLE_POINTS),
+    downsample: str = Query('lttb', enum=list(DOWNSAMPLE_METHODS)),
+    fields: List[str] = Query(None),
+    layout: str = Query('rows', enum=list(RESPONSE_LAYOUTS)),
     db: Session = Depends(get_db)
 ):
+    """
+    Дані локації за період. З параметром max_points кожен ряд показника
+    (fields, усі показники, якщо не вказано) проріджується на сервері до
+    не більше ніж max_points точок методом downsample: lttb
+    (Largest-Triangle-Three-Buckets) або minmax (мінімум і максимум кожного
+    кошика); відповідь містить "series" замість "sensor_data".
+    З layout=columns "sensor_data" - масив на кожен стовпець (час - "timestamps").
+    """
     # Встановлення діапазону дат, якщо не вказано
     if not start_date:
         start_date = datetime.now() - timedelta(days=30)
@@ -178,35 +308,131 @@ def get_sensor_data_for_location(
     if not end_date:
         end_date = datetime.now()
 
-    # Отримання даних для локації за період
-    sensor_data = (
-        db.query(SensorData)
-        .filter(
-            SensorData.location_id == location_id,
-            SensorData.timestamp.between(start_date, end_date)
+    filters = (
+        SensorData.location_id == location_id,
+        SensorData.timestamp.between(start_date, end_date)
+    )
+
+    # Потокова передача без завантаження всієї вибірки в пам'ять
+    if format:
+        statement = (
+            select(*SensorData.__table__.columns)
+            .where(*filters)
+            .order_by(SensorData.timestamp, SensorData.id)
         )
+        return streaming_response(statement, format, f"sensor_data_location_{location_id}")
+
+    # Проріджені ряди для графіків: розмір відповіді не залежить від довжини періоду
+    if max_points:
+        fields = _downsample_fields(fields)
+        columns = load_columns(db, _downsample_statement(fields, filters))
+        return encoded_response(request, _downsampled_series(
+            location_id, start_date, end_date, columns, fields, max_points, downsample
+        ))
+
+    # Отримання даних для локації за період (посторінково, якщо вказано limit)
+    statement = _location_data_statement(filters, layout, limit, cursor)
+    rows = _sensor_rows(db.execute(statement), layout)
+    return encoded_response(request, _location_data(location_id, start_date, end_date, rows, layout, limit))
+
+
+def _downsample_fields(fields: Optional[List[str]]) -> List[str]:
+    fields = fields or list(MEASUREMENT_FIELDS)
+    unknown = [field for field in fields if field not in MEASUREMENT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Невідомі показники: {', '.join(unknown)}")
+    return fields
+
+
+def _downsample_statement(fields: List[str], filters):
+    return (
+        select(SensorData.timestamp, *[getattr(SensorData, field) for field in fields])
+        .where(*filters)
         .order_by(SensorData.timestamp)
-        .all()
     )
 
+
+def _downsampled_series(location_id, start_date, end_date, columns, fields, max_points, downsample) -> dict:
     return {
         "location_id": location_id,
         "start_date": start_date,
         "end_date": end_date,
-        "sensor_data": sensor_data
+        "total_points": len(columns['timestamp']),
+        "downsample": downsample,
+        "series": downsample_columns(columns, fields, max_points, downsample),
+    }
+
+
+def _location_data_statement(filters, layout: str, limit: Optional[int], cursor: Optional[str]):
+    statement = _sensor_data_statement(filters, layout)
+    if limit:
+        return _keyset_query(statement, limit, cursor)
+    return statement.order_by(SensorData.timestamp)
+
+
+def _location_data(location_id, start_date, end_date, rows: list, layout: str, limit: Optional[int]) -> dict:
+    next_cursor = None
+    if limit:
+        rows, next_cursor = keyset_result(rows, limit)
+    response = {
+        "location_id": location_id,
+        "start_date": start_date,
+        "end_date": end_date,
+        "sensor_data": _sensor_columns(rows) if layout == 'columns' else rows
     }
+    if limit:
+        response["next_cursor"] = next_cursor
+    return response
 
 
-# Створюємо глобальний екземпляр системи нечіткої логіки
-fuzzy_system = AdvancedAirQualityFuzzySystem()
+@router.get("/sensor-data/export")
+def export_sensor_data(
+    location_ids: List[int] = Query(None),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    format: str = Query('parquet', enum=list(EXPORT_FORMATS)),
+):
+    """
+    Експорт вимірювань для аналізу: format=parquet - файл Parquet (стиснення zstd),
+    format=arrow - потік Arrow IPC. Вимірювання читаються частинами та
+    перетворюються на стовпці без створення об'єкта для кожного рядка.
+    Без start_date / end_date період не обмежується.
+    """
+    statement = export_statement(location_ids, start_date, end_date)
+    try:
+        if format == 'arrow':
+            return arrow_streaming_response(statement, "sensor_data")
+        return parquet_file_response(statement, "sensor_data")
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+
+def _keyset_query(statement, limit: int, cursor: Optional[str]):
+    try:
+        return keyset_query(statement, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/air-quality/cache-stats")
+def get_air_quality_cache_stats():
+    """
+    Статистика кешу оцінок якості повітря (влучання, промахи, витіснення) та пулу систем,
+    а також кешу відповідей
+    """
+    return {**fuzzy_system.cache_stats(), "response_cache": response_cache.stats()}
 
 
 @router.get("/air-quality/location/{location_id}")
+@cached(lambda params: [params["location_id"]])
 def get_air_quality_for_location(
+    request: Request,
     location_id: int,
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     aggregation_method: Optional[str] = Query('average', enum=['average', 'worst', 'best']),
+    summary_only: bool = Query(False),
+    layout: str = Query('rows', enum=list(RESPONSE_LAYOUTS)),
     db: Session = Depends(get_db)
 ):
     """
@@ -217,6 +443,9 @@ def get_air_quality_for_location(
     - start_date: Початкова дата (опціонально)
     - end_date: Кінцева дата (опціонально)
     - aggregation_method: Метод агрегації (середнє, найгірше, найкраще значення)
+    - summary_only: Без результатів для кожного вимірювання (detailed_results)
+    - layout: columns - detailed_results масивами за стовпцями (timestamps, score,
+      description та показники; score - null, якщо оцінку не обчислено)
     """
     # Встановлення діапазону дат, якщо не вказано
     if not start_date:
@@ -225,126 +454,328 @@ def get_air_quality_for_location(
     if not end_date:
         end_date = datetime.now()
 
-    # Отримання даних сенсорів для локації
-    sensor_data = (
-        db.query(SensorData)
-        .filter(
-            SensorData.location_id == location_id,
-            SensorData.timestamp.between(start_date, end_date)
-        )
-        .order_by(SensorData.timestamp)
-        .all()
+    filters = (
+        SensorData.location_id == location_id,
+        SensorData.timestamp.between(start_date, end_date)
     )
+    score = _stored_score(db)
+
+    # Агрегація збережених оцінок у SQL
+    with stage("orm"):
+        stats = db.execute(_score_stats_statement(score, filters)).one()
+    if not stats.total_readings:
+        return _no_data(location_id)
+
+    # Вимірювання, найближче до середньої, найгіршої або найкращої оцінки
+    representative = None
+    if stats.scored_readings:
+        with stage("orm"):
+            representative = db.execute(_representative_statement(score, filters, stats, aggregation_method)).first()
+    response = _air_quality_summary(location_id, start_date, end_date, aggregation_method, stats, representative)
+    if summary_only:
+        return encoded_response(request, response)
+
+    # Результати для кожного вимірювання зі збережених оцінок
+    with stage("orm"):
+        rows = db.execute(_detailed_statement(score, filters, layout)).all()
+    response["detailed_results"] = _detailed_results(rows, layout)
+    return encoded_response(request, response)
+
+
+def _no_data(location_id: int) -> dict:
+    return {
+        "message": "Немає даних для аналізу",
+        "location_id": location_id
+    }
 
-    if not sensor_data:
-        return {
-            "message": "Немає даних для аналізу",
-            "location_id": location_id
-        }
 
-    # Підготовка результатів нечіткої логіки
-    fuzzy_results = []
-    for data in sensor_data:
-        # Перетворення даних моделі в словник
-        data_dict = {
-            'pm2_5': data.pm2_5,
-            'pm10': data.pm10,
-            'nitrogen_dioxide': data.nitrogen_dioxide,
-            'sulfur_dioxide': data.sulfur_dioxide,
-            'carbon_monoxide': data.carbon_monoxide,
-            'ozone': data.ozone,
-            'lead': data.lead,
-            'cadmium': data.cadmium,
-            'radiation_level': data.radiation_level
-        }
-        fuzzy_result = fuzzy_system.evaluate_air_quality(data_dict)
-        fuzzy_results.append({
-            'timestamp': data.timestamp,
-            'air_quality_result': fuzzy_result
-        })
-
-    # Агрегація результатів
-    if aggregation_method == 'worst':
-        aggregated_result = max(fuzzy_results, key=lambda x: x['air_quality_result']['score'])
-    elif aggregation_method == 'best':
-        aggregated_result = min(fuzzy_results, key=lambda x: x['air_quality_result']['score'])
-    else:  # average
-        print(fuzzy_results)
-        total_score = sum(result['air_quality_result']['score'] for result in fuzzy_results)
-        avg_score = total_score / len(fuzzy_results)
-
-        # Знаходимо результат, найближчий до середнього значення
-        aggregated_result = min(fuzzy_results, key=lambda x: abs(x['air_quality_result']['score'] - avg_score))
+def _reading_columns(score):
+    return (
+        SensorData.timestamp,
+        score,
+        *[getattr(SensorData, field) for field in INPUT_FIELDS]
+    )
+
+
+def _score_stats_statement(score, filters):
+    return select(
+        func.count(SensorData.id).label("total_readings"),
+        func.count(score).label("scored_readings"),
+        (func.count(SensorData.id) - func.count(score)).label("unscored_readings"),
+        func.avg(score).label("average"),
+        func.max(score).label("worst"),
+        func.min(score).label("best"),
+    ).where(*filters)
+
+
+def _representative_statement(score, filters, stats, aggregation_method: str):
+    target_score = {'worst': stats.worst, 'best': stats.best}.get(aggregation_method, stats.average)
+    return (
+        select(*_reading_columns(score))
+        .where(*filters, score.isnot(None))
+        .order_by(func.abs(score - target_score), SensorData.timestamp)
+        .limit(1)
+    )
 
+
+def _detailed_statement(score, filters, layout: str):
+    columns = _reading_columns(score)
+    if layout == 'columns':
+        columns = (*columns, SensorData.air_quality_category)
+    return select(*columns).where(*filters).order_by(SensorData.timestamp)
+
+
+def _air_quality_summary(location_id, start_date, end_date, aggregation_method, stats, representative) -> dict:
+    with stage("fuzzy"):
+        if representative is not None:
+            air_quality = _describe_reading(representative)
+        else:
+            air_quality = fuzzy_system.describe_air_quality(None, {})
     return {
         "location_id": location_id,
         "start_date": start_date,
         "end_date": end_date,
-        "total_readings": len(sensor_data),
+        "total_readings": stats.total_readings,
+        "unscored_readings": stats.unscored_readings,
         "aggregation_method": aggregation_method,
-        "air_quality": aggregated_result['air_quality_result'],
-        "detailed_results": fuzzy_results
+        "score_statistics": {
+            "average": _round_score(stats.average),
+            "worst": _round_score(stats.worst),
+            "best": _round_score(stats.best),
+        },
+        "air_quality": air_quality,
+    }
+
+
+def _detailed_results(rows: list, layout: str):
+    with stage("fuzzy"):
+        if layout == 'columns':
+            return _describe_columns(rows)
+        return [
+            {
+                'timestamp': row.timestamp,
+                'air_quality_result': _describe_reading(row)
+            }
+            for row in rows
+        ]
+
+
+def _describe_reading(row):
+    data_dict = {field: getattr(row, field) for field in INPUT_FIELDS}
+    return fuzzy_system.describe_air_quality(row.air_quality_score, data_dict)
+
+
+def _describe_columns(rows) -> dict:
+    columns = to_columns(rows, ['timestamp', 'air_quality_score', *INPUT_FIELDS, 'air_quality_category'])
+    scores = columns.pop('air_quality_score')
+    categories = columns.pop('air_quality_category')
+    return {
+        "timestamps": columns.pop('timestamps'),
+        "score": [_round_score(score) for score in scores],
+        "description": [
+            category if score is not None and category is not None else UNAVAILABLE_DESCRIPTION
+            for score, category in zip(scores, categories)
+        ],
+        **columns,
     }
 
 
+def _stored_score(db: Session):
+    """
+    Збережена оцінка для агрегації. PostgreSQL зберігає NaN як звичайне значення,
+    тому NaN прирівнюється до NULL: кількість оцінених вимірювань та
+    average/worst/best рахуються по одній множині вимірювань.
+    """
+    score = SensorData.air_quality_score
+    if db.bind.dialect.name == 'postgresql':
+        return func.nullif(score, cast(literal('NaN'), Float)).label('air_quality_score')
+    return score
+
+
+def _round_score(value):
+    return round(value, 2) if value is not None else None
+
+
 @router.get("/air-quality/comparative-analysis")
+@cached(lambda params: params["location_ids"])
 def comparative_air_quality_analysis(
+    request: Request,
     location_ids: List[int] = Query(..., description="List of location IDs"),
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
+    include_stats: bool = Query(False),
     db: Session = Depends(get_db)
 ):
     """
-    Порівняльний аналіз якості повітря для декількох локацій
+    Порівняльний аналіз якості повітря для декількох локацій.
+
+    Усі локації обробляються разом: статистика збережених оцінок - одним
+    згрупованим запитом, вимірювання, найближчі до середньої оцінки кожної
+    локації, - одним запитом з віконною функцією. З include_stats=true
+    для кожної локації додається статистика оцінок.
     """
-    results = []
+    if not start_date:
+        start_date = datetime.now() - timedelta(days=30)
+    if not end_date:
+        end_date = datetime.now()
 
-    for location_id in location_ids:
-        location_result = get_air_quality_for_location(
-            location_id,
-            start_date,
-            end_date,
-            'average',
-            db
+    filters = (
+        SensorData.location_id.in_(location_ids),
+        SensorData.timestamp.between(start_date, end_date)
+    )
+    score = _stored_score(db)
+
+    stats, representatives = _comparative_statements(score, filters)
+    representatives = {row.location_id: row for row in db.execute(representatives)}
+    return _comparative_analysis(location_ids, db.execute(select(stats)).all(), representatives, include_stats)
+
+
+def _comparative_statements(score, filters):
+    """
+    Підзапит статистики оцінок за локаціями та запит вимірювань, найближчих
+    до середньої оцінки кожної локації
+    """
+    stats = (
+        select(
+            SensorData.location_id,
+            func.count(SensorData.id).label("total_readings"),
+            (func.count(SensorData.id) - func.count(score)).label("unscored_readings"),
+            func.avg(score).label("average"),
+            func.max(score).label("worst"),
+            func.min(score).label("best"),
         )
+        .where(*filters)
+        .group_by(SensorData.location_id)
+        .subquery()
+    )
+
+    # Для кожної локації - вимірювання з оцінкою, найближчою до середньої
+    ranked = (
+        select(
+            SensorData.location_id,
+            SensorData.timestamp,
+            score,
+            *[getattr(SensorData, field) for field in INPUT_FIELDS],
+            func.row_number().over(
+                partition_by=SensorData.location_id,
+                order_by=(func.abs(score - stats.c.average), SensorData.timestamp)
+            ).label("position")
+        )
+        .join(stats, stats.c.location_id == SensorData.location_id)
+        .where(*filters, score.isnot(None))
+        .subquery()
+    )
+    return stats, select(ranked).where(ranked.c.position == 1)
 
-        results.append({
-            'location_id': location_id,
-            'air_quality': location_result['air_quality']
-        })
+
+def _comparative_analysis(location_ids: List[int], stats_rows: list, representatives: dict, include_stats: bool) -> dict:
+    results = []
+    for row in stats_rows:
+        representative = representatives.get(row.location_id)
+        result = {
+            'location_id': row.location_id,
+            'air_quality': (
+                _describe_reading(representative) if representative is not None
+                else fuzzy_system.describe_air_quality(None, {})
+            )
+        }
+        if include_stats:
+            result['statistics'] = {
+                "total_readings": row.total_readings,
+                "unscored_readings": row.unscored_readings,
+                "average": _round_score(row.average),
+                "worst": _round_score(row.worst),
+                "best": _round_score(row.best),
+            }
+        results.append(result)
+
+    if not results:
+        raise HTTPException(status_code=404, detail="Немає даних для аналізу")
 
     # Сортування локацій за якістю повітря
-    results_sorted = sorted(results, key=lambda x: x['air_quality']['score'])
+    results_sorted = sorted(results, key=lambda x: (x['air_quality']['score'], x['location_id']))
+    analysed = {result['location_id'] for result in results}
 
     return {
         "comparative_analysis": results_sorted,
         "best_location": results_sorted[0],
-        "worst_location": results_sorted[-1]
+        "worst_location": results_sorted[-1],
+        "locations_without_data": [location_id for location_id in location_ids if location_id not in analysed]
     }
 
 
-@router.post("/train-model/")
-def train_model(file: UploadFile = File(...)):
+@router.post("/train-model/", status_code=202)
+def train_model(
+    file: UploadFile = File(...),
+    n_estimators: int = Query(100, ge=1, le=1000),
+    n_jobs: Optional[int] = Query(None, description="Кількість ядер для побудови дерев (-1 - усі)"),
+):
     """
-    Навчання моделі на основі завантаженого CSV-файлу.
+    Запуск фонового навчання моделі на основі завантаженого CSV-файлу.
+    Повертає ідентифікатор завдання; статус і прогрес - GET /train-model/jobs/{job_id}.
     """
-    try:
-        # Завантаження даних
-        df = pd.read_csv(file.file)
+    # Перевірка заголовка без читання всього файлу
+    header = file.file.readline().decode("utf-8-sig").strip().split(",")
+    file.file.seek(0)
+    if "Target" not in header:
+        raise HTTPException(status_code=400, detail="Стовпець 'target' відсутній у файлі.")
+
+    job = training_jobs.submit(
+        file.file,
+        target="Target",
+        n_estimators=n_estimators,
+        n_jobs=n_jobs if n_jobs is not None else TRAINING_N_JOBS,
+    )
+    return job.as_dict()
 
-        # Перевірка наявності стовпця "target"
-        if "Target" not in df.columns:
-            raise HTTPException(status_code=400, detail="Стовпець 'target' відсутній у файлі.")
 
-        X = df.drop(columns=["Target"])  # Замініть "target" на назву цільового стовпця
-        y = df["Target"]
+@router.post("/train-model/from-readings", status_code=202)
+def train_model_from_readings(request: TrainingFromReadingsRequest):
+    """
+    Запуск фонового навчання на вимірюваннях з sensor_readings (читаються частинами).
+    Ціль - збережена оцінка нечіткої логіки (air_quality_score) або PM2.5
+    через годину (pm2_5_next_hour); incremental=true - модель, що донавчається
+    частинами, для історії, яка не вміщується в пам'ять.
+    """
+    if request.target not in TRAINING_TARGETS:
+        raise HTTPException(status_code=400, detail=f"Ціль має бути однією з: {', '.join(TRAINING_TARGETS)}")
+
+    job = training_jobs.submit_readings(
+        target=request.target,
+        location_ids=request.location_ids,
+        start_date=request.start_date,
+        end_date=request.end_date,
+        incremental=request.incremental,
+        n_estimators=request.n_estimators,
+        n_jobs=request.n_jobs if request.n_jobs is not None else TRAINING_N_JOBS,
+        sample_limit=request.sample_limit,
+    )
+    return job.as_dict()
+
+
+@router.get("/train-model/jobs")
+def list_training_jobs():
+    return [job.as_dict() for job in training_jobs.list()]
+
+
+@router.get("/train-model/jobs/{job_id}")
+def get_training_job(job_id: str):
+    """
+    Статус, етап і прогрес (0..1) завдання навчання; після завершення - метадані версії моделі
+    """
+    job = training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Завдання не знайдено")
+    return job.as_dict()
+
+
+@router.post("/train-model/jobs/{job_id}/cancel")
+def cancel_training_job(job_id: str):
+    job = training_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Завдання не знайдено")
+    return job.as_dict()
 
-        # Навчання моделі
-        model.train(X, y)
-        model.save_model(MODEL_FILEPATH)
-        return {"message": "Модель успішно навчена та збережена."}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/predict/")
 def predict(data: dict):
@@ -352,70 +783,183 @@ def predict(data: dict):
     Прогнозування рівня забруднення на основі вхідних даних.
     """
     try:
-        if not os.path.exists(MODEL_FILEPATH):
-            raise HTTPException(status_code=400, detail="Модель не знайдена. Спочатку навчіть модель.")
-
-        model.load_model(MODEL_FILEPATH)
+        model, metadata = model_registry.active()
 
         # Перетворення назв ознак для відповідності моделі
-        feature_mapping = {
-            "pm2_5": "PM2.5",
-            "pm10": "PM10",
-            "nitrogen_dioxide": "Nitrogen Dioxide",
-            "sulfur_dioxide": "Sulfur Dioxide",
-            "carbon_monoxide": "Carbon Monoxide",
-            "ozone": "Ozone",
-            "lead": "Lead",
-            "cadmium": "Cadmium",
-            "radiation_level": "Radiation"
-        }
-        transformed_data = {feature_mapping[key]: value for key, value in data.items()}
+        transformed_data = {FEATURE_MAPPING[key]: value for key, value in data.items()}
+
+        import pandas as pd
 
         X = pd.DataFrame([transformed_data])
+        if metadata.get("features"):
+            X = X[metadata["features"]]
         prediction = model.predict(X)
-        return {"prediction": prediction.tolist()}
+        return {"prediction": prediction.tolist(), "model_version": metadata["name"]}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+
+@router.post("/predict/batch")
+def predict_batch(request: PredictionBatchRequest, db: Session = Depends(get_db)):
+    """
+    Пакетне прогнозування одним викликом моделі.
+
+    Ознаки беруться з rows (список словників з назвами стовпців sensor_readings)
+    або з вимірювань локації location_id за період (за замовчуванням 30 днів).
+    Для вимірювань локації з store=true прогнози зберігаються в
+    pollution_predictions (попередні прогнози тієї ж версії моделі замінюються).
+    Рядки з відсутніми ознаками отримують прогноз null.
+    """
+    try:
+        model, metadata = model_registry.active()
+    except LookupError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Відповідність ознак моделі стовпцям sensor_readings - один раз на пакет
+    features = metadata.get("features") or list(FEATURE_MAPPING.values())
+    columns_by_feature = {feature: field for field, feature in FEATURE_MAPPING.items()}
+    unknown = [feature for feature in features if feature not in columns_by_feature]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Ознаки моделі без відповідного стовпця: {', '.join(unknown)}")
+    fields = [columns_by_feature[feature] for feature in features]
+
+    if request.rows is not None:
+        try:
+            matrix = np.array([[row[field] for field in fields] for row in request.rows], dtype=float)
+        except KeyError as e:
+            raise HTTPException(status_code=400, detail=f"Відсутня ознака: {e.args[0]}")
+        predictions = _predict_matrix(model, features, matrix.reshape(-1, len(fields)))
+        return {
+            "model_version": metadata["name"],
+            "count": len(predictions),
+            "predictions": predictions,
+        }
+
+    if request.location_id is None:
+        raise HTTPException(status_code=400, detail="Вкажіть rows або location_id")
+
+    start_date = request.start_date or datetime.now() - timedelta(days=30)
+    end_date = request.end_date or datetime.now()
+    columns = load_columns(
+        db,
+        select(SensorData.id, SensorData.timestamp, *[getattr(SensorData, field) for field in fields])
+        .where(SensorData.location_id == request.location_id, SensorData.timestamp.between(start_date, end_date))
+        .order_by(SensorData.timestamp)
+    )
+    reading_ids = columns['id'].astype(np.int64).tolist()
+    matrix = np.column_stack([columns[field] for field in fields]) if reading_ids else np.empty((0, len(fields)))
+    predictions = _predict_matrix(model, features, matrix)
+
+    stored = 0
+    if request.store and reading_ids:
+        rows = [
+            {"sensor_reading_id": reading_id, "model_version": metadata["name"], "predicted_value": prediction}
+            for reading_id, prediction in zip(reading_ids, predictions)
+            if prediction is not None
+        ]
+        db.query(PollutionPrediction).filter(
+            PollutionPrediction.model_version == metadata["name"],
+            PollutionPrediction.sensor_reading_id.in_(
+                db.query(SensorData.id).filter(
+                    SensorData.location_id == request.location_id,
+                    SensorData.timestamp.between(start_date, end_date)
+                )
+            )
+        ).delete(synchronize_session=False)
+        if rows:
+            db.execute(insert(PollutionPrediction.__table__), rows)
+        db.commit()
+        stored = len(rows)
+
+    return {
+        "location_id": request.location_id,
+        "start_date": start_date,
+        "end_date": end_date,
+        "model_version": metadata["name"],
+        "count": len(predictions),
+        "stored": stored,
+        "reading_ids": reading_ids,
+        "timestamps": format_timestamps(columns['timestamp']),
+        "predictions": predictions,
+    }
+
+
+def _predict_matrix(model: PollutionPredictionModel, features: List[str], matrix: np.ndarray) -> List[Optional[float]]:
+    # Один виклик моделі для всіх рядків без пропущених значень
+    import pandas as pd
+
+    predictions = np.full(len(matrix), np.nan)
+    complete = ~np.isnan(matrix).any(axis=1)
+    if complete.any():
+        predictions[complete] = model.predict(pd.DataFrame(matrix[complete], columns=features))
+    return [None if np.isnan(value) else value for value in predictions.tolist()]
+
+
+@router.get("/models/")
+def list_model_versions():
+    """
+    Версії моделі з метаданими (час навчання, MSE, ознаки) та активна версія
+    """
+    return model_registry.versions()
+
+
+@router.post("/models/{name}/activate")
+def activate_model_version(name: str):
+    """
+    Робить активною вказану версію моделі
+    """
+    try:
+        return model_registry.activate(name)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+
+@router.post("/models/rollback")
+def rollback_model_version():
+    """
+    Повертає попередню активну версію моделі
+    """
+    try:
+        return model_registry.rollback()
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
 @router.get("/locations/pollution-summary-extended/")
 def get_location_pollution_summary_extended(
     location_ids: List[int] = Query(None),
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
+    fields: List[str] = Query(None, description=f"Показники: {', '.join(SUMMARY_FIELDS)} (усі, якщо не вказано)"),
     db: Session = Depends(get_db)
 ):
     """
-    Розширений підсумок забруднення для локацій.
+    Розширений підсумок забруднення для локацій: кількість, середнє, мінімум,
+    максимум, стандартне відхилення та процентилі p50/p95/p99 для вибраних
+    показників, обчислені за один згрупований прохід.
     """
     if not start_date:
         start_date = datetime.now() - timedelta(days=365)
     if not end_date:
         end_date = datetime.now()
 
-    query = (
-        db.query(
-            Location.id,
-            Location.name,
-            func.avg(SensorData.nitrogen_dioxide).label("avg_nitrogen_dioxide"),
-            func.avg(SensorData.sulfur_dioxide).label("avg_sulfur_dioxide"),
-            func.avg(SensorData.pm2_5).label("avg_pm2_5"),
-        )
-        .join(SensorData)
-        .filter(SensorData.timestamp.between(start_date, end_date))
-    )
-
-    if location_ids:
-        query = query.filter(Location.id.in_(location_ids))
+    try:
+        summary = summarize_measurements(db, start_date, end_date, fields, location_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    names = dict(db.execute(_names_statement(summary)).all()) if summary else {}
+    return _extended_summary(summary, names, start_date, end_date)
 
-    location_pollution = query.group_by(Location.id, Location.name).all()
 
+def _extended_summary(summary: dict, names: dict, start_date: datetime, end_date: datetime) -> list:
     return [
         {
-            "location_id": loc[0],
-            "location_name": loc[1],
-            "avg_nitrogen_dioxide": round(loc[2], 2),
-            "avg_sulfur_dioxide": round(loc[3], 2),
-            "avg_pm2_5": round(loc[4], 2),
+            "location_id": location_id,
+            "location_name": names.get(location_id),
+            "start_date": start_date,
+            "end_date": end_date,
+            "total_readings": stats["count"],
+            "statistics": stats["fields"],
         }
-        for loc in location_pollution
+        for location_id, stats in sorted(summary.items())
+        if location_id in names
     ]
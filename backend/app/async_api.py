@@ -0,0 +1,222 @@
+"""
+Асинхронні версії ендпоінтів читання (ASYNC_DB). Запити до бази даних
+виконуються через AsyncSession (await session.execute), тож очікування
+бази не займає ні потік пулу Starlette, ні цикл подій. Робота з CPU -
+зведення статистики, проріджування, оцінка нечіткою логікою, кодування
+відповіді - виконується в пулі потоків (run_in_threadpool), щоб повільний
+запит не блокував інші запити циклу подій.
+
+Запити та вміст відповідей будуються тими самими функціями, що й у
+синхронних ендпоінтах api.py, параметри маршрутів збігаються із синхронними.
+"""
+import inspect
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import Response
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+import api
+from db import get_async_db
+from downsampling import columns_from_result
+from encoding import JSON_MEDIA_TYPE, encode_json, encoded_response
+from models import Location, SensorData
+from response_cache import cached
+from rollups import combine_summary, summary_statements
+from streaming import streaming_response
+from summary import summary_query
+
+
+# Синхронний ендпоінт -> асинхронна версія
+ASYNC_READ_ENDPOINTS = {}
+
+
+def _replaces(endpoint):
+    """
+    Реєструє асинхронну версію синхронного ендпоінту з тими самими
+    параметрами; сесія бази даних - AsyncSession з get_async_db
+    """
+    signature = inspect.signature(endpoint)
+
+    def decorator(route):
+        route.__signature__ = signature.replace(parameters=[
+            parameter.replace(default=Depends(get_async_db)) if name == 'db' else parameter
+            for name, parameter in signature.parameters.items()
+        ])
+        ASYNC_READ_ENDPOINTS[endpoint] = route
+        return route
+    return decorator
+
+
+@_replaces(api.read_locations)
+async def read_locations(db):
+    locations = (await db.execute(select(Location))).scalars().all()
+    return Response(await run_in_threadpool(encode_json, locations), media_type=JSON_MEDIA_TYPE)
+
+
+@_replaces(api.get_location_pollution_summary)
+@cached(lambda params: params["location_ids"])
+async def get_location_pollution_summary(request, location_ids, start_date, end_date, db):
+    if not start_date:
+        start_date = datetime.now() - timedelta(days=365)
+    if not end_date:
+        end_date = datetime.now()
+
+    results = [(await db.execute(statement)).all() for statement in summary_statements(start_date, end_date, location_ids)]
+    summary = await run_in_threadpool(combine_summary, results)
+    names = dict((await db.execute(api._names_statement(summary))).all()) if summary else {}
+    return api._pollution_summary(summary, names)
+
+
+@_replaces(api.get_sensor_data)
+async def get_sensor_data(request, location_id, start_date, end_date, format, limit, cursor, layout, db):
+    if not start_date:
+        start_date = datetime.now() - timedelta(days=365)
+    if not end_date:
+        end_date = datetime.now()
+
+    filters = [SensorData.timestamp.between(start_date, end_date)]
+    if location_id:
+        filters.append(SensorData.location_id == location_id)
+
+    if format:
+        # Потік читається синхронним рушієм; Starlette ітерує його в пулі потоків
+        statement = (
+            select(*SensorData.__table__.columns, Location.name.label("location_name"))
+            .join(Location)
+            .where(*filters)
+            .order_by(SensorData.timestamp, SensorData.id)
+        )
+        return streaming_response(statement, format, "sensor_data")
+
+    statement = api._sensor_data_statement(filters, layout, join_location=True)
+    if limit:
+        statement = api._keyset_query(statement, limit, cursor)
+    elif layout == 'columns':
+        statement = statement.order_by(SensorData.timestamp, SensorData.id)
+    rows = api._sensor_rows(await db.execute(statement), layout)
+    content = await run_in_threadpool(api._sensor_data, rows, layout, limit)
+    return await run_in_threadpool(encoded_response, request, content)
+
+
+@_replaces(api.get_sensor_data_for_location)
+async def get_sensor_data_for_location(
+    request, location_id, start_date, end_date, format, limit, cursor, max_points, downsample, fields, layout, db
+):
+    if not start_date:
+        start_date = datetime.now() - timedelta(days=30)
+    if not end_date:
+        end_date = datetime.now()
+
+    filters = (
+        SensorData.location_id == location_id,
+        SensorData.timestamp.between(start_date, end_date)
+    )
+
+    if format:
+        statement = (
+            select(*SensorData.__table__.columns)
+            .where(*filters)
+            .order_by(SensorData.timestamp, SensorData.id)
+        )
+        return streaming_response(statement, format, f"sensor_data_location_{location_id}")
+
+    if max_points:
+        fields = api._downsample_fields(fields)
+        result = await db.execute(api._downsample_statement(fields, filters))
+        columns = await run_in_threadpool(columns_from_result, result)
+        content = await run_in_threadpool(
+            api._downsampled_series, location_id, start_date, end_date, columns, fields, max_points, downsample
+        )
+        return await run_in_threadpool(encoded_response, request, content)
+
+    statement = api._location_data_statement(filters, layout, limit, cursor)
+    rows = api._sensor_rows(await db.execute(statement), layout)
+    content = await run_in_threadpool(api._location_data, location_id, start_date, end_date, rows, layout, limit)
+    return await run_in_threadpool(encoded_response, request, content)
+
+
+@_replaces(api.get_air_quality_for_location)
+@cached(lambda params: [params["location_id"]])
+async def get_air_quality_for_location(
+    request, location_id, start_date, end_date, aggregation_method, summary_only, layout, db
+):
+    if not start_date:
+        start_date = datetime.now() - timedelta(days=30)
+    if not end_date:
+        end_date = datetime.now()
+
+    filters = (
+        SensorData.location_id == location_id,
+        SensorData.timestamp.between(start_date, end_date)
+    )
+    score = api._stored_score(db)
+
+    stats = (await db.execute(api._score_stats_statement(score, filters))).one()
+    if not stats.total_readings:
+        return api._no_data(location_id)
+
+    representative = None
+    if stats.scored_readings:
+        statement = api._representative_statement(score, filters, stats, aggregation_method)
+        representative = (await db.execute(statement)).first()
+    response = await run_in_threadpool(
+        api._air_quality_summary, location_id, start_date, end_date, aggregation_method, stats, representative
+    )
+    if summary_only:
+        return response
+
+    rows = (await db.execute(api._detailed_statement(score, filters, layout))).all()
+    response["detailed_results"] = await run_in_threadpool(api._detailed_results, rows, layout)
+    return response
+
+
+@_replaces(api.comparative_air_quality_analysis)
+@cached(lambda params: params["location_ids"])
+async def comparative_air_quality_analysis(request, location_ids, start_date, end_date, include_stats, db):
+    if not start_date:
+        start_date = datetime.now() - timedelta(days=30)
+    if not end_date:
+        end_date = datetime.now()
+
+    filters = (
+        SensorData.location_id.in_(location_ids),
+        SensorData.timestamp.between(start_date, end_date)
+    )
+    stats, representatives = api._comparative_statements(api._stored_score(db), filters)
+    representatives = {row.location_id: row for row in await db.execute(representatives)}
+    stats_rows = (await db.execute(select(stats))).all()
+    return await run_in_threadpool(api._comparative_analysis, location_ids, stats_rows, representatives, include_stats)
+
+
+@_replaces(api.get_location_pollution_summary_extended)
+async def get_location_pollution_summary_extended(location_ids, start_date, end_date, fields, db):
+    if not start_date:
+        start_date = datetime.now() - timedelta(days=365)
+    if not end_date:
+        end_date = datetime.now()
+
+    try:
+        statement, summarize = summary_query(db.bind.dialect.name, start_date, end_date, fields, location_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    rows = (await db.execute(statement)).all()
+    summary = await run_in_threadpool(summarize, rows)
+    names = dict((await db.execute(api._names_statement(summary))).all()) if summary else {}
+    content = api._extended_summary(summary, names, start_date, end_date)
+    return Response(await run_in_threadpool(encode_json, content), media_type=JSON_MEDIA_TYPE)
+
+
+router = APIRouter()
+
+for route in api.router.routes:
+    if route.endpoint in ASYNC_READ_ENDPOINTS:
+        # Шляхи збігаються із синхронними; у схемі OpenAPI лишаються синхронні описи
+        router.add_api_route(
+            route.path,
+            ASYNC_READ_ENDPOINTS[route.endpoint],
+            methods=list(route.methods),
+            name=f"{route.name}_async",
+            include_in_schema=False,
+        )
@@ -0,0 +1,76 @@
+"""
+Обчислення оцінок якості повітря для вимірювань, збережених без них.
+
+Запуск з каталогу backend:
+    PYTHONPATH=app python app/backfill.py --batch-size 5000
+"""
+import argparse
+
+from sqlalchemy import update
+
+from db import SessionLocal, engine
+from schema import setup_schema
+from fuzzy_logic import INPUT_FIELDS
+from models import SensorData
+from response_cache import locations_changed
+from services import score_sensor_readings
+
+
+def backfill_air_quality(db, batch_size: int = 5000) -> int:
+    """
+    Пакетно оцінює вимірювання без категорії якості повітря (за зростанням id).
+    Кожен пакет фіксується окремою транзакцією. Повертає кількість оцінених вимірювань.
+    """
+    processed = 0
+    last_id = 0
+
+    while True:
+        rows = (
+            db.query(SensorData.id, SensorData.location_id, *[getattr(SensorData, field) for field in INPUT_FIELDS])
+            .filter(SensorData.air_quality_category.is_(None), SensorData.id > last_id)
+            .order_by(SensorData.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+
+        readings = score_sensor_readings([row._asdict() for row in rows])
+        db.execute(
+            update(SensorData),
+            [
+                {
+                    "id": reading["id"],
+                    "air_quality_score": reading["air_quality_score"],
+                    "air_quality_category": reading["air_quality_category"],
+                }
+                for reading in readings
+            ]
+        )
+        locations_changed(db, {reading["location_id"] for reading in readings})
+        db.commit()
+
+        processed += len(rows)
+        last_id = rows[-1].id
+        print(f"Оцінено вимірювань: {processed}")
+
+    return processed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Обчислення оцінок якості повітря для збережених вимірювань")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Кількість вимірювань у пакеті")
+    args = parser.parse_args()
+
+    setup_schema(engine)
+
+    db = SessionLocal()
+    try:
+        processed = backfill_air_quality(db, args.batch_size)
+    finally:
+        db.close()
+    print(f"Готово. Усього оцінено: {processed}")
+
+
+if __name__ == "__main__":
+    main()
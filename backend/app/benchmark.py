@@ -0,0 +1,414 @@
+"""
+Відтворюваний набір вимірювань продуктивності: оцінка якості повітря нечіткою
+логікою (поодинці та пакетом), масове завантаження, вибірки /sensor-data/,
+підсумки, порівняльний аналіз і прогнозування.
+
+База (за замовчуванням - SQLite у тимчасовому каталозі, або PostgreSQL через
+--database-url) заповнюється синтетичними вимірюваннями EnvironmentalDataGenerator
+з фіксованим зерном і використовується повторно, якщо вже заповнена для того ж
+масштабу. Результати зберігаються в JSON; з --baseline (або командою compare)
+вони порівнюються з попереднім запуском, і сповільнення понад поріг
+позначаються як регресії (код виходу 1).
+
+Запуск з каталогу backend:
+    PYTHONPATH=app python -m app.benchmark run --scale 10k --output benchmark.json
+    PYTHONPATH=app python -m app.benchmark run --scale 1m --baseline benchmark.json
+    PYTHONPATH=app python -m app.benchmark compare current.json baseline.json
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from importlib import metadata
+from typing import Any, Callable, Dict, List, Optional
+
+
+# Кількість вимірювань для кожного масштабу
+SCALES = {
+    '10k': 10_000,
+    '1m': 1_000_000,
+    '10m': 10_000_000,
+}
+
+BENCHMARK_LOCATIONS = 10
+BENCHMARK_SEED = 42
+
+# Вимірювання локацій щохвилини, останнє - перед цим моментом
+DATA_END = datetime(2024, 1, 1)
+
+# Вимірювань у тілі запиту масового завантаження та в пакеті оцінки
+INGEST_ROWS = 10_000
+FUZZY_BATCH_ROWS = 100_000
+FUZZY_SINGLE_ROWS = 200
+
+# Допустиме сповільнення відносно базового запуску (0.2 - на 20%)
+REGRESSION_THRESHOLD = float(os.getenv('BENCHMARK_THRESHOLD', '0.2'))
+
+# Пакети, версії яких зберігаються з результатами
+VERSIONED_PACKAGES = (
+    'numpy', 'pandas', 'scikit-fuzzy', 'scikit-learn', 'scipy', 'SQLAlchemy', 'fastapi', 'starlette', 'pydantic',
+)
+
+
+def configure_environment(database_url: str):
+    """
+    Налаштування додатку для вимірювань. Модулі додатку читають змінні
+    середовища під час імпорту, тому вони імпортуються лише після цього виклику.
+    """
+    os.environ['DATABASE_URL'] = database_url
+    # Кеш відповідей приховав би час обробки повторних запитів
+    os.environ['RESPONSE_CACHE'] = 'none'
+    # Прогрів до першого вимірювання; модель - лише з репозиторію (app/model.pkl)
+    os.environ['WARMUP_MODE'] = 'blocking'
+    os.environ['MODEL_REGISTRY_DIR'] = tempfile.mkdtemp(prefix='geo_benchmark_registry_')
+
+
+def package_versions() -> Dict[str, Optional[str]]:
+    versions = {}
+    for name in VERSIONED_PACKAGES:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def timed(function: Callable[[], int], repeat: int) -> Dict[str, Any]:
+    """
+    Виконує function один раз без вимірювання, а потім repeat разів.
+    function повертає кількість оброблених елементів (вимірювань, запитів).
+    """
+    items = function()
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        items = function()
+        durations.append(time.perf_counter() - started)
+
+    median = statistics.median(durations)
+    return {
+        "median_s": round(median, 6),
+        "min_s": round(min(durations), 6),
+        "max_s": round(max(durations), 6),
+        "repeat": repeat,
+        "items": items,
+        "us_per_item": round(median / items * 1e6, 3) if items else None,
+    }
+
+
+def data_start(rows: int) -> datetime:
+    per_location = rows // BENCHMARK_LOCATIONS
+    return DATA_END - timedelta(minutes=per_location)
+
+
+def seed_database(rows: int) -> Optional[Dict[str, Any]]:
+    """
+    Створює локації та вимірювання масштабу rows. Повертає час заповнення
+    або None, якщо база вже заповнена для цього масштабу.
+    """
+    from sqlalchemy import func
+
+    from db import SessionLocal
+    from models import Location, SensorData
+    from services import simulate_sensor_data_for_location
+
+    names = [f'benchmark-{number}' for number in range(1, BENCHMARK_LOCATIONS + 1)] + ['benchmark-ingest']
+    with SessionLocal() as db:
+        existing = {location.name for location in db.query(Location).filter(Location.name.in_(names))}
+        db.add_all([Location(name=name) for name in names if name not in existing])
+        db.commit()
+
+        locations = db.query(Location).filter(Location.name.in_(names[:-1])).order_by(Location.id).all()
+        stored = db.query(func.count(SensorData.id)).filter(
+            SensorData.location_id.in_([location.id for location in locations])
+        ).scalar()
+        if stored == rows:
+            return None
+        if stored:
+            raise SystemExit(
+                f"База містить {stored} вимірювань локацій benchmark-* замість {rows}; "
+                "вкажіть порожню базу для цього масштабу"
+            )
+
+        start = data_start(rows)
+        started = time.perf_counter()
+        for number, location in enumerate(locations):
+            simulate_sensor_data_for_location(
+                db, location.id, start, DATA_END - timedelta(minutes=1), cadence='minute', seed=BENCHMARK_SEED + number
+            )
+        duration = time.perf_counter() - started
+
+    return {
+        "median_s": round(duration, 6),
+        "min_s": round(duration, 6),
+        "max_s": round(duration, 6),
+        "repeat": 1,
+        "items": rows,
+        "us_per_item": round(duration / rows * 1e6, 3),
+    }
+
+
+def location_ids() -> Dict[str, int]:
+    from db import SessionLocal
+    from models import Location
+
+    with SessionLocal() as db:
+        return {
+            location.name: location.id
+            for location in db.query(Location).filter(Location.name.like('benchmark-%'))
+        }
+
+
+def ingest_body(location_id: int, rows: int) -> bytes:
+    """
+    CSV для масового завантаження (через рік після DATA_END, щоб не перетинатися з даними локацій)
+    """
+    from schemas import SensorDataCreate
+    from services import EnvironmentalDataGenerator
+
+    end = DATA_END + timedelta(days=365)
+    columns = EnvironmentalDataGenerator.generate_sensor_data_for_period(
+        location_id, end - timedelta(minutes=rows - 1), end, cadence='minute', seed=BENCHMARK_SEED
+    )
+    fields = list(SensorDataCreate.model_fields)
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(fields)
+    for values in zip(*(columns[field].tolist() for field in fields)):
+        writer.writerow(values)
+    return output.getvalue().encode('utf-8')
+
+
+def benchmark_cases(client, rows: int) -> Dict[str, Callable[[], int]]:
+    """
+    Вимірювання: назва -> функція, що виконує операцію та повертає кількість оброблених елементів
+    """
+    import numpy as np
+
+    from db import SessionLocal
+    from fuzzy_logic import INPUT_FIELDS, AdvancedAirQualityFuzzySystem
+    from services import EnvironmentalDataGenerator, delete_sensor_readings
+
+    ids = location_ids()
+    locations = [ids[f'benchmark-{number}'] for number in range(1, BENCHMARK_LOCATIONS + 1)]
+    ingest_location = ids['benchmark-ingest']
+
+    generated = EnvironmentalDataGenerator.generate_sensor_data_for_period(
+        0, DATA_END - timedelta(minutes=FUZZY_BATCH_ROWS - 1), DATA_END, cadence='minute', seed=BENCHMARK_SEED
+    )
+    readings = np.column_stack([generated[field] for field in INPUT_FIELDS])
+    single_readings = [dict(zip(INPUT_FIELDS, row)) for row in readings[:FUZZY_SINGLE_ROWS].tolist()]
+    uncached = AdvancedAirQualityFuzzySystem(cache_size=0)
+
+    def fuzzy_single():
+        for reading in single_readings:
+            uncached.evaluate_air_quality(reading)
+        return len(single_readings)
+
+    def fuzzy_batch():
+        uncached.evaluate_air_quality_batch(readings)
+        return len(readings)
+
+    def fuzzy_batch_cached():
+        # Новий кеш для кожного повторення: вимірюється заповнення кешу, а не лише влучання
+        AdvancedAirQualityFuzzySystem(cache_size=FUZZY_BATCH_ROWS).evaluate_air_quality_batch(readings)
+        return len(readings)
+
+    body = ingest_body(ingest_location, INGEST_ROWS)
+
+    def ingest_bulk_csv():
+        response = client.post('/api/sensor-data/bulk', params={'format': 'csv'}, content=body)
+        accepted = _check(response)['accepted']
+        # Завантажені вимірювання видаляються, щоб база лишалася незмінною між запусками
+        with SessionLocal() as db:
+            delete_sensor_readings(db, ingest_location, DATA_END, DATA_END + timedelta(days=366))
+            db.commit()
+        return accepted
+
+    end = DATA_END
+    day = {'start_date': (end - timedelta(days=1)).isoformat(), 'end_date': end.isoformat()}
+    week = {'start_date': (end - timedelta(days=7)).isoformat(), 'end_date': end.isoformat()}
+    month = {'start_date': (end - timedelta(days=30)).isoformat(), 'end_date': end.isoformat()}
+    everything = {'start_date': data_start(rows).isoformat(), 'end_date': end.isoformat()}
+
+    def get(path: str, count: Callable[[Any], int], **params) -> Callable[[], int]:
+        def request():
+            return count(_check(client.get(path, params=params)))
+        return request
+
+    prediction_input = {field: float(value) for field, value in zip(INPUT_FIELDS, readings[0].tolist())}
+
+    def predict():
+        for _ in range(20):
+            _check(client.post('/api/predict/', json=prediction_input))
+        return 20
+
+    def predict_batch():
+        return _check(client.post('/api/predict/batch', json={'location_id': locations[0], **week}))['count']
+
+    return {
+        'fuzzy_single': fuzzy_single,
+        'fuzzy_batch': fuzzy_batch,
+        'fuzzy_batch_cached': fuzzy_batch_cached,
+        'ingest_bulk_csv': ingest_bulk_csv,
+        'sensor_data_day': get('/api/sensor-data/', len, location_id=locations[0], **day),
+        'sensor_data_day_columns': get(
+            '/api/sensor-data/', lambda body: len(body['sensor_data']['id']),
+            location_id=locations[0], layout='columns', **day
+        ),
+        'sensor_data_page': get(
+            '/api/sensor-data/', lambda body: len(body['sensor_data']), location_id=locations[0], limit=1000, **week
+        ),
+        'sensor_data_location_downsampled': get(
+            f'/api/sensor-data/location/{locations[0]}', lambda body: 1, max_points=500, **month
+        ),
+        'air_quality_location': get(f'/api/air-quality/location/{locations[0]}', lambda body: 1, **week),
+        'air_quality_summary_only': get(
+            f'/api/air-quality/location/{locations[0]}', lambda body: 1, summary_only=True, **everything
+        ),
+        'pollution_summary': get('/api/locations/pollution-summary/', len, location_ids=locations, **everything),
+        'pollution_summary_extended': get(
+            '/api/locations/pollution-summary-extended/', lambda body: 1, location_ids=locations, **month
+        ),
+        'comparative_analysis': get(
+            '/api/air-quality/comparative-analysis', lambda body: len(locations),
+            location_ids=locations, include_stats=True, **month
+        ),
+        'predict': predict,
+        'predict_batch': predict_batch,
+    }
+
+
+def _check(response):
+    if response.status_code != 200:
+        raise RuntimeError(f"{response.request.url}: {response.status_code} {response.text[:500]}")
+    return response.json()
+
+
+def run(scale: str, database_url: str, repeat: int, only: Optional[List[str]] = None) -> Dict[str, Any]:
+    rows = SCALES[scale]
+    configure_environment(database_url)
+
+    from fastapi.testclient import TestClient
+
+    import main
+    from db import engine
+
+    results = {}
+    with TestClient(main.app) as client:
+        seeded = seed_database(rows)
+        if seeded is not None:
+            results['seed'] = seeded
+        for name, case in benchmark_cases(client, rows).items():
+            if only and name not in only:
+                continue
+            results[name] = timed(case, repeat)
+            print(f"{name:36} {results[name]['median_s'] * 1000:10.1f} мс  ({results[name]['items']} елементів)")
+
+    return {
+        "created": datetime.now().isoformat(timespec='seconds'),
+        "scale": scale,
+        "rows": rows,
+        "locations": BENCHMARK_LOCATIONS,
+        "database": engine.dialect.name,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "packages": package_versions(),
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = REGRESSION_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Порівнює медіани спільних вимірювань. Статус regression - сповільнення
+    понад threshold, improvement - прискорення на стільки ж.
+    """
+    rows = []
+    for name in sorted(set(current['results']) & set(baseline['results'])):
+        if name == 'seed':
+            continue
+        now, before = current['results'][name]['median_s'], baseline['results'][name]['median_s']
+        ratio = now / before if before else float('inf')
+        if ratio > 1 + threshold:
+            status = 'regression'
+        elif ratio < 1 / (1 + threshold):
+            status = 'improvement'
+        else:
+            status = 'ok'
+        rows.append({"name": name, "baseline_s": before, "current_s": now, "ratio": round(ratio, 3), "status": status})
+    return rows
+
+
+def print_comparison(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> bool:
+    """
+    Виводить порівняння; повертає True, якщо регресій немає
+    """
+    for key in ('scale', 'database'):
+        if current.get(key) != baseline.get(key):
+            print(f"Увага: {key} відрізняється ({current.get(key)} проти {baseline.get(key)} у базовому запуску)")
+
+    rows = compare(current, baseline, threshold)
+    for row in rows:
+        print(
+            f"{row['name']:36} {row['baseline_s'] * 1000:10.1f} -> {row['current_s'] * 1000:10.1f} мс"
+            f"  x{row['ratio']:<6} {row['status']}"
+        )
+    regressions = [row['name'] for row in rows if row['status'] == 'regression']
+    if regressions:
+        print(f"Регресії (поріг {threshold:.0%}): {', '.join(regressions)}")
+    return not regressions
+
+
+def _read(path: str) -> Dict[str, Any]:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Вимірювання продуктивності оцінки, завантаження та запитів")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Заповнити базу (за потреби) та виконати вимірювання")
+    run_parser.add_argument("--scale", choices=list(SCALES), default='10k', help="Кількість вимірювань у базі")
+    run_parser.add_argument("--database-url", help="База для вимірювань (за замовчуванням - SQLite у тимчасовому каталозі)")
+    run_parser.add_argument("--repeat", type=int, default=5, help="Кількість повторень кожного вимірювання")
+    run_parser.add_argument("--only", nargs="+", help="Виконати лише вказані вимірювання")
+    run_parser.add_argument("--output", help="Файл JSON для результатів")
+    run_parser.add_argument("--baseline", help="Результати попереднього запуску для порівняння")
+    run_parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Допустиме сповільнення (частка)")
+
+    compare_parser = commands.add_parser("compare", help="Порівняти збережені результати")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Допустиме сповільнення (частка)")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        passed = print_comparison(_read(args.current), _read(args.baseline), args.threshold)
+        sys.exit(0 if passed else 1)
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.gettempdir(), f'geo_benchmark_{args.scale}.db')}"
+    report = run(args.scale, database_url, args.repeat, args.only)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Результати збережено: {args.output}")
+
+    passed = True
+    if args.baseline:
+        passed = print_comparison(report, _read(args.baseline), args.threshold)
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
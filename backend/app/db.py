@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -8,9 +9,71 @@ dotenv.load_dotenv()
 
 DATABASE_URL = os.getenv('DATABASE_URL')
 
-engine = create_engine(DATABASE_URL)
+# Пул з'єднань: розмір, додаткові з'єднання понад розмір, очікування вільного
+# з'єднання (с), час життя з'єднання (с), перевірка з'єднання перед видачею
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '-1'))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+
+# Обмеження часу виконання запиту на PostgreSQL (мс, 0 - без обмеження)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '0'))
+
+# Асинхронні версії ендпоінтів читання (asyncpg для PostgreSQL, aiosqlite для SQLite)
+ASYNC_DB = os.getenv('ASYNC_DB', 'false').lower() in ('1', 'true', 'yes')
+
+# Асинхронні драйвери для синхронних URL
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def async_database_url(url: str) -> str:
+    """
+    URL асинхронного з'єднання: ASYNC_DATABASE_URL або DATABASE_URL
+    з асинхронним драйвером тієї ж СКБД
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Немає асинхронного драйвера для {backend}")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def engine_options(url: str) -> dict:
+    """
+    Параметри пулу та обмеження часу запиту для create_engine / create_async_engine
+    """
+    url = make_url(url)
+    options = {'pool_pre_ping': DB_POOL_PRE_PING}
+
+    # SQLite у пам'яті використовує окремий пул без цих параметрів
+    if url.get_backend_name() != 'sqlite':
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+
+    if DB_STATEMENT_TIMEOUT_MS and url.get_backend_name() == 'postgresql':
+        if url.get_driver_name() == 'asyncpg':
+            options['connect_args'] = {'server_settings': {'statement_timeout': str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options['connect_args'] = {'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'}
+    return options
+
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронний рушій створюється при першому використанні,
+# щоб драйвер був потрібен лише з увімкненим ASYNC_DB
+async_engine = None
+AsyncSessionLocal = None
+
 Base = declarative_base()
 
 
@@ -20,3 +83,46 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_async_sessionmaker():
+    global async_engine, AsyncSessionLocal
+    if AsyncSessionLocal is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        url = os.getenv('ASYNC_DATABASE_URL') or async_database_url(DATABASE_URL)
+        async_engine = create_async_engine(url, **engine_options(url))
+        AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    return AsyncSessionLocal
+
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+async def dispose_async_engine():
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+def add_missing_columns(bind, metadata):
+    """
+    Додає до існуючих таблиць нові стовпці моделей, які можуть бути NULL.
+    create_all створює лише відсутні таблиці, але не змінює наявні.
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+
+    with bind.begin() as connection:
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=bind.dialect)
+                connection.execute(text(
+                    f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                ))
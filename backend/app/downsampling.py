@@ -0,0 +1,134 @@
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+
+
+# Найбільша кількість точок одного ряду, яку можна запросити
+MAX_DOWNSAMPLE_POINTS = 10000
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Індекси точок, вибраних алгоритмом Largest-Triangle-Three-Buckets.
+    Перша й остання точки зберігаються; з кожного з max_points - 2 кошиків
+    береться точка, що утворює найбільший трикутник з попередньою вибраною
+    точкою та середнім наступного кошика. x має бути впорядкованим.
+    """
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    # Середні наступного кошика; для останнього - остання точка ряду
+    sizes = np.diff(np.append(edges, n))
+    average_x = np.add.reduceat(x, edges) / sizes
+    average_y = np.add.reduceat(y, edges) / sizes
+
+    indices = np.empty(max_points, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    selected = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_x, next_y = average_x[bucket + 1], average_y[bucket + 1]
+        # Подвоєна площа трикутника (обрана точка, кандидат, середнє наступного кошика)
+        area = np.abs(
+            (x[selected] - next_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (next_y - y[selected])
+        )
+        selected = start + int(area.argmax())
+        indices[bucket + 1] = selected
+    return indices
+
+
+def minmax_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Індекси мінімуму та максимуму в кожному з max_points / 2 рівних за часом
+    кошиків (у порядку часу). Зберігає піки, які LTTB може згладити.
+    """
+    n = len(x)
+    buckets = max_points // 2
+    if max_points >= n or buckets < 1:
+        return np.arange(n)
+
+    span = x[-1] - x[0]
+    bucket_ids = np.minimum(((x - x[0]) / span * buckets).astype(np.int64), buckets - 1) if span else np.zeros(n, np.int64)
+
+    # x впорядкований, тому точки кожного кошика йдуть поспіль
+    starts = np.flatnonzero(np.r_[True, bucket_ids[1:] != bucket_ids[:-1]])
+    groups = np.cumsum(np.r_[False, bucket_ids[1:] != bucket_ids[:-1]])
+    minimum = np.minimum.reduceat(y, starts)[groups] == y
+    maximum = np.maximum.reduceat(y, starts)[groups] == y
+    return np.union1d(_first_in_group(np.flatnonzero(minimum), groups), _first_in_group(np.flatnonzero(maximum), groups))
+
+
+def _first_in_group(positions: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    position_groups = groups[positions]
+    return positions[np.r_[True, position_groups[1:] != position_groups[:-1]]]
+
+
+DOWNSAMPLE_METHODS: Dict[str, Callable[[np.ndarray, np.ndarray, int], np.ndarray]] = {
+    'lttb': lttb_indices,
+    'minmax': minmax_indices,
+}
+
+
+def load_columns(db, statement) -> Dict[str, np.ndarray]:
+    """
+    Виконує запит (через Core, без ORM) і повертає стовпці результату масивами NumPy
+    (timestamp - datetime64[us], решта - float з NaN замість NULL).
+    Рядки результату записуються одним проходом у структурований масив,
+    без проміжних списків Python для кожного стовпця.
+    """
+    return columns_from_result(db.connection().execute(statement))
+
+
+def columns_from_result(result) -> Dict[str, np.ndarray]:
+    """
+    Стовпці результату запиту масивами NumPy (див. load_columns)
+    """
+    dtype = np.dtype([
+        (key, 'datetime64[us]' if key == 'timestamp' else np.float64) for key in result.keys()
+    ])
+    rows = np.fromiter(map(tuple, result), dtype=dtype)
+    return {key: np.ascontiguousarray(rows[key]) for key in dtype.names}
+
+
+def format_timestamps(timestamps: np.ndarray) -> List[str]:
+    """
+    Позначки часу ISO 8601 як у datetime.isoformat: частки секунди
+    (до мікросекунд) лише для значень, що їх мають
+    """
+    text = np.datetime_as_string(timestamps, unit='us')
+    whole = timestamps == timestamps.astype('datetime64[s]')
+    text[whole] = np.datetime_as_string(timestamps[whole], unit='s')
+    return text.tolist()
+
+
+def downsample_columns(
+    columns: Dict[str, np.ndarray],
+    fields: Sequence[str],
+    max_points: int,
+    method: str = 'lttb'
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Проріджує кожен ряд показника окремо до не більше ніж max_points точок.
+    Повертає {поле: {"timestamps": [...], "values": [...]}}; значення NULL пропускаються.
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Непідтримуваний метод проріджування: {method}")
+    select_indices = DOWNSAMPLE_METHODS[method]
+
+    timestamps = columns['timestamp']
+    x = timestamps.astype(np.int64).astype(float)
+
+    series = {}
+    for field in fields:
+        y = columns[field]
+        present = ~np.isnan(y)
+        field_x, field_y, field_timestamps = x[present], y[present], timestamps[present]
+        indices = select_indices(field_x, field_y, max_points)
+        series[field] = {
+            "timestamps": format_timestamps(field_timestamps[indices]),
+            "values": field_y[indices].tolist(),
+        }
+    return series
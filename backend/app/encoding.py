@@ -0,0 +1,112 @@
+import json
+from datetime import date
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+from profiling import stage
+
+# Швидке кодування JSON та MessagePack, якщо пакети встановлені
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# Форми відповіді для великих масивів вимірювань:
+# rows - список об'єктів, columns - масив на кожен стовпець (timestamp -> timestamps)
+RESPONSE_LAYOUTS = ('rows', 'columns')
+
+JSON_MEDIA_TYPE = 'application/json'
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, 'application/x-msgpack', 'application/vnd.msgpack')
+
+
+def _default(value):
+    # Викликається лише для типів, які кодувальник не підтримує сам
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, date):
+        return value.isoformat()
+    # ORM-об'єкти та інше - як у FastAPI
+    return jsonable_encoder(value)
+
+
+def encode_json(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def encode_msgpack(content: Any) -> bytes:
+    # Дата й час кодуються рядками ISO 8601, як у JSON
+    return msgpack.packb(content, default=_default, datetime=False)
+
+
+def accept_qualities(accept: str) -> Dict[str, float]:
+    """
+    Діапазони типів заголовка Accept з їхніми вагами q (1, якщо не вказано;
+    некоректне значення q прирівнюється до 0)
+    """
+    qualities = {}
+    for media_range in accept.split(','):
+        media_type, *params = media_range.split(';')
+        media_type = media_type.strip().lower()
+        if not media_type:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    quality = 0.0
+        qualities[media_type] = max(quality, qualities.get(media_type, 0.0))
+    return qualities
+
+
+def wants_msgpack(request: Request) -> bool:
+    """
+    MessagePack, якщо клієнт явно вказав його тип у Accept з вагою q > 0,
+    не меншою за вагу JSON (точний тип, інакше application/* або */*)
+    """
+    if msgpack is None:
+        return False
+    qualities = accept_qualities(request.headers.get('accept', ''))
+    msgpack_quality = max(qualities.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+    json_quality = next(
+        (qualities[media_type] for media_type in (JSON_MEDIA_TYPE, 'application/*', '*/*') if media_type in qualities),
+        0.0
+    )
+    return msgpack_quality > 0 and msgpack_quality >= json_quality
+
+
+def encoded_response(request: Request, content: Any, status_code: int = 200) -> Response:
+    """
+    Відповідь, закодована без jsonable_encoder: MessagePack, якщо клієнт
+    вказав його в Accept (і пакет msgpack встановлено), інакше JSON через orjson
+    """
+    with stage("encode"):
+        if wants_msgpack(request):
+            return Response(encode_msgpack(content), status_code=status_code, media_type=MSGPACK_MEDIA_TYPE)
+        return Response(encode_json(content), status_code=status_code, media_type=JSON_MEDIA_TYPE)
+
+
+def to_columns(rows: Sequence, keys: Sequence[str]) -> Dict[str, List]:
+    """
+    Рядки результату запиту у вигляді {стовпець: список значень}.
+    Стовпець timestamp повертається як timestamps.
+    """
+    columns = [list(values) for values in zip(*rows)] if rows else [[] for _ in keys]
+    return {('timestamps' if key == 'timestamp' else key): values for key, values in zip(keys, columns)}
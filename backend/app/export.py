@@ -0,0 +1,226 @@
+import argparse
+import io
+import os
+import tempfile
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Sequence
+
+import numpy as np
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import DateTime, Float, Integer, String, select
+from starlette.background import BackgroundTask
+
+from db import engine
+from models import SensorData
+
+
+# Кількість вимірювань, що читаються з курсора й записуються в одну групу рядків Parquet
+EXPORT_BATCH_SIZE = 50000
+
+EXPORT_FORMATS = ('parquet', 'arrow')
+
+MEDIA_TYPES = {
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
+PARQUET_COMPRESSION = 'zstd'
+
+
+def _pyarrow():
+    # pyarrow потрібен лише для експорту, тому імпортується при першому використанні
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("Для експорту в Parquet/Arrow потрібен пакет pyarrow") from e
+    return pyarrow
+
+
+def export_schema():
+    """
+    Схема Arrow стовпців sensor_readings
+    """
+    pa = _pyarrow()
+    types = {Integer: pa.int64(), Float: pa.float64(), String: pa.string(), DateTime: pa.timestamp('us')}
+    return pa.schema([(column.name, types[type(column.type)]) for column in SensorData.__table__.columns])
+
+
+def export_statement(
+    location_ids: Optional[Sequence[int]] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+):
+    """
+    Вимірювання для експорту, впорядковані за локацією та часом
+    (вимірювання без локації або часу не експортуються)
+    """
+    filters = [SensorData.location_id.isnot(None), SensorData.timestamp.isnot(None)]
+    if location_ids:
+        filters.append(SensorData.location_id.in_(location_ids))
+    if start_date:
+        filters.append(SensorData.timestamp >= start_date)
+    if end_date:
+        filters.append(SensorData.timestamp <= end_date)
+
+    return (
+        select(*SensorData.__table__.columns)
+        .where(*filters)
+        .order_by(SensorData.location_id, SensorData.timestamp, SensorData.id)
+    )
+
+
+def iter_record_batches(statement, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Виконує запит з курсором на боці сервера і перетворює кожну частину
+    з batch_size рядків на RecordBatch стовпцями (без словників і ORM-об'єктів).
+    """
+    pa = _pyarrow()
+    schema = export_schema()
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(statement)
+        for rows in result.partitions():
+            columns = zip(*rows)
+            yield pa.RecordBatch.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema,
+            )
+
+
+def iter_arrow_stream(statement, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """
+    Потік Arrow IPC: схема, а потім кожна частина вимірювань окремим повідомленням
+    """
+    pa = _pyarrow()
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, export_schema()) as writer:
+        yield _drain(sink)
+        for batch in iter_record_batches(statement, batch_size):
+            writer.write_batch(batch)
+            yield _drain(sink)
+    yield _drain(sink)
+
+
+def _drain(sink: io.BytesIO) -> bytes:
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+
+def write_parquet(statement, path: str, compression: str = PARQUET_COMPRESSION,
+                  batch_size: int = EXPORT_BATCH_SIZE) -> int:
+    """
+    Записує вимірювання в один файл Parquet (група рядків на кожну частину).
+    Повертає кількість записаних вимірювань.
+    """
+    pa = _pyarrow()
+    written = 0
+    with pa.parquet.ParquetWriter(path, export_schema(), compression=compression) as writer:
+        for batch in iter_record_batches(statement, batch_size):
+            writer.write_batch(batch)
+            written += batch.num_rows
+    return written
+
+
+def write_partitioned_parquet(statement, directory: str, compression: str = PARQUET_COMPRESSION,
+                              batch_size: int = EXPORT_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Записує вимірювання в каталог, розбитий за локацією та місяцем:
+    directory/location_id=<id>/month=<YYYY-MM>/part-0.parquet
+    (розбиття у стилі Hive, каталог читається pandas.read_parquet / polars.scan_parquet).
+    Запит має бути впорядкований за локацією та часом (export_statement),
+    тоді кожен файл записується одним відкритим записувачем.
+    Повертає {шлях файлу: кількість вимірювань}.
+    """
+    pa = _pyarrow()
+    schema = export_schema()
+    file_schema = schema.remove(schema.get_field_index('location_id'))
+
+    files = {}
+    writer, path = None, None
+    try:
+        for batch in iter_record_batches(statement, batch_size):
+            locations = batch.column('location_id').to_numpy()
+            months = batch.column('timestamp').to_numpy().astype('datetime64[M]')
+            data = batch.drop_columns(['location_id'])
+
+            # Межі розділів у межах частини (рядки впорядковані за локацією та часом)
+            changes = np.flatnonzero((locations[1:] != locations[:-1]) | (months[1:] != months[:-1])) + 1
+            starts = np.r_[0, changes]
+            ends = np.r_[changes, batch.num_rows]
+
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                partition = os.path.join(
+                    directory,
+                    f"location_id={locations[start]}",
+                    f"month={np.datetime_as_string(months[start], unit='M')}",
+                    "part-0.parquet",
+                )
+                if partition != path:
+                    if writer is not None:
+                        writer.close()
+                    os.makedirs(os.path.dirname(partition), exist_ok=True)
+                    writer, path = pa.parquet.ParquetWriter(partition, file_schema, compression=compression), partition
+                    files[path] = 0
+                writer.write_batch(data.slice(start, end - start))
+                files[path] += end - start
+    finally:
+        if writer is not None:
+            writer.close()
+    return files
+
+
+def arrow_streaming_response(statement, filename: str) -> StreamingResponse:
+    """
+    Потокова відповідь Arrow IPC для запиту export_statement
+    """
+    _pyarrow()
+    return StreamingResponse(
+        iter_arrow_stream(statement),
+        media_type=MEDIA_TYPES['arrow'],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.arrow"'},
+    )
+
+
+def parquet_file_response(statement, filename: str) -> FileResponse:
+    """
+    Відповідь з файлом Parquet, записаним частинами в тимчасовий файл
+    (видаляється після передачі)
+    """
+    handle, path = tempfile.mkstemp(suffix='.parquet')
+    os.close(handle)
+    try:
+        write_parquet(statement, path)
+    except BaseException:
+        os.remove(path)
+        raise
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES['parquet'],
+        filename=f"{filename}.parquet",
+        background=BackgroundTask(os.remove, path),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Експорт вимірювань у Parquet, розбитий за локацією та місяцем")
+    parser.add_argument("output", help="Каталог для файлів Parquet")
+    parser.add_argument("--location-ids", type=int, nargs="+", help="Локації (усі, якщо не вказано)")
+    parser.add_argument("--start-date", type=datetime.fromisoformat, help="Початок періоду (ISO 8601)")
+    parser.add_argument("--end-date", type=datetime.fromisoformat, help="Кінець періоду (ISO 8601)")
+    parser.add_argument("--compression", default=PARQUET_COMPRESSION, help="Стиснення Parquet (zstd, snappy, gzip, none)")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE, help="Кількість вимірювань у частині")
+    args = parser.parse_args()
+
+    files = write_partitioned_parquet(
+        export_statement(args.location_ids, args.start_date, args.end_date),
+        args.output,
+        compression=args.compression,
+        batch_size=args.batch_size,
+    )
+    print(f"Готово. Файлів: {len(files)}, вимірювань: {sum(files.values())}")
+
+
+if __name__ == "__main__":
+    main()
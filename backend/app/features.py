@@ -0,0 +1,154 @@
+from datetime import datetime
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models import SensorData
+from pagination import keyset_page
+from fuzzy_logic import INPUT_FIELDS
+from services import fuzzy_system
+from app.ai_model import FEATURE_MAPPING
+
+
+# Цільові змінні навчання з вимірювань
+TRAINING_TARGETS = ('air_quality_score', 'pm2_5_next_hour')
+
+# Кількість вимірювань, що читаються з бази за один раз
+TRAINING_CHUNK_SIZE = 50000
+
+# Прогноз PM2.5 на годину вперед: допустиме відхилення часу наступного вимірювання
+NEXT_HOUR = np.timedelta64(1, 'h')
+NEXT_HOUR_TOLERANCE = np.timedelta64(15, 'm')
+
+FEATURE_FIELDS = tuple(FEATURE_MAPPING)
+FEATURE_NAMES = [FEATURE_MAPPING[field] for field in FEATURE_FIELDS]
+
+
+def _filters(location_ids: Optional[Sequence[int]], start_date: Optional[datetime], end_date: Optional[datetime]):
+    filters = []
+    if location_ids:
+        filters.append(SensorData.location_id.in_(location_ids))
+    if start_date:
+        filters.append(SensorData.timestamp >= start_date)
+    if end_date:
+        filters.append(SensorData.timestamp <= end_date)
+    return filters
+
+
+def count_training_readings(db, location_ids=None, start_date=None, end_date=None) -> int:
+    return db.query(SensorData.id).filter(*_filters(location_ids, start_date, end_date)).count()
+
+
+def iter_training_chunks(
+    db,
+    target: str = 'air_quality_score',
+    location_ids: Optional[Sequence[int]] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    chunk_size: int = TRAINING_CHUNK_SIZE
+) -> Iterator[Tuple["pd.DataFrame", np.ndarray, np.ndarray, int]]:
+    """
+    Навчальні дані з sensor_readings частинами до chunk_size вимірювань
+    (по кожній локації за зростанням часу, пагінація за ключем).
+
+    Повертає кортежі (ознаки з назвами стовпців навчальних даних, ціль,
+    id вимірювань, кількість прочитаних вимірювань). Ціль:
+    - air_quality_score - збережена оцінка нечіткої логіки (відсутні обчислюються пакетно);
+    - pm2_5_next_hour - PM2.5 вимірювання тієї ж локації через годину
+      (±NEXT_HOUR_TOLERANCE); вимірювання без такого відкидаються.
+    Рядки з відсутніми ознаками відкидаються.
+    """
+    # pandas потрібен лише для навчання, тому імпортується під час першого використання
+    import pandas as pd
+
+    if target not in TRAINING_TARGETS:
+        raise ValueError(f"Непідтримувана ціль навчання: {target}")
+
+    filters = _filters(location_ids, start_date, end_date)
+    locations = location_ids or [
+        location_id for (location_id,) in
+        db.query(SensorData.location_id).filter(*filters).distinct().order_by(SensorData.location_id)
+    ]
+    columns = (SensorData.id, SensorData.timestamp, SensorData.air_quality_score,
+               *[getattr(SensorData, field) for field in FEATURE_FIELDS])
+
+    for location_id in locations:
+        query = db.query(*columns).filter(*filters, SensorData.location_id == location_id)
+        pending = None
+        cursor = None
+        while True:
+            rows, cursor = keyset_page(query, chunk_size, cursor)
+            chunk = _to_arrays(rows)
+            last = cursor is None
+
+            if target == 'air_quality_score':
+                ready, targets = chunk, _fuzzy_scores(chunk)
+            else:
+                pending = chunk if pending is None else {
+                    key: np.concatenate([pending[key], chunk[key]]) for key in chunk
+                }
+                ready, targets, pending = _next_hour_targets(pending, last)
+
+            features = ready['features']
+            valid = ~np.isnan(targets) & ~np.isnan(features).any(axis=1)
+            if valid.any():
+                yield (
+                    pd.DataFrame(features[valid], columns=FEATURE_NAMES),
+                    targets[valid],
+                    ready['id'][valid],
+                    len(rows),
+                )
+            elif rows:
+                yield pd.DataFrame(columns=FEATURE_NAMES), np.empty(0), np.empty(0, np.int64), len(rows)
+
+            if last:
+                break
+
+
+def _to_arrays(rows: List) -> dict:
+    return {
+        'id': np.array([row[0] for row in rows], dtype=np.int64),
+        'timestamp': np.array([row[1] for row in rows], dtype='datetime64[us]'),
+        'score': np.array([row[2] for row in rows], dtype=float),
+        'features': np.array([row[3:] for row in rows], dtype=float).reshape(len(rows), len(FEATURE_FIELDS)),
+    }
+
+
+def _fuzzy_scores(chunk: dict) -> np.ndarray:
+    scores = chunk['score'].copy()
+    missing = np.isnan(scores)
+    if missing.any():
+        # Оцінки вимірювань, збережених до появи стовпця, обчислюються пакетно
+        positions = [FEATURE_FIELDS.index(field) for field in INPUT_FIELDS]
+        scores[missing] = fuzzy_system.evaluate_air_quality_batch(chunk['features'][missing][:, positions])
+    return scores
+
+
+def _next_hour_targets(buffer: dict, last: bool):
+    """
+    Ціль PM2.5 через годину для вимірювань буфера, для яких вона вже визначена:
+    PM2.5 вимірювання, найближчого до t+1h (раніше чи пізніше), якщо воно
+    в межах ±NEXT_HOUR_TOLERANCE. Вимірювання, чиє наступне вимірювання може бути
+    в ще не прочитаній частині, лишаються в буфері (разом з усіма пізнішими).
+    """
+    timestamps = buffer['timestamp']
+    wanted = timestamps + NEXT_HOUR
+    after = np.searchsorted(timestamps, wanted)
+    before = np.maximum(after - 1, 0)
+    after = np.minimum(after, len(timestamps) - 1)
+    distance_before = np.abs(timestamps[before] - wanted)
+    distance_after = np.abs(timestamps[after] - wanted)
+    positions = np.where(distance_after < distance_before, after, before)
+    matched = np.minimum(distance_before, distance_after) <= NEXT_HOUR_TOLERANCE
+
+    pm2_5 = buffer['features'][:, FEATURE_FIELDS.index('pm2_5')]
+    targets = np.where(matched, pm2_5[positions], np.nan) if len(timestamps) else np.empty(0)
+
+    if last or not len(timestamps):
+        resolved = len(timestamps)
+    else:
+        resolved = int(np.searchsorted(timestamps, timestamps[-1] - NEXT_HOUR - NEXT_HOUR_TOLERANCE, side='left'))
+
+    ready = {key: values[:resolved] for key, values in buffer.items()}
+    pending = {key: values[resolved:] for key, values in buffer.items()}
+    return ready, targets[:resolved], pending
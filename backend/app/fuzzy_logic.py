@@ -1,12 +1,170 @@
 import numpy as np
-import skfuzzy as fuzz
-from skfuzzy import control as ctrl
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 import json
-from typing import Dict, Any
+import math
+import os
+import queue
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+from hooks import FUZZY_EVALUATION, observe
+
+
+# Поля вимірювання у порядку стовпців для пакетної оцінки
+INPUT_FIELDS = (
+    'pm2_5',
+    'pm10',
+    'nitrogen_dioxide',
+    'sulfur_dioxide',
+    'carbon_monoxide',
+    'ozone',
+    'lead',
+    'cadmium',
+    'radiation_level',
+)
+
+# Допустима розбіжність між оцінками пакетного та порядкового обчислення
+BATCH_SCORE_TOLERANCE = 1e-6
+
+# Кількість вимірювань, що обробляються за один прохід (обмежує пам'ять)
+BATCH_CHUNK_SIZE = 50_000
+
+# Розмір кешу оцінок за замовчуванням (0 - кеш і квантування вимкнено)
+DEFAULT_CACHE_SIZE = 0
+
+# Крок квантування входів як частка кроку універсуму кожної змінної
+DEFAULT_QUANTIZATION_STEP = 0.01
+
+
+# Категорія для вимірювань, оцінку яких не вдалося розрахувати
+UNAVAILABLE_DESCRIPTION = "Дані недоступні"
+
+
+def interpret_air_quality_score(air_quality_score: float) -> Tuple[str, str]:
+    """
+    Категорія якості повітря та рекомендація для оцінки за шкалою 0-10
+    """
+    if air_quality_score <= 2:
+        quality_description = "Відмінна"
+        health_recommendation = "Повітря абсолютно безпечне для всіх груп населення."
+    elif air_quality_score <= 4:
+        quality_description = "Добра"
+        health_recommendation = "Повітря цілком прийнятне, незначний ризик для чутливих груп."
+    elif air_quality_score <= 6:
+        quality_description = "Задовільна"
+        health_recommendation = "Можливий незначний вплив на здоров'я, особливо для чутливих груп."
+    elif air_quality_score <= 8:
+        quality_description = "Погана"
+        health_recommendation = "Високий ризик для здоров'я. Рекомендовано обмежити перебування на вулиці."
+    else:
+        quality_description = "Небезпечна"
+        health_recommendation = "Критичний стан забруднення. Негайно вжити заходів безпеки."
+
+    return quality_description, health_recommendation
+
+
+# scikit-fuzzy (разом зі SciPy) імпортується під час створення першої системи,
+# а не під час імпорту модуля: константи та інтерпретація оцінок доступні без нього
+class MembershipLookupTable:
+    """
+    Попередньо обчислені значення функцій належності вхідної змінної
+    на рівномірній сітці квантування в межах її універсуму.
+    """
+
+    def __init__(self, variable, quantization_step: float):
+        import skfuzzy as fuzz
+
+        universe = variable.universe
+        self.label = variable.label
+        self.lower = float(universe.min())
+        self.upper = float(universe.max())
+        self.step = float(universe[1] - universe[0]) * quantization_step
+
+        size = int(round((self.upper - self.lower) / self.step)) + 1
+        grid = self.lower + np.arange(size) * self.step
+        self.memberships = {
+            term.label: fuzz.interp_membership(universe, term.mf, grid)
+            for term in variable.terms.values()
+        }
+
+    def quantize(self, values: np.ndarray) -> np.ndarray:
+        """Індекси вузлів сітки для масиву значень (з обмеженням межами універсуму)."""
+        return np.rint((np.clip(values, self.lower, self.upper) - self.lower) / self.step).astype(np.int64)
+
+    def index(self, value: float) -> int:
+        """Індекс вузла сітки для одного значення (без накладних витрат NumPy)."""
+        return int(round((min(max(value, self.lower), self.upper) - self.lower) / self.step))
+
+
+class ScoreCache:
+    """
+    Обмежений LRU-кеш оцінок якості повітря.
+    Ключ - кортеж квантованих індексів вхідних змінних.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[float]:
+        with self._lock:
+            score = self._entries.get(key)
+            if score is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return score
+
+    def put(self, key, score: float):
+        with self._lock:
+            self._entries[key] = score
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
 
 
 class AdvancedAirQualityFuzzySystem:
-    def __init__(self):
+    def __init__(
+        self,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        quantization_step: float = DEFAULT_QUANTIZATION_STEP,
+        score_cache: Optional["ScoreCache"] = None
+    ):
+        """
+        cache_size: максимальна кількість оцінок у LRU-кеші; якщо більше 0,
+        входи квантуються і функції належності беруться з таблиць.
+        quantization_step: крок квантування як частка кроку універсуму змінної.
+        score_cache: спільний кеш (наприклад, для екземплярів одного пулу);
+        якщо вказано, cache_size ігнорується.
+        """
+        import skfuzzy as fuzz
+        from skfuzzy import control as ctrl
+
         # Вхідні змінні
         self.pm25 = ctrl.Antecedent(np.arange(0, 300, 1), 'PM2.5')
         self.pm10 = ctrl.Antecedent(np.arange(0, 300, 1), 'PM10')
@@ -137,14 +295,33 @@ class AdvancedAirQualityFuzzySystem:
             )
         ]
 
+        # Вхідні змінні у порядку INPUT_FIELDS (для пакетної оцінки)
+        self.batch_inputs = (
+            self.pm25, self.pm10, self.no2, self.so2, self.co,
+            self.ozone, self.lead, self.cadmium, self.radiation
+        )
+        self.rules = rules
+
         # Створення системи контролю
         self.air_quality_ctrl = ctrl.ControlSystem(rules)
         self.air_quality_simulation = ctrl.ControlSystemSimulation(self.air_quality_ctrl)
 
+        # Таблиці належності на сітці квантування та кеш оцінок
+        self.quantization_step = quantization_step
+        self.membership_tables = tuple(
+            MembershipLookupTable(variable, quantization_step) for variable in self.batch_inputs
+        )
+        if score_cache is None and cache_size > 0:
+            score_cache = ScoreCache(cache_size)
+        self.score_cache = score_cache
+
     def evaluate_air_quality(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Оцінка якості повітря на основі нечіткої логіки
         """
+        if self.score_cache is not None:
+            return self._evaluate_cached(data)
+
         try:
             # Введення даних в систему
             self.air_quality_simulation.input['PM2.5'] = data['pm2_5']
@@ -163,53 +340,376 @@ class AdvancedAirQualityFuzzySystem:
             # Отримання результату
             air_quality_score = self.air_quality_simulation.output['Air Quality']
 
-            # Інтерпретація результату
-            if air_quality_score <= 2:
-                quality_description = "Відмінна"
-                health_recommendation = "Повітря абсолютно безпечне для всіх груп населення."
-            elif air_quality_score <= 4:
-                quality_description = "Добра"
-                health_recommendation = "Повітря цілком прийнятне, незначний ризик для чутливих груп."
-            elif air_quality_score <= 6:
-                quality_description = "Задовільна"
-                health_recommendation = "Можливий незначний вплив на здоров'я, особливо для чутливих груп."
-            elif air_quality_score <= 8:
-                quality_description = "Погана"
-                health_recommendation = "Високий ризик для здоров'я. Рекомендовано обмежити перебування на вулиці."
-            else:
-                quality_description = "Небезпечна"
-                health_recommendation = "Критичний стан забруднення. Негайно вжити заходів безпеки."
-
-            return {
-                "score": round(air_quality_score, 2),
-                "description": quality_description,
-                "health_recommendation": health_recommendation,
-                "detailed_parameters": {
-                    "PM2.5": data['pm2_5'],
-                    "PM10": data['pm10'],
-                    "NO2": data['nitrogen_dioxide'],
-                    "SO2": data['sulfur_dioxide'],
-                    "CO": data['carbon_monoxide'],
-                    "Ozone": data['ozone'],
-                    "Lead": data['lead'],
-                    "Cadmium": data['cadmium'],
-                    "Radiation": data['radiation_level']
-                }
-            }
+            return self.describe_air_quality(air_quality_score, data)
 
         except Exception as e:
             # Логування помилки для діагностики
             print(f"Помилка у evaluate_air_quality: {e}")
-            
-            # Повернення структури за замовчуванням з ключем 'score'
-            return {
-                "score": 0.0,  # Значення за замовчуванням
-                "description": "Дані недоступні",
-                "health_recommendation": "Не вдалося розрахувати якість повітря.",
-                "detailed_parameters": data,
-                "error": str(e)
+
+            return self._unavailable_result(data, str(e))
+
+    def _evaluate_cached(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            values = [float(data[field]) for field in INPUT_FIELDS]
+        except (KeyError, TypeError, ValueError) as e:
+            return self._unavailable_result(data, str(e))
+
+        if any(math.isnan(value) for value in values):
+            return self.describe_air_quality(np.nan, data)
+
+        key = tuple(table.index(value) for table, value in zip(self.membership_tables, values))
+        score = self.score_cache.get(key)
+        if score is None:
+            score = self._infer(self._lookup_memberships(np.array([key])))[0]
+            self.score_cache.put(key, score)
+        return self.describe_air_quality(score, data)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Лічильники кешу оцінок (влучання, промахи, витіснення) для налаштування його розміру.
+        """
+        if self.score_cache is None:
+            return {"enabled": False}
+        return {
+            "enabled": True,
+            "quantization_step": self.quantization_step,
+            **self.score_cache.stats(),
+        }
+
+    @staticmethod
+    def describe_air_quality(air_quality_score: float, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Інтерпретація обчисленої оцінки якості повітря (не потребує системи правил).
+        Оцінка NaN (результат пакетного обчислення) або None (збережене вимірювання)
+        означає, що її не вдалося розрахувати.
+        """
+        if air_quality_score is None or np.isnan(air_quality_score):
+            return AdvancedAirQualityFuzzySystem._unavailable_result(
+                data, "Жодне правило не спрацювало або дані вимірювання неповні"
+            )
+
+        quality_description, health_recommendation = interpret_air_quality_score(air_quality_score)
+
+        return {
+            "score": round(air_quality_score, 2),
+            "description": quality_description,
+            "health_recommendation": health_recommendation,
+            "detailed_parameters": {
+                "PM2.5": data['pm2_5'],
+                "PM10": data['pm10'],
+                "NO2": data['nitrogen_dioxide'],
+                "SO2": data['sulfur_dioxide'],
+                "CO": data['carbon_monoxide'],
+                "Ozone": data['ozone'],
+                "Lead": data['lead'],
+                "Cadmium": data['cadmium'],
+                "Radiation": data['radiation_level']
             }
+        }
+
+    @staticmethod
+    def _unavailable_result(data: Dict[str, Any], error: str) -> Dict[str, Any]:
+        # Повернення структури за замовчуванням з ключем 'score'
+        return {
+            "score": 0.0,  # Значення за замовчуванням
+            "description": UNAVAILABLE_DESCRIPTION,
+            "health_recommendation": "Не вдалося розрахувати якість повітря.",
+            "detailed_parameters": data,
+            "error": error
+        }
+
+    def evaluate_air_quality_batch(self, readings, chunk_size: int = BATCH_CHUNK_SIZE) -> np.ndarray:
+        """
+        Пакетна оцінка якості повітря для N вимірювань за один прохід.
+
+        readings: масив форми (N, 9) зі стовпцями у порядку INPUT_FIELDS
+        або DataFrame, що містить ці стовпці.
+
+        Фазифікація, 9 правил (min/max), акумуляція та дефазифікація
+        центроїдом виконуються над масивами, без ControlSystemSimulation.
+        Оцінки збігаються з evaluate_air_quality у межах BATCH_SCORE_TOLERANCE.
+        Якщо кеш увімкнено, обидва шляхи працюють з квантованими входами.
+        Для вимірювань з пропущеними значеннями або без жодного спрацьованого
+        правила повертається NaN.
+        """
+        if hasattr(readings, 'columns'):
+            readings = readings[list(INPUT_FIELDS)].to_numpy(dtype=np.float64)
+
+        values = np.asarray(readings, dtype=np.float64)
+        if values.ndim != 2 or values.shape[1] != len(INPUT_FIELDS):
+            raise ValueError(
+                f"Очікується масив форми (N, {len(INPUT_FIELDS)}), отримано {values.shape}"
+            )
+
+        scores = np.empty(len(values), dtype=np.float64)
+        compute = self._compute_batch if self.score_cache is None else self._compute_batch_cached
+        for start in range(0, len(values), chunk_size):
+            chunk = values[start:start + chunk_size]
+            valid = ~np.isnan(chunk).any(axis=1)
+            chunk_scores = np.full(len(chunk), np.nan)
+            if valid.any():
+                chunk_scores[valid] = compute(chunk[valid])
+            scores[start:start + chunk_size] = chunk_scores
+        return scores
+
+    def _compute_batch(self, values: np.ndarray) -> np.ndarray:
+        import skfuzzy as fuzz
+
+        # Фазифікація: значення обмежуються межами універсуму, як у ControlSystemSimulation
+        memberships = {}
+        for column, variable in enumerate(self.batch_inputs):
+            universe = variable.universe
+            crisp = np.clip(values[:, column], universe.min(), universe.max())
+            for term in variable.terms.values():
+                memberships[(variable.label, term.label)] = fuzz.interp_membership(
+                    universe, term.mf, crisp
+                )
+        return self._infer(memberships)
+
+    def _compute_batch_cached(self, values: np.ndarray) -> np.ndarray:
+        indices = np.column_stack([
+            table.quantize(values[:, column]) for column, table in enumerate(self.membership_tables)
+        ])
+
+        # Однакові квантовані вектори оцінюються один раз
+        unique, inverse = np.unique(indices, axis=0, return_inverse=True)
+        keys = [tuple(row) for row in unique.tolist()]
+        cached = [self.score_cache.get(key) for key in keys]
+        unique_scores = np.array(cached, dtype=np.float64)
+
+        missing = np.array([position for position, score in enumerate(cached) if score is None], dtype=np.int64)
+        if len(missing):
+            unique_scores[missing] = self._infer(self._lookup_memberships(unique[missing]))
+            for position in missing:
+                self.score_cache.put(keys[position], unique_scores[position])
+
+        return unique_scores[inverse.ravel()]
+
+    def _lookup_memberships(self, indices: np.ndarray):
+        memberships = {}
+        for column, table in enumerate(self.membership_tables):
+            for term_label, values in table.memberships.items():
+                memberships[(table.label, term_label)] = values[indices[:, column]]
+        return memberships
+
+    def _infer(self, memberships) -> np.ndarray:
+        # Активація правил та акумуляція (max) для кожного терму вихідної змінної
+        cuts = {}
+        for rule in self.rules:
+            firing = self._batch_firing(rule, rule.antecedent, memberships)
+            for weighted_term in rule.consequent:
+                activation = firing * weighted_term.weight
+                key = weighted_term.term.label
+                cuts[key] = activation if key not in cuts else np.fmax(activation, cuts[key])
+
+        return self._batch_centroid(cuts)
+
+    def _batch_firing(self, rule, clause, memberships):
+        from skfuzzy.control.term import TermAggregate
+
+        if isinstance(clause, TermAggregate):
+            first = self._batch_firing(rule, clause.term1, memberships)
+            if clause.kind == 'not':
+                return 1. - first
+            second = self._batch_firing(rule, clause.term2, memberships)
+            if clause.kind == 'and':
+                return rule.and_func(first, second)
+            return rule.or_func(first, second)
+        return memberships[(clause.parent.label, clause.label)]
+
+    def _batch_centroid(self, cuts):
+        """
+        Дефазифікація центроїдом для масиву рівнів зрізу.
 
+        Як і skfuzzy, універсум доповнюється точками перетину кожного терму
+        з його рівнем зрізу, а площа під кусково-лінійною функцією
+        обчислюється точно.
+        """
+        import skfuzzy as fuzz
+
+        universe = self.air_quality.universe.astype(np.float64)
+        rows = len(next(iter(cuts.values())))
+        x0, dx = universe[:-1], np.diff(universe)
+
+        points = [np.broadcast_to(universe, (rows, len(universe)))]
+        for label, cut in cuts.items():
+            mf = self.air_quality[label].mf
+            level = cut[:, None]
+            # Для нульового рівня skfuzzy використовує строге порівняння
+            above = np.where(level == 0., mf > level, mf >= level)
+            crossing = above[:, 1:] != above[:, :-1]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                interp = x0 + (level - mf[:-1]) * dx / np.diff(mf)
+            points.append(np.where(crossing, interp, np.nan))
+
+        # Відсутні точки перетину замінюються правою межею універсуму
+        points = np.concatenate(points, axis=1)
+        points = np.sort(np.where(np.isnan(points), universe[-1], points), axis=1)
+
+        output_mf = np.zeros_like(points)
+        for label, cut in cuts.items():
+            term_mf = fuzz.interp_membership(universe, self.air_quality[label].mf, points)
+            np.maximum(output_mf, np.minimum(cut[:, None], term_mf), output_mf)
+
+        x1, x2 = points[:, :-1], points[:, 1:]
+        y1, y2 = output_mf[:, :-1], output_mf[:, 1:]
+        area = 0.5 * (x2 - x1) * (y1 + y2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            moment = 2.0 / 3.0 * (x2 - x1) * (y2 + 0.5 * y1) / (y1 + y2) + x1
+        moment_area = np.where(area > 0, moment * area, 0.)
+
+        scores = moment_area.sum(axis=1) / np.fmax(area.sum(axis=1), np.finfo(float).eps)
+        scores[output_mf.sum(axis=1) == 0] = np.nan
+        return scores
+
+
+# Мінімальна кількість вимірювань, з якої пакет розподіляється між процесами
+DEFAULT_PROCESS_THRESHOLD = 200_000
+
+# Система нечіткої логіки робочого процесу (створюється ініціалізатором пулу процесів)
+_worker_system = None
+
+
+def _init_worker(cache_size: int, quantization_step: float):
+    global _worker_system
+    _worker_system = AdvancedAirQualityFuzzySystem(cache_size, quantization_step)
+
+
+def _score_in_worker(values: np.ndarray) -> np.ndarray:
+    return _worker_system.evaluate_air_quality_batch(values)
+
+
+class FuzzySystemPool:
+    """
+    Пул незалежних екземплярів AdvancedAirQualityFuzzySystem для паралельних запитів.
+
+    ControlSystemSimulation зберігає вхідні значення у спільному графі правил,
+    тому кожен екземпляр пулу має власну систему контролю і видається
+    одному потоку за раз. Пакетна оцінка стану не змінює і виконується
+    без резервування екземпляра. Кеш оцінок спільний для всіх екземплярів.
+    Для дуже великих пакетів можна увімкнути пул процесів (processes > 0):
+    вимірювання розподіляються між ядрами частинами.
+    Системи правил будуються під час першого використання або прогріву (warm_up).
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        quantization_step: float = DEFAULT_QUANTIZATION_STEP,
+        processes: int = 0,
+        process_threshold: int = DEFAULT_PROCESS_THRESHOLD
+    ):
+        self.size = size or os.cpu_count() or 1
+        self.cache_size = cache_size
+        self.quantization_step = quantization_step
+        self.processes = processes
+        self.process_threshold = process_threshold
+
+        self._score_cache = ScoreCache(cache_size) if cache_size > 0 else None
+        # Екземпляри створюються за потреби, доки їх кількість не досягне size
+        self._systems = queue.Queue()
+        self._created = 0
+        self._created_lock = threading.Lock()
+        # Екземпляр для пакетної оцінки (створюється під час першого використання)
+        self._shared = None
+        self._shared_lock = threading.Lock()
+
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def shared(self) -> AdvancedAirQualityFuzzySystem:
+        if self._shared is None:
+            with self._shared_lock:
+                if self._shared is None:
+                    self._shared = AdvancedAirQualityFuzzySystem(0, self.quantization_step, self._score_cache)
+        return self._shared
+
+    @property
+    def loaded(self) -> bool:
+        return self._shared is not None
+
+    def warm_up(self):
+        """
+        Будує спільний екземпляр та перший екземпляр пулу
+        """
+        self.shared
+        with self.checkout():
+            pass
+
+    @contextmanager
+    def checkout(self):
+        """
+        Видає екземпляр системи у виключне користування на час блоку with.
+        """
+        try:
+            system = self._systems.get_nowait()
+        except queue.Empty:
+            system = self._create_or_wait()
+        try:
+            yield system
+        finally:
+            self._systems.put(system)
+
+    def _create_or_wait(self) -> AdvancedAirQualityFuzzySystem:
+        with self._created_lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+        if create:
+            return AdvancedAirQualityFuzzySystem(
+                self.cache_size, self.quantization_step, self._score_cache
+            )
+        return self._systems.get()
+
+    def evaluate_air_quality(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        with observe(FUZZY_EVALUATION, "single"), self.checkout() as system:
+            return system.evaluate_air_quality(data)
+
+    def evaluate_air_quality_batch(self, readings) -> np.ndarray:
+        """
+        Пакетна оцінка; великі пакети розподіляються між процесами, якщо їх увімкнено.
+        """
+        with observe(FUZZY_EVALUATION, "batch", rows=len(readings)):
+            return self._evaluate_batch(readings)
+
+    def _evaluate_batch(self, readings) -> np.ndarray:
+        if self.processes > 0 and len(readings) >= self.process_threshold:
+            if hasattr(readings, 'columns'):
+                readings = readings[list(INPUT_FIELDS)].to_numpy(dtype=np.float64)
+            parts = np.array_split(np.asarray(readings, dtype=np.float64), self.processes)
+            return np.concatenate(list(self._get_executor().map(_score_in_worker, parts)))
+
+        # Пакетний шлях не змінює стан системи, тому екземпляр не резервується
+        return self.shared.evaluate_air_quality_batch(readings)
+
+    def describe_air_quality(self, air_quality_score: float, data: Dict[str, Any]) -> Dict[str, Any]:
+        return AdvancedAirQualityFuzzySystem.describe_air_quality(air_quality_score, data)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return {
+            **self.shared.cache_stats(),
+            "pool_size": self.size,
+            "pool_created": self._created,
+            "processes": self.processes,
+        }
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    initializer=_init_worker,
+                    initargs=(self.cache_size, self.quantization_step),
+                )
+            return self._executor
 
 
 def main():
@@ -0,0 +1,45 @@
+"""
+Точки вимірювання в доменних модулях (fuzzy_logic, ai_model) без залежності
+від шару спостереження. Модулі metrics та profiling під час імпорту додають
+спостерігачів; без них observe() повертає порожній контекстний менеджер.
+
+Модуль не імпортує нічого з додатку, тому доменні модулі та CLI
+(навчання, бенчмарки) не тягнуть за собою метрики чи профілювання.
+"""
+from contextlib import ExitStack, contextmanager, nullcontext
+from typing import Callable, ContextManager, List, Tuple
+
+
+# Події: оцінка нечіткою логікою (мітка single/batch), прогноз і завантаження моделі
+FUZZY_EVALUATION = "fuzzy_evaluation"
+MODEL_PREDICT = "model_predict"
+MODEL_LOAD = "model_load"
+
+# Спостерігач: (подія, мітки, кількість рядків) -> контекстний менеджер навколо операції
+Observer = Callable[[str, Tuple[str, ...], int], ContextManager]
+
+_observers: List[Observer] = []
+
+_NOTHING = nullcontext()
+
+
+def add_observer(observer: Observer):
+    if observer not in _observers:
+        _observers.append(observer)
+
+
+def observe(event: str, *labels: str, rows: int = 1) -> ContextManager:
+    """
+    Обгортає операцію події event контекстами всіх спостерігачів
+    """
+    if not _observers:
+        return _NOTHING
+    return _observed(event, labels, rows)
+
+
+@contextmanager
+def _observed(event: str, labels: Tuple[str, ...], rows: int):
+    with ExitStack() as stack:
+        for observer in _observers:
+            stack.enter_context(observer(event, labels, rows))
+        yield
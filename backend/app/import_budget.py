@@ -0,0 +1,78 @@
+"""
+Перевірка часу імпорту додатку: модуль main імпортується в окремому процесі
+(python -X importtime), і перевіряються сумарний час імпорту та те, що важкі
+бібліотеки не завантажуються до першого використання або прогріву.
+
+Запуск з каталогу backend:
+    PYTHONPATH=app python -m app.import_budget [--budget-ms 2000] [--repeat 3]
+Код виходу 1, якщо бюджет перевищено або важку бібліотеку імпортовано.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+
+# Найбільший допустимий час імпорту main (мс); найкращий з --repeat запусків
+IMPORT_TIME_BUDGET_MS = int(os.getenv("IMPORT_TIME_BUDGET_MS", "2000"))
+
+# Бібліотеки, що мають імпортуватися лише під час першого використання
+LAZY_MODULES = ("sklearn", "skfuzzy", "scipy", "pandas", "pyarrow")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def measure_import(module: str = "main") -> Tuple[float, Dict[str, float]]:
+    """
+    Імпортує module у новому процесі. Повертає сумарний час імпорту (мс)
+    та час імпорту (мс) кожного завантаженого модуля.
+    """
+    env = {**os.environ, "PYTHONPATH": os.path.join(BACKEND_DIR, "app")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-W", "ignore", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Не вдалося імпортувати {module}:\n{result.stderr}")
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            modules[match.group(4)] = int(match.group(2)) / 1000
+    return modules[module], modules
+
+
+def loaded_lazy_modules(modules: Dict[str, float]) -> List[str]:
+    return sorted(name for name in LAZY_MODULES if name in modules)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Перевірка бюджету часу імпорту додатку")
+    parser.add_argument("--budget-ms", type=int, default=IMPORT_TIME_BUDGET_MS, help="Бюджет часу імпорту, мс")
+    parser.add_argument("--repeat", type=int, default=3, help="Кількість вимірювань (береться найкраще)")
+    parser.add_argument("--module", default="main", help="Модуль для імпорту")
+    args = parser.parse_args()
+
+    runs = [measure_import(args.module) for _ in range(max(args.repeat, 1))]
+    total, modules = min(runs, key=lambda run: run[0])
+    slowest = sorted(
+        ((name, seconds) for name, seconds in modules.items() if name != args.module and "." not in name),
+        key=lambda item: item[1], reverse=True,
+    )[:5]
+    lazy = loaded_lazy_modules(modules)
+
+    print(f"Імпорт {args.module}: {total:.0f} мс (бюджет {args.budget_ms} мс)")
+    print("Найдовші: " + ", ".join(f"{name} {seconds:.0f} мс" for name, seconds in slowest))
+    if lazy:
+        print(f"Під час імпорту завантажено важкі бібліотеки: {', '.join(lazy)}")
+
+    sys.exit(0 if total <= args.budget_ms and not lazy else 1)
+
+
+if __name__ == "__main__":
+    main()
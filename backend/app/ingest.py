@@ -0,0 +1,213 @@
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import ValidationError
+from sqlalchemy import insert
+
+from models import SensorData, Location
+from schemas import SensorDataCreate
+from schema import ensure_partitions_for
+
+
+# Кількість рядків, що перевіряються та записуються за один раз
+BULK_CHUNK_SIZE = 5000
+
+# Максимальна кількість помилок, що повертаються у звіті
+MAX_REPORTED_ERRORS = 100
+
+# Стовпці sensor_readings, що записуються масовою вставкою
+BULK_COLUMNS = tuple(SensorDataCreate.model_fields) + ('air_quality_score', 'air_quality_category')
+
+CONTENT_TYPES = {
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'application/json-lines': 'ndjson',
+    'text/csv': 'csv',
+}
+
+
+def detect_format(content_type: Optional[str]) -> Optional[str]:
+    """
+    Формат тіла запиту за заголовком Content-Type (ndjson або csv)
+    """
+    if not content_type:
+        return None
+    return CONTENT_TYPES.get(content_type.split(';')[0].strip().lower())
+
+
+async def iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    """
+    Розбиває потокове тіло запиту на рядки, не завантажуючи його повністю в пам'ять.
+    Повертає пари (номер рядка, рядок).
+    """
+    buffer = b""
+    line_number = 0
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            yield line_number, line.decode("utf-8").rstrip("\r")
+    if buffer:
+        yield line_number + 1, buffer.decode("utf-8").rstrip("\r")
+
+
+class IngestReport:
+    """
+    Підсумок масового завантаження: прийняті та відхилені рядки
+    """
+
+    def __init__(self):
+        self.accepted = 0
+        self.rejected = 0
+        self.errors = []
+
+    def reject(self, line_number: int, error: str):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_number, "error": error})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
+
+
+class RowParser:
+    """
+    Перетворює рядки NDJSON або CSV (перший рядок - заголовок) на словники
+    """
+
+    def __init__(self, data_format: str):
+        if data_format not in ('ndjson', 'csv'):
+            raise ValueError(f"Непідтримуваний формат: {data_format}")
+        self.data_format = data_format
+        self.header = None
+
+    def parse(self, lines: List[Tuple[int, str]], report: IngestReport) -> List[Tuple[int, Dict[str, Any]]]:
+        if self.data_format == 'csv':
+            return self._parse_csv(lines, report)
+        return self._parse_ndjson(lines, report)
+
+    @staticmethod
+    def _parse_ndjson(lines, report):
+        rows = []
+        for line_number, line in lines:
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                report.reject(line_number, f"Некоректний JSON: {e}")
+                continue
+            if not isinstance(row, dict):
+                report.reject(line_number, "Очікується JSON-об'єкт")
+                continue
+            rows.append((line_number, row))
+        return rows
+
+    def _parse_csv(self, lines, report):
+        if self.header is None:
+            _, header_line = lines[0]
+            self.header = next(csv.reader([header_line]))
+            lines = lines[1:]
+
+        rows = []
+        for (line_number, _), values in zip(lines, csv.reader(line for _, line in lines)):
+            if len(values) != len(self.header):
+                report.reject(line_number, f"Очікується {len(self.header)} значень, отримано {len(values)}")
+                continue
+            # Порожні значення CSV вважаються відсутніми
+            rows.append((line_number, {
+                column: value for column, value in zip(self.header, values) if value != ''
+            }))
+        return rows
+
+
+def validate_rows(db, rows: List[Tuple[int, Dict[str, Any]]], report: IngestReport) -> List[Dict[str, Any]]:
+    """
+    Перевіряє рядки за схемою SensorDataCreate та наявністю локацій
+    """
+    readings = []
+    line_numbers = []
+    for line_number, row in rows:
+        try:
+            readings.append(SensorDataCreate(**row).model_dump())
+            line_numbers.append(line_number)
+        except ValidationError as e:
+            report.reject(line_number, "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+                for error in e.errors()
+            ))
+
+    location_ids = {reading['location_id'] for reading in readings}
+    known_locations = {
+        location_id for (location_id,) in
+        db.query(Location.id).filter(Location.id.in_(location_ids))
+    } if location_ids else set()
+
+    valid_readings = []
+    for line_number, reading in zip(line_numbers, readings):
+        if reading['location_id'] in known_locations:
+            valid_readings.append(reading)
+        else:
+            report.reject(line_number, f"Локацію з id {reading['location_id']} не знайдено")
+    return valid_readings
+
+
+def bulk_insert_sensor_readings(db, readings: List[Dict[str, Any]]):
+    """
+    Масова вставка вимірювань: COPY для PostgreSQL,
+    insert() з executemany для інших СКБД (зокрема SQLite)
+    """
+    _insert_rows(db, [tuple(reading.get(column) for column in BULK_COLUMNS) for reading in readings])
+
+
+def bulk_insert_sensor_columns(db, columns: Dict[str, Sequence]):
+    """
+    Масова вставка вимірювань у колонковому представленні
+    (списки або масиви NumPy однакової довжини для кожного стовпця BULK_COLUMNS)
+    """
+    _insert_rows(db, list(zip(*(_to_list(columns[column]) for column in BULK_COLUMNS))))
+
+
+def _to_list(values) -> list:
+    if isinstance(values, np.ndarray):
+        if np.issubdtype(values.dtype, np.datetime64):
+            values = values.astype('datetime64[us]')
+        return values.tolist()
+    return list(values)
+
+
+def _insert_rows(db, rows: List[tuple]):
+    if not rows:
+        return
+
+    # Помісячні розділи для нових вимірювань (якщо sensor_readings розбита)
+    timestamp_position = BULK_COLUMNS.index('timestamp')
+    ensure_partitions_for(db.connection(), (row[timestamp_position] for row in rows))
+
+    if db.bind.dialect.name == 'postgresql':
+        _copy_rows(db, rows)
+    else:
+        db.execute(insert(SensorData.__table__), [dict(zip(BULK_COLUMNS, row)) for row in rows])
+
+
+def _copy_rows(db, rows: List[tuple]):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(['' if value is None else value for value in row])
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {SensorData.__tablename__} ({', '.join(BULK_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
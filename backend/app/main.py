@@ -1,12 +1,17 @@
+import os
+
+from anyio import to_thread
 from fastapi import FastAPI
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from api import router
-from db import Base, engine
-
-
-# Створення таблиць
-Base.metadata.create_all(bind=engine)
+from api import model_registry, router
+from db import ASYNC_DB, SessionLocal, engine, dispose_async_engine
+from rollups import rebuild_rollups, rollups_missing
+from metrics import CONTENT_TYPE, METRICS_ENABLED, MetricsMiddleware, instrument_engines, registry
+from profiling import PROFILING_ENABLED, ProfilingMiddleware
+from schema import setup_schema
+from warmup import start_warm_up
 
 # Ініціалізація FastAPI додатку
 app = FastAPI(title="Environmental Monitoring System")
@@ -20,8 +25,66 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Профілювання окремих запитів за заголовком X-Profile або шляхом (PROFILING_TOKEN, PROFILE_PATHS);
+# підключається до метрик, щоб час профілювання входив у затримку запиту
+if PROFILING_ENABLED:
+    instrument_engines()
+    app.add_middleware(ProfilingMiddleware)
+
+# Метрики у форматі Prometheus: затримка запитів за маршрутом, SQL-запити на запит,
+# нечітка логіка, модель, пул з'єднань (METRICS_ENABLED=false вимикає збір і /metrics)
+if METRICS_ENABLED:
+    instrument_engines()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return Response(registry.render(), media_type=CONTENT_TYPE)
+
+# Асинхронні ендпоінти читання реєструються першими і замінюють синхронні з тими самими шляхами
+if ASYNC_DB:
+    from async_api import router as async_router
+
+    app.include_router(async_router, prefix="/api")
+
 app.include_router(router, prefix="/api")
 
+# Кількість потоків для синхронних ендпоінтів (за замовчуванням у Starlette - 40)
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+
+
+@app.on_event("startup")
+def prepare_database():
+    # Створення таблиць, нових стовпців та індексів у вже існуючих таблицях
+    setup_schema(engine)
+
+    # Початкова побудова зведених таблиць для вимірювань, записаних до їх появи
+    with SessionLocal() as session:
+        if rollups_missing(session):
+            rebuild_rollups(session)
+
+
+@app.on_event("startup")
+def configure_threadpool():
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
+
+@app.on_event("startup")
+def prepare_model_registry():
+    # Модель, збережена до появи реєстру, переноситься в реєстр один раз
+    model_registry.import_legacy()
+
+
+@app.on_event("startup")
+def warm_up_subsystems():
+    # Система нечіткої логіки та модель завантажуються після старту (WARMUP_MODE)
+    start_warm_up(model_registry)
+
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    await dispose_async_engine()
+
 # Приклад використання
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,400 @@
+"""
+Метрики додатку в текстовому форматі Prometheus (GET /metrics):
+гістограми затримки запитів за маршрутом, кількість і час SQL-запитів
+на запит (події рушія SQLAlchemy), час оцінки нечіткою логікою та кількість
+оцінених вимірювань, час завантаження моделі й прогнозування, заповненість
+пулу з'єднань.
+
+Значення зберігаються в пам'яті процесу: з кількома робочими процесами
+кожен віддає власні метрики.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import hooks
+
+
+# Збір метрик запитів і SQL та ендпоінт /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Межі кошиків гістограм (с, кількість запитів, кількість вимірювань)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+ROWS_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+# Маршрут запитів, що не відповідають жодному шляху (щоб не створювати мітку на кожен URL)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def collect(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in sorted(values.items())
+        ]
+
+
+class Gauge(Metric):
+    """
+    Поточне значення; function (якщо вказано) обчислює значення під час збору
+    у вигляді {значення міток: значення}
+    """
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        function: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def collect(self) -> List[str]:
+        if self.function is not None:
+            values = self.function()
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in sorted(values.items())
+        ]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # Значення міток -> (кількість спостережень у кожному кошику, сума)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            counts, total = self._values.get(labels) or ([0] * len(self.buckets), 0.0)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[labels] = (counts, total + value)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = {labels: (list(counts), total) for labels, (counts, total) in self._values.items()}
+
+        lines = self.header()
+        for labels, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames + ("le",), labels + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "Час обробки HTTP-запиту (до надсилання всього тіла відповіді)",
+    ("method", "route", "status"),
+))
+HTTP_REQUESTS_IN_PROGRESS = registry.register(Gauge(
+    "http_requests_in_progress", "Кількість запитів, що обробляються", ("method",),
+))
+DB_QUERIES_PER_REQUEST = registry.register(Histogram(
+    "db_queries_per_request", "Кількість SQL-запитів на HTTP-запит", ("route",), QUERY_COUNT_BUCKETS,
+))
+DB_QUERY_TIME_PER_REQUEST = registry.register(Histogram(
+    "db_query_seconds_per_request", "Сумарний час SQL-запитів на HTTP-запит", ("route",),
+))
+DB_QUERY_DURATION = registry.register(Histogram(
+    "db_query_duration_seconds", "Час виконання SQL-запиту", ("statement",),
+))
+FUZZY_EVALUATION_DURATION = registry.register(Histogram(
+    "fuzzy_evaluation_duration_seconds", "Час оцінки якості повітря нечіткою логікою", ("mode",),
+))
+FUZZY_ROWS_SCORED = registry.register(Counter(
+    "fuzzy_rows_scored_total", "Кількість вимірювань, оцінених нечіткою логікою", ("mode",),
+))
+MODEL_LOAD_DURATION = registry.register(Histogram(
+    "model_load_duration_seconds", "Час завантаження версії моделі з диска",
+))
+MODEL_PREDICT_DURATION = registry.register(Histogram(
+    "model_predict_duration_seconds", "Час виклику моделі для прогнозування",
+))
+MODEL_PREDICT_ROWS = registry.register(Histogram(
+    "model_predict_rows", "Кількість рядків в одному виклику моделі", buckets=ROWS_BUCKETS,
+))
+
+
+def _pool_values(attribute: str) -> Dict[Tuple[str, ...], float]:
+    import db
+
+    values = {}
+    for name, engine in (("sync", db.engine), ("async", db.async_engine)):
+        pool = getattr(engine, "pool", None) if engine is not None else None
+        if pool is None or not hasattr(pool, "checkedout"):
+            continue
+        size, checked_out, overflow = pool.size(), pool.checkedout(), pool.overflow()
+        # Найбільша кількість з'єднань: розмір пулу та дозволене перевищення
+        capacity = size + max(getattr(pool, "_max_overflow", 0), 0)
+        values[(name,)] = {
+            "size": size,
+            "checked_out": checked_out,
+            "overflow": max(overflow, 0),
+            "saturation": checked_out / capacity if capacity else 0.0,
+        }[attribute]
+    return values
+
+
+for _attribute, _documentation in (
+    ("size", "Розмір пулу з'єднань"),
+    ("checked_out", "З'єднання, видані з пулу"),
+    ("overflow", "З'єднання понад розмір пулу"),
+    ("saturation", "Частка виданих з'єднань від найбільшої кількості (розмір + перевищення)"),
+):
+    registry.register(Gauge(
+        f"db_pool_{_attribute}", _documentation, ("engine",),
+        function=lambda attribute=_attribute: _pool_values(attribute),
+    ))
+
+
+@contextmanager
+def timed(histogram: Histogram, *labels: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started, *labels)
+
+
+def _observe(event: str, labels: Tuple[str, ...], rows: int):
+    # Спостерігач подій доменних модулів (hooks): лічильники та тривалість операцій
+    if event == hooks.FUZZY_EVALUATION:
+        FUZZY_ROWS_SCORED.inc(*labels, amount=rows)
+        return timed(FUZZY_EVALUATION_DURATION, *labels)
+    if event == hooks.MODEL_PREDICT:
+        MODEL_PREDICT_ROWS.observe(rows)
+        return timed(MODEL_PREDICT_DURATION)
+    if event == hooks.MODEL_LOAD:
+        return timed(MODEL_LOAD_DURATION)
+    return _NOTHING
+
+
+_NOTHING = nullcontext()
+
+if METRICS_ENABLED:
+    hooks.add_observer(_observe)
+
+
+class RequestStats:
+    """
+    SQL-запити поточного HTTP-запиту. Об'єкт спільний для контексту запиту
+    та копій контексту в потоках пулу, де виконуються синхронні ендпоінти.
+    """
+
+    __slots__ = ("queries", "query_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+_QUERY_STARTS = "metrics_query_starts"
+
+
+@contextmanager
+def request_stats():
+    """
+    Лічильники SQL-запитів поточного HTTP-запиту: вже встановлені
+    в контексті (MetricsMiddleware) або нові на час блоку
+    """
+    stats = _request_stats.get()
+    if stats is not None:
+        yield stats
+        return
+    stats = RequestStats()
+    token = _request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_stats.reset(token)
+
+
+def _statement_kind(statement: str) -> str:
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword if keyword in ("SELECT", "INSERT", "UPDATE", "DELETE", "COPY", "WITH") else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_QUERY_STARTS, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get(_QUERY_STARTS)
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    DB_QUERY_DURATION.observe(duration, _statement_kind(statement))
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += duration
+
+
+def _handle_error(context):
+    # Для запиту з помилкою after_cursor_execute не викликається
+    connection = context.connection
+    if connection is not None:
+        starts = connection.info.get(_QUERY_STARTS)
+        if starts:
+            starts.pop()
+
+
+def instrument_engines():
+    """
+    Підключає лічильники SQL-запитів до всіх рушіїв (зокрема синхронного
+    рушія в основі асинхронного)
+    """
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: час обробки запиту за шаблоном маршруту (/api/air-quality/location/{location_id}),
+    методом і статусом, а також кількість і час SQL-запитів на запит
+    """
+
+    def __init__(self, app, excluded_paths: Iterable[str] = ("/metrics",)):
+        self.app = app
+        self.excluded_paths = frozenset(excluded_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        # Лічильники спільні з ProfilingMiddleware незалежно від порядку підключення
+        with request_stats() as stats:
+            HTTP_REQUESTS_IN_PROGRESS.inc(method)
+            started = time.perf_counter()
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                duration = time.perf_counter() - started
+                HTTP_REQUESTS_IN_PROGRESS.dec(method)
+
+                route = route_template(scope)
+                HTTP_REQUEST_DURATION.observe(duration, method, route, str(status))
+                DB_QUERIES_PER_REQUEST.observe(stats.queries, route)
+                DB_QUERY_TIME_PER_REQUEST.observe(stats.query_seconds, route)
+
+
+def route_template(scope) -> str:
+    """
+    Шаблон шляху маршруту з префіксом роутера. У новіших FastAPI маршрут
+    підключеного роутера зберігає шлях без префікса, а повний - у контексті маршруту.
+    """
+    context = (scope.get("fastapi") or {}).get("effective_route_context")
+    route = context if context is not None else scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or UNMATCHED_ROUTE
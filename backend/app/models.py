@@ -1,15 +1,39 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+import os
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, Table
 from sqlalchemy.orm import relationship
 from db import Base
 
 
+# Стовпці вимірювань sensor_readings, що агрегуються в зведених таблицях
+MEASUREMENT_FIELDS = (
+    'nitrogen_dioxide', 'sulfur_dioxide', 'carbon_monoxide', 'ozone',
+    'pm2_5', 'pm10', 'lead', 'cadmium',
+    'temperature', 'humidity', 'wind_speed', 'wind_direction', 'radiation_level',
+)
+
+# Агрегати, що зберігаються для кожного показника в зведених таблицях
+# (count - кількість вимірювань, де показник не NULL, знаменник середнього)
+ROLLUP_AGGREGATES = ('count', 'sum', 'min', 'max')
+
+# Додаткові стовпці складеного індексу (location_id, timestamp) на PostgreSQL (INCLUDE),
+# щоб запити лише за цими стовпцями виконувались скануванням тільки індексу
+SENSOR_INDEX_INCLUDE = [field for field in os.getenv('SENSOR_INDEX_INCLUDE', '').split(',') if field]
+
+
 class SensorData(Base):
     __tablename__ = "sensor_readings"
+    __table_args__ = (
+        # Запити локації за період: діапазонне сканування, впорядковане за часом
+        Index(
+            'ix_sensor_readings_location_timestamp', 'location_id', 'timestamp',
+            postgresql_include=SENSOR_INDEX_INCLUDE,
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     sensor_id = Column(String, index=True)
-    location_id = Column(Integer, ForeignKey('locations.id'), index=True)
+    location_id = Column(Integer, ForeignKey('locations.id'))
     timestamp = Column(DateTime, default=datetime.utcnow, index=True)
 
     # Основні показники забруднення
@@ -33,9 +57,23 @@ class SensorData(Base):
     wind_direction = Column(Float)
     radiation_level = Column(Float)
 
+    # Оцінка якості повітря, обчислена нечіткою логікою під час запису
+    air_quality_score = Column(Float, nullable=True)
+    air_quality_category = Column(String, nullable=True)
+
     location_obj = relationship("Location", back_populates="sensor_data")
 
 
+class PollutionPrediction(Base):
+    __tablename__ = "pollution_predictions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sensor_reading_id = Column(Integer, ForeignKey('sensor_readings.id'), index=True)
+    model_version = Column(String, index=True)
+    predicted_value = Column(Float)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 class Location(Base):
     __tablename__ = "locations"
 
@@ -45,3 +83,25 @@ class Location(Base):
     longitude = Column(Float, nullable=True)
 
     sensor_data = relationship("SensorData", back_populates="location_obj")
+
+
+def _rollup_table(name: str) -> Table:
+    # Зведення вимірювань за інтервал часу: кількість, сума, мінімум і максимум кожного показника.
+    # Стовпці <показник>_count допускають NULL, щоб додаватися до наявних таблиць;
+    # NULL означає, що зведення побудоване до їх появи і має бути перебудоване
+    return Table(
+        name,
+        Base.metadata,
+        Column('location_id', Integer, ForeignKey('locations.id'), primary_key=True),
+        Column('bucket_start', DateTime, primary_key=True),
+        Column('reading_count', Integer, nullable=False),
+        *[
+            Column(f'{field}_{aggregate}', Integer if aggregate == 'count' else Float)
+            for field in MEASUREMENT_FIELDS
+            for aggregate in ROLLUP_AGGREGATES
+        ],
+    )
+
+
+hourly_rollups = _rollup_table("sensor_rollups_hourly")
+daily_rollups = _rollup_table("sensor_rollups_daily")
@@ -0,0 +1,68 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import or_
+
+from models import SensorData
+
+
+# Максимальний розмір сторінки
+MAX_PAGE_SIZE = 10000
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """
+    Непрозорий курсор сторінки з ключа (timestamp, id) останнього рядка
+    """
+    payload = json.dumps({"t": timestamp.isoformat(), "i": row_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(payload["t"]), int(payload["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Некоректний курсор: {cursor}") from e
+
+
+def keyset_page(query, limit: int, cursor: Optional[str] = None,
+                timestamp_column=SensorData.timestamp, id_column=SensorData.id):
+    """
+    Сторінка запиту з пагінацією за ключем (timestamp, id) замість OFFSET:
+    кожна сторінка - діапазонне сканування індексу від позиції курсора,
+    тому її вартість не залежить від номера сторінки.
+    Повертає (рядки сторінки, next_cursor або None для останньої сторінки).
+    """
+    rows = keyset_query(query, limit, cursor, timestamp_column, id_column).all()
+    return keyset_result(rows, limit)
+
+
+def keyset_query(query, limit: int, cursor: Optional[str] = None,
+                 timestamp_column=SensorData.timestamp, id_column=SensorData.id):
+    """
+    Запит сторінки (Query або select) з позиції курсора: на один рядок більше
+    за limit, щоб визначити, чи є наступна сторінка
+    """
+    if cursor:
+        last_timestamp, last_id = decode_cursor(cursor)
+        # Перша умова обмежує діапазон за індексом, друга відкидає вже видані рядки
+        query = query.filter(
+            timestamp_column >= last_timestamp,
+            or_(timestamp_column > last_timestamp, id_column > last_id)
+        )
+    return query.order_by(timestamp_column, id_column).limit(limit + 1)
+
+
+def keyset_result(rows: List, limit: int) -> Tuple[List, Optional[str]]:
+    """
+    Рядки сторінки та next_cursor з результату keyset_query
+    """
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].id)
+    return rows, next_cursor
@@ -0,0 +1,233 @@
+"""
+Перевірка планів запитів: гарячі запити до sensor_readings (якість повітря
+та дані локації за період) мають виконуватись діапазонним скануванням
+індексу, а не повним скануванням таблиці.
+
+SQLite (за замовчуванням - тимчасова база): статистика планувальника
+(sqlite_stat1) задається для --rows вимірювань без запису самих даних.
+PostgreSQL: з --seed у порожню таблицю вставляється --rows згенерованих
+вимірювань (для 100 млн потрібні десятки ГБ і час), далі ANALYZE.
+
+Запуск з каталогу backend:
+    PYTHONPATH=app python -m app.plan_check
+    PYTHONPATH=app python -m app.plan_check --database-url postgresql://... --seed --rows 100000000
+Код виходу 1, якщо хоч один план не використовує індекс.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import create_engine, func, inspect, or_, select, text
+
+from fuzzy_logic import INPUT_FIELDS
+from models import SensorData
+from schema import ensure_partitions, setup_schema
+
+
+PLAN_CHECK_ROWS = 100_000_000
+PLAN_CHECK_LOCATIONS = 1000
+
+# Вимірювання кожної локації щогодини, починаючи з цієї дати
+SEED_START = datetime(2015, 1, 1)
+
+# Типи вузлів плану PostgreSQL, що читають таблицю через індекс
+INDEX_SCAN_NODES = ('Index Scan', 'Index Only Scan', 'Bitmap Index Scan', 'Bitmap Heap Scan')
+
+# Індекси моделі, що починаються з location_id (складений та його покриваючий варіант);
+# індекси розділів PostgreSQL мають автоматичні назви ..._location_id_timestamp_..._idx
+LOCATION_INDEXES = tuple(
+    index.name for index in SensorData.__table__.indexes if list(index.columns)[0].name == 'location_id'
+)
+LOCATION_INDEX_MARKER = '_location_id_timestamp'
+
+# Запити за кількома локаціями, для яких достатньо будь-якого діапазонного сканування індексу
+ANY_INDEX_QUERIES = ('comparative_statistics',)
+
+
+def hot_queries(location_id: int, location_ids: List[int], start: datetime, end: datetime) -> Dict:
+    """
+    Запити тієї ж форми, що й в ендпоінтах /air-quality/* та /sensor-data/*
+    """
+    filters = (SensorData.location_id == location_id, SensorData.timestamp.between(start, end))
+    score = SensorData.air_quality_score
+    reading_columns = (SensorData.timestamp, score, *[getattr(SensorData, field) for field in INPUT_FIELDS])
+
+    return {
+        'air_quality_statistics': select(
+            func.count(SensorData.id), func.count(score), func.avg(score), func.max(score), func.min(score)
+        ).where(*filters),
+        'air_quality_representative': select(*reading_columns)
+        .where(*filters, score.isnot(None))
+        .order_by(func.abs(score - 5.0), SensorData.timestamp)
+        .limit(1),
+        'air_quality_details': select(*reading_columns).where(*filters).order_by(SensorData.timestamp),
+        'sensor_data_location': select(*SensorData.__table__.columns).where(*filters).order_by(SensorData.timestamp),
+        'sensor_data_page': select(*SensorData.__table__.columns)
+        .where(*filters, SensorData.timestamp >= start, or_(SensorData.timestamp > start, SensorData.id > 0))
+        .order_by(SensorData.timestamp, SensorData.id)
+        .limit(1001),
+        'comparative_statistics': select(SensorData.location_id, func.count(SensorData.id), func.avg(score))
+        .where(SensorData.location_id.in_(location_ids), SensorData.timestamp.between(start, end))
+        .group_by(SensorData.location_id),
+    }
+
+
+def simulate_sqlite_statistics(bind, rows: int, locations: int):
+    """
+    Статистика планувальника SQLite для таблиці з rows вимірюваннями
+    locations локацій (по одному вимірюванню локації на момент часу)
+    """
+    per_location = max(rows // locations, 1)
+    statistics = {
+        'ix_sensor_readings_location_timestamp': f'{rows} {per_location} 1',
+        'ix_sensor_readings_timestamp': f'{rows} {locations}',
+        'ix_sensor_readings_sensor_id': f'{rows} {per_location}',
+        'ix_sensor_readings_id': f'{rows} 1',
+    }
+    with bind.begin() as connection:
+        connection.execute(text('ANALYZE'))
+        connection.execute(text("DELETE FROM sqlite_stat1 WHERE tbl = 'sensor_readings'"))
+        for index_name, stat in statistics.items():
+            connection.execute(
+                text("INSERT INTO sqlite_stat1 (tbl, idx, stat) VALUES ('sensor_readings', :idx, :stat)"),
+                {"idx": index_name, "stat": stat},
+            )
+    # Статистика читається планувальником під час відкриття з'єднання
+    bind.dispose()
+
+
+def seed_postgresql(bind, rows: int, locations: int):
+    """
+    Вставляє rows згенерованих вимірювань (щогодини для кожної з locations локацій)
+    у порожню таблицю одним запитом на сервері
+    """
+    with bind.connect() as connection:
+        if connection.execute(select(SensorData.id).limit(1)).first() is not None:
+            print("sensor_readings не порожня, дані не додаються")
+            return
+
+    hours = -(-rows // locations)
+    ensure_partitions(bind, SEED_START, SEED_START + timedelta(hours=hours))
+    measurements = ', '.join(f'random() * 100' for _ in range(13))
+    with bind.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO locations (id, name) SELECT n, 'plan-check-' || n "
+            "FROM generate_series(1, :locations) AS n ON CONFLICT DO NOTHING"
+        ), {"locations": locations})
+        connection.execute(text(
+            "INSERT INTO sensor_readings (sensor_id, location_id, timestamp, nitrogen_dioxide, sulfur_dioxide, "
+            "carbon_monoxide, ozone, pm2_5, pm10, lead, cadmium, temperature, humidity, wind_speed, "
+            "wind_direction, radiation_level, air_quality_score) "
+            f"SELECT 'sensor_' || (n % :locations + 1), n % :locations + 1, "
+            f":start + (n / :locations) * interval '1 hour', {measurements}, random() * 10 "
+            "FROM generate_series(0, :rows - 1) AS n"
+        ), {"locations": locations, "rows": rows, "start": SEED_START})
+    with bind.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.execute(text('ANALYZE sensor_readings'))
+
+
+def explain(bind, statement) -> Tuple[List[Tuple[bool, str]], str]:
+    """
+    Читання sensor_readings у плані запиту як [(через індекс, назва індексу)]
+    та короткий опис плану
+    """
+    compiled = statement.compile(dialect=bind.dialect, compile_kwargs={"literal_binds": True})
+    with bind.connect() as connection:
+        if bind.dialect.name == 'sqlite':
+            details = [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}')]
+            reads = [
+                (detail.startswith('SEARCH') and ' INDEX ' in detail,
+                 detail.split(' INDEX ', 1)[1].split(' ', 1)[0] if ' INDEX ' in detail else '')
+                for detail in details if 'sensor_readings' in detail
+            ]
+            return reads, '; '.join(details)
+
+        plan = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {compiled}').scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        nodes = list(_plan_nodes(plan[0]['Plan']))
+        reads = [
+            (node['Node Type'] in INDEX_SCAN_NODES, node.get('Index Name', ''))
+            for node in nodes
+            if node.get('Relation Name', '').startswith('sensor_readings')
+            or 'sensor_readings' in node.get('Index Name', '')
+        ]
+        summary = '; '.join(
+            f"{node['Node Type']} {node.get('Index Name') or node.get('Relation Name', '')}".strip() for node in nodes
+        )
+        return reads, summary
+
+
+def uses_index(reads: List[Tuple[bool, str]], location_index: bool) -> bool:
+    """
+    Усі читання sensor_readings - через індекс, а для запитів однієї локації
+    хоча б одне - через індекс, що починається з location_id
+    """
+    if not reads or not all(indexed for indexed, _ in reads):
+        return False
+    if not location_index:
+        return True
+    return any(name in LOCATION_INDEXES or LOCATION_INDEX_MARKER in name for _, name in reads)
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _plan_nodes(child)
+
+
+def check_plans(bind, locations: int) -> bool:
+    location_ids = list(range(1, min(locations, 20) + 1))
+    start = SEED_START + timedelta(days=30)
+    end = start + timedelta(days=30)
+
+    passed = True
+    for name, statement in hot_queries(location_ids[0], location_ids, start, end).items():
+        reads, plan = explain(bind, statement)
+        indexed = uses_index(reads, location_index=name not in ANY_INDEX_QUERIES)
+        passed &= indexed
+        print(f"{'OK  ' if indexed else 'FAIL'} {name}: {plan}")
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Перевірка використання індексів гарячими запитами")
+    parser.add_argument("--database-url", help="База для перевірки (за замовчуванням - тимчасова SQLite)")
+    parser.add_argument("--rows", type=int, default=PLAN_CHECK_ROWS, help="Кількість вимірювань")
+    parser.add_argument("--locations", type=int, default=PLAN_CHECK_LOCATIONS, help="Кількість локацій")
+    parser.add_argument("--seed", action="store_true", help="PostgreSQL: заповнити порожню таблицю згенерованими вимірюваннями")
+    args = parser.parse_args()
+
+    temporary = None
+    url = args.database_url
+    if not url:
+        temporary = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        temporary.close()
+        url = f'sqlite:///{temporary.name}'
+
+    bind = create_engine(url)
+    try:
+        setup_schema(bind)
+        if bind.dialect.name == 'sqlite':
+            simulate_sqlite_statistics(bind, args.rows, args.locations)
+        elif args.seed:
+            seed_postgresql(bind, args.rows, args.locations)
+
+        rows = args.rows if bind.dialect.name == 'sqlite' or args.seed else None
+        print(f"{bind.dialect.name}, вимірювань: {rows or 'наявні дані'}, індекси: "
+              f"{', '.join(index['name'] for index in inspect(bind).get_indexes('sensor_readings'))}")
+        passed = check_plans(bind, args.locations)
+    finally:
+        bind.dispose()
+        if temporary is not None:
+            os.remove(temporary.name)
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
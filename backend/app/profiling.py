@@ -0,0 +1,302 @@
+"""
+Профілювання окремих запитів на вимогу. Запит профілюється, якщо він містить
+заголовок X-Profile зі значенням PROFILING_TOKEN або його шлях починається
+з одного з префіксів PROFILE_PATHS. Для такого запиту:
+- семплювальний профайлер періодично знімає стеки потоку циклу подій та потоків,
+  що виконують етапи запиту (ендпоінти виконуються в пулі потоків);
+- етапи, позначені stage() (orm, fuzzy, encode), вимірюються разом із часом
+  SQL-запитів у них (події рушія SQLAlchemy).
+
+Розбивка часу за етапами повертається в заголовку Server-Timing, ідентифікатор
+профілю - в X-Profile-Id. У PROFILE_DIR зберігаються <id>.json (розбивка)
+та <id>.collapsed (стеки у форматі flamegraph.pl / speedscope / inferno).
+
+Без PROFILING_TOKEN і PROFILE_PATHS middleware не підключається,
+а stage() повертає порожній контекстний менеджер.
+"""
+import hmac
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from starlette.datastructures import MutableHeaders
+
+import hooks
+from metrics import request_stats
+
+
+# Значення заголовка X-Profile, за яким запит профілюється (порожнє - заголовок ігнорується)
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+
+# Префікси шляхів, усі запити до яких профілюються (через кому)
+PROFILE_PATHS = tuple(path.strip() for path in os.getenv("PROFILE_PATHS", "").split(",") if path.strip())
+
+PROFILING_ENABLED = bool(PROFILING_TOKEN or PROFILE_PATHS)
+
+# Каталог збережених профілів
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "geo_monitoring_profiles"))
+
+# Інтервал семплювання стеків, с. Потік профайлера отримує GIL не частіше
+# за sys.getswitchinterval() (5 мс), поки інші потоки виконують Python-код.
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+
+PROFILE_HEADER = b"x-profile"
+
+# Етапи, що не потрапили до stage(): маршрутизація, валідація, залежності,
+# кеш відповідей, надсилання відповіді
+OTHER_STAGE = "other"
+
+_session: ContextVar[Optional["ProfileSession"]] = ContextVar("profile_session", default=None)
+
+_NO_STAGE = nullcontext()
+
+logger = logging.getLogger(__name__)
+
+
+def stage(name: str):
+    """
+    Етап запиту (orm, fuzzy, encode) для розбивки часу профільованого запиту.
+    Етапи з однаковою назвою підсумовуються і не повинні бути вкладеними.
+    """
+    session = _session.get()
+    if session is None:
+        return _NO_STAGE
+    return session.stage(name)
+
+
+def _observe(event: str, labels, rows: int):
+    # Оцінка нечіткою логікою в доменних модулях (hooks) - етап fuzzy
+    return stage("fuzzy") if event == hooks.FUZZY_EVALUATION else _NO_STAGE
+
+
+if PROFILING_ENABLED:
+    hooks.add_observer(_observe)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def _idle(frame) -> bool:
+    # Цикл подій очікує на введення-виведення (зокрема на завершення ендпоінта в пулі потоків)
+    return frame.f_code.co_filename.endswith("selectors.py")
+
+
+class StackSampler:
+    """
+    Семплювальний профайлер: окремий потік кожні interval секунд знімає
+    стеки потоків запиту (sys._current_frames) і рахує однакові стеки
+    """
+
+    def __init__(self, session: "ProfileSession", interval: float = PROFILE_INTERVAL):
+        self.session = session
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.idle_samples = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id, thread_name in self.session.threads():
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                if _idle(frame):
+                    self.idle_samples += 1
+                    continue
+                self.stacks[f"{thread_name};{_collapse(frame)}"] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileSession:
+    """
+    Профіль одного запиту. Об'єкт спільний для контексту запиту та копій
+    контексту в потоках пулу, тож етапи ендпоінтів реєструють свої потоки.
+    """
+
+    def __init__(self, scope, stats, interval: float = PROFILE_INTERVAL):
+        self.id = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.query_string = scope.get("query_string", b"").decode("latin-1")
+        self.stats = stats
+        self.status: Optional[int] = None
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.started = time.perf_counter()
+        self.response_started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+        self._lock = threading.Lock()
+        # Потік -> (назва, кількість активних етапів у ньому); потік циклу подій - на весь запит
+        self._threads: Dict[int, list] = {threading.get_ident(): ["event-loop", 1]}
+        self.sampler = StackSampler(self, interval)
+
+    def threads(self):
+        with self._lock:
+            return [(thread_id, name) for thread_id, (name, _) in self._threads.items()]
+
+    @contextmanager
+    def stage(self, name: str):
+        thread_id = threading.get_ident()
+        with self._lock:
+            entry = self._threads.setdefault(thread_id, [threading.current_thread().name, 0])
+            entry[1] += 1
+        queries, sql_seconds = self.stats.queries, self.stats.query_seconds
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._threads[thread_id]
+                totals = self.stages.setdefault(
+                    name, {"seconds": 0.0, "calls": 0, "sql_queries": 0, "sql_seconds": 0.0}
+                )
+                totals["seconds"] += seconds
+                totals["calls"] += 1
+                totals["sql_queries"] += self.stats.queries - queries
+                totals["sql_seconds"] += self.stats.query_seconds - sql_seconds
+
+    def breakdown(self, until: float) -> Dict[str, float]:
+        """
+        Час запиту (с) за етапами без SQL-запитів у них, окремо - SQL
+        та решта (other); сума дорівнює загальному часу до until
+        """
+        with self._lock:
+            result = {name: totals["seconds"] - totals["sql_seconds"] for name, totals in self.stages.items()}
+        result["sql"] = self.stats.query_seconds
+        result[OTHER_STAGE] = max(until - self.started - sum(result.values()), 0.0)
+        return result
+
+    def server_timing(self) -> str:
+        until = self.response_started or time.perf_counter()
+        parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.breakdown(until).items()]
+        parts.append(f"total;dur={(until - self.started) * 1000:.2f}")
+        return ", ".join(parts)
+
+    def report(self) -> Dict[str, Any]:
+        finished = self.finished or time.perf_counter()
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "query_string": self.query_string,
+            "status": self.status,
+            "total_seconds": round(finished - self.started, 6),
+            "response_start_seconds": (
+                round(self.response_started - self.started, 6) if self.response_started else None
+            ),
+            "sql": {"queries": self.stats.queries, "seconds": round(self.stats.query_seconds, 6)},
+            "stages": {
+                name: {key: round(value, 6) for key, value in totals.items()}
+                for name, totals in self.stages.items()
+            },
+            "breakdown_seconds": {
+                name: round(seconds, 6) for name, seconds in self.breakdown(finished).items()
+            },
+            "samples": sum(self.sampler.stacks.values()),
+            "idle_samples": self.sampler.idle_samples,
+            "sample_interval_seconds": self.sampler.interval,
+        }
+
+    def save(self, directory: str = PROFILE_DIR) -> str:
+        """
+        Зберігає розбивку (<id>.json) та стеки (<id>.collapsed); повертає шлях до JSON
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.id}.json")
+        with open(os.path.join(directory, f"{self.id}.collapsed"), "w", encoding="utf-8") as f:
+            f.write(self.sampler.collapsed())
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        return path
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI-middleware: профілює запити з заголовком X-Profile: <PROFILING_TOKEN>
+    або зі шляхом з PROFILE_PATHS, решту передає без змін
+    """
+
+    def __init__(self, app, token: str = PROFILING_TOKEN, paths=PROFILE_PATHS, directory: str = PROFILE_DIR):
+        self.app = app
+        self.token = token.encode()
+        self.paths = tuple(paths)
+        self.directory = directory
+
+    def requested(self, scope) -> bool:
+        if self.paths and scope["path"].startswith(self.paths):
+            return True
+        if not self.token:
+            return False
+        value = _header(scope, PROFILE_HEADER)
+        return value is not None and hmac.compare_digest(value.encode("latin-1"), self.token)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                session.status = message["status"]
+                session.response_started = time.perf_counter()
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", session.server_timing())
+                headers.append("X-Profile-Id", session.id)
+            await send(message)
+
+        with request_stats() as stats:
+            session = ProfileSession(scope, stats)
+            token = _session.set(session)
+            session.sampler.start()
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                session.finished = time.perf_counter()
+                session.sampler.stop()
+                _session.reset(token)
+                try:
+                    path = session.save(self.directory)
+                    logger.info("Профіль запиту %s %s збережено: %s", session.method, session.path, path)
+                except OSError as e:
+                    logger.warning("Не вдалося зберегти профіль запиту %s: %s", session.id, e)
@@ -0,0 +1,272 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from encoding import MSGPACK_MEDIA_TYPE, encoded_response, wants_msgpack
+
+
+# Сховище кешу відповідей: lru (у пам'яті процесу), redis (спільний для всіх процесів) або none
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "lru")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+
+# Найбільший час життя запису (с). Обмежує застарівання відповідей із періодом
+# за замовчуванням (останні N днів від поточного часу), які не змінюються записом вимірювань
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "60"))
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Ключ у Session.info з локаціями, вимірювання яких змінено в поточній транзакції
+CHANGED_LOCATIONS_KEY = "changed_locations"
+
+
+class LRUCacheBackend:
+    """
+    Сховище в пам'яті процесу з витісненням найдавніше використаних записів
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generations(self, names: List[str]) -> List[int]:
+        with self._lock:
+            return [self._generations.get(name, 0) for name in names]
+
+    def bump(self, names: Iterable[str]):
+        with self._lock:
+            for name in names:
+                self._generations[name] = self._generations.get(name, 0) + 1
+
+
+class RedisCacheBackend:
+    """
+    Сховище в Redis (або сумісному сервері): client - об'єкт з інтерфейсом redis-py
+    (get, set, mget, pipeline/incr). Лічильники поколінь спільні для всіх процесів.
+    """
+
+    def __init__(self, client, prefix: str = "geo:response:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str = REDIS_URL, **kwargs):
+        import redis
+
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: int):
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def generations(self, names: List[str]) -> List[int]:
+        values = self.client.mget([f"{self.prefix}generation:{name}" for name in names])
+        return [int(value or 0) for value in values]
+
+    def bump(self, names: Iterable[str]):
+        pipeline = self.client.pipeline()
+        for name in names:
+            pipeline.incr(f"{self.prefix}generation:{name}")
+        pipeline.execute()
+
+
+class ResponseCache:
+    """
+    Кеш закодованих відповідей з ключем за нормалізованими параметрами ендпоінту.
+
+    Запис залежить від поколінь локацій, для яких він обчислений (або покоління
+    "all" для запитів без переліку локацій). Запис чи видалення вимірювань локації
+    збільшує її покоління та покоління "all", тож старі записи стають недосяжними
+    й витісняються або застарівають за TTL. Кожна відповідь має ETag; запит з
+    If-None-Match, що збігається, отримує 304 без тіла.
+    """
+
+    def __init__(self, backend=None, ttl: int = RESPONSE_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def key(self, endpoint: str, params: Dict[str, Any], locations: Optional[Iterable[int]], media_type: str) -> str:
+        names = [f"location:{location_id}" for location_id in sorted(set(locations))] if locations else ["all"]
+        generations = self.backend.generations(names)
+        normalized = json.dumps(params, sort_keys=True, default=str)
+        source = f"{endpoint}|{media_type}|{normalized}|{list(zip(names, generations))}"
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+    def respond(
+        self,
+        request: Request,
+        endpoint: str,
+        params: Dict[str, Any],
+        locations: Optional[Iterable[int]],
+        build: Callable[[], Any]
+    ) -> Response:
+        """
+        Відповідь з кешу або з результату build() (вміст або Response).
+        Кешуються лише відповіді зі статусом 200.
+        """
+        key, response = self._lookup(request, endpoint, params, locations)
+        if response is not None:
+            return response
+        return self._store(request, key, build())
+
+    async def respond_async(
+        self,
+        request: Request,
+        endpoint: str,
+        params: Dict[str, Any],
+        locations: Optional[Iterable[int]],
+        build: Callable[[], Awaitable[Any]]
+    ) -> Response:
+        """
+        respond для асинхронних ендпоінтів: звернення до сховища (Redis)
+        та кодування відповіді виконуються в пулі потоків, а не в циклі подій
+        """
+        key, response = await run_in_threadpool(self._lookup, request, endpoint, params, locations)
+        if response is not None:
+            return response
+        content = await build()
+        return await run_in_threadpool(self._store, request, key, content)
+
+    def _lookup(self, request: Request, endpoint: str, params: Dict[str, Any], locations: Optional[Iterable[int]]):
+        # (ключ кешу, відповідь з кешу або None)
+        media_type = MSGPACK_MEDIA_TYPE if wants_msgpack(request) else "application/json"
+        key = self.key(endpoint, params, locations, media_type) if self.backend is not None else None
+
+        cached = self.backend.get(key) if key is not None else None
+        if cached is not None:
+            self.hits += 1
+            etag, body = cached.split(b"\n", 1)
+            return key, self._response(request, etag.decode("ascii"), body, media_type)
+        self.misses += 1
+        return key, None
+
+    def _store(self, request: Request, key: Optional[str], response: Any) -> Response:
+        if not isinstance(response, Response):
+            response = encoded_response(request, response)
+        if response.status_code != 200:
+            return response
+
+        etag = f'"{hashlib.sha1(response.body).hexdigest()}"'
+        if key is not None:
+            self.backend.set(key, etag.encode("ascii") + b"\n" + response.body, self.ttl)
+        return self._response(request, etag, response.body, response.media_type)
+
+    def _response(self, request: Request, etag: str, body: bytes, media_type: str) -> Response:
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type=media_type, headers=headers)
+
+    def invalidate(self, location_ids: Iterable[int]):
+        """
+        Робить недосяжними записи, що залежать від вимірювань цих локацій
+        """
+        if self.backend is not None:
+            self.backend.bump([f"location:{location_id}" for location_id in set(location_ids)] + ["all"])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+        }
+
+
+def create_backend(name: str = RESPONSE_CACHE):
+    if name == "lru":
+        return LRUCacheBackend(RESPONSE_CACHE_SIZE)
+    if name == "redis":
+        return RedisCacheBackend.from_url(REDIS_URL)
+    if name == "none":
+        return None
+    raise ValueError(f"Невідоме сховище кешу відповідей: {name}")
+
+
+response_cache = ResponseCache(create_backend(RESPONSE_CACHE), RESPONSE_CACHE_TTL)
+
+
+def cached(locations: Callable[[Dict[str, Any]], Optional[Iterable[int]]]):
+    """
+    Декоратор ендпоінту з параметрами request та db: відповідь кешується
+    з ключем за рештою параметрів; locations(параметри) - локації, від
+    вимірювань яких залежить відповідь (None - усі). Синхронна та асинхронна
+    версії ендпоінту з тією ж назвою функції мають спільні записи кешу.
+    """
+    def decorator(endpoint):
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def async_route(**kwargs):
+                params = {name: value for name, value in kwargs.items() if name not in ("request", "db")}
+                return await response_cache.respond_async(
+                    kwargs["request"], endpoint.__name__, params, locations(params), lambda: endpoint(**kwargs)
+                )
+            return async_route
+
+        @functools.wraps(endpoint)
+        def route(**kwargs):
+            params = {name: value for name, value in kwargs.items() if name not in ("request", "db")}
+            return response_cache.respond(
+                kwargs["request"], endpoint.__name__, params, locations(params), lambda: endpoint(**kwargs)
+            )
+        return route
+    return decorator
+
+
+def locations_changed(db, location_ids: Iterable[int]):
+    """
+    Позначає зміну вимірювань локацій у транзакції сесії;
+    кеш для них скидається після фіксації транзакції
+    """
+    db.info.setdefault(CHANGED_LOCATIONS_KEY, set()).update(location_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    changed = session.info.pop(CHANGED_LOCATIONS_KEY, None)
+    if changed:
+        response_cache.invalidate(changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(CHANGED_LOCATIONS_KEY, None)
@@ -0,0 +1,387 @@
+"""
+Зведені таблиці вимірювань за годину та добу (кількість, сума, мінімум і максимум
+кожного показника для локації та інтервалу часу). Кількість зберігається окремо
+для кожного показника: середнє ділить суму на кількість вимірювань, де показник
+не NULL, як AVG у SQL.
+
+Зведення оновлюються під час запису та видалення вимірювань. Перебудова зведень
+з усіх збережених вимірювань (запуск з каталогу backend):
+    PYTHONPATH=app python app/rollups.py --batch-size 50000
+"""
+import argparse
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Select, and_, delete, func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from db import SessionLocal, engine
+from schema import setup_schema
+from models import MEASUREMENT_FIELDS, SensorData, daily_rollups, hourly_rollups
+
+
+EPOCH = datetime(1970, 1, 1)
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+
+# Точність позначок часу; межа end у запитах включна
+RESOLUTION = timedelta(microseconds=1)
+
+# Зведені таблиці, тривалість їх інтервалів та відповідна частота pandas
+ROLLUP_TABLES = (
+    (hourly_rollups, HOUR, 'h'),
+    (daily_rollups, DAY, 'D'),
+)
+
+# Вставка з оновленням при конфлікті ключа та функції найменшого/найбільшого з двох значень
+UPSERT_DIALECTS = {
+    'postgresql': (postgresql.insert, func.least, func.greatest),
+    'sqlite': (sqlite.insert, func.min, func.max),
+}
+
+
+def _floor(value: datetime, step: timedelta) -> datetime:
+    return EPOCH + (value - EPOCH) // step * step
+
+
+def _ceil(value: datetime, step: timedelta) -> datetime:
+    floor = _floor(value, step)
+    return floor if floor == value else floor + step
+
+
+def _naive(value: datetime) -> datetime:
+    # Стовпці часу не зберігають часовий пояс, тому зміщення відкидається так само, як під час запису
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+
+# pandas імпортується у функціях під час першого оновлення зведень,
+# а не під час імпорту модуля (швидший запуск робочого процесу)
+def _readings_frame(location_ids, timestamps, values: Dict[str, Sequence]) -> "pd.DataFrame":
+    import pandas as pd
+
+    frame = pd.DataFrame({field: values[field] for field in MEASUREMENT_FIELDS}, dtype=float)
+    frame['location_id'] = list(location_ids)
+    frame['timestamp'] = pd.to_datetime(timestamps)
+    return frame
+
+
+def _aggregate(frame: "pd.DataFrame", freq: str) -> List[Dict[str, Any]]:
+    """
+    Агрегати вимірювань за локацією та інтервалом часу у вигляді рядків зведеної таблиці
+    """
+    import pandas as pd
+
+    grouped = frame.groupby(['location_id', frame['timestamp'].dt.floor(freq).rename('bucket_start')])
+    measurements = grouped[list(MEASUREMENT_FIELDS)]
+    stats = pd.concat(
+        {
+            'count': measurements.count(),
+            'sum': measurements.sum(min_count=1),
+            'min': measurements.min(),
+            'max': measurements.max(),
+        },
+        axis=1,
+    )
+    stats.columns = [f'{field}_{aggregate}' for aggregate, field in stats.columns]
+    stats['reading_count'] = grouped.size()
+    stats = stats.reset_index()
+
+    columns = {
+        'location_id': stats['location_id'].tolist(),
+        'bucket_start': stats['bucket_start'].dt.to_pydatetime().tolist(),
+    }
+    for column in stats.columns.drop(['location_id', 'bucket_start']):
+        columns[column] = stats[column].astype(object).where(stats[column].notna(), None).tolist()
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+def _upsert(db, table, rows: List[Dict[str, Any]]):
+    if not rows:
+        return
+
+    dialect = db.bind.dialect.name
+    if dialect not in UPSERT_DIALECTS:
+        raise NotImplementedError(f"Зведені таблиці не підтримуються для СКБД {dialect}")
+    insert, least, greatest = UPSERT_DIALECTS[dialect]
+
+    statement = insert(table)
+    excluded = statement.excluded
+    values = {'reading_count': table.c.reading_count + excluded.reading_count}
+    for field in MEASUREMENT_FIELDS:
+        values[f'{field}_count'] = table.c[f'{field}_count'] + excluded[f'{field}_count']
+        current_sum, new_sum = table.c[f'{field}_sum'], excluded[f'{field}_sum']
+        current_min, new_min = table.c[f'{field}_min'], excluded[f'{field}_min']
+        current_max, new_max = table.c[f'{field}_max'], excluded[f'{field}_max']
+        # NULL означає відсутність значень в одному з агрегатів
+        values[f'{field}_sum'] = func.coalesce(current_sum + new_sum, current_sum, new_sum)
+        values[f'{field}_min'] = func.coalesce(least(current_min, new_min), current_min, new_min)
+        values[f'{field}_max'] = func.coalesce(greatest(current_max, new_max), current_max, new_max)
+
+    db.execute(
+        statement.on_conflict_do_update(index_elements=['location_id', 'bucket_start'], set_=values),
+        rows
+    )
+
+
+def _add_frame(db, frame: "pd.DataFrame"):
+    if frame.empty:
+        return
+    for table, _, freq in ROLLUP_TABLES:
+        _upsert(db, table, _aggregate(frame, freq))
+
+
+def add_readings_to_rollups(db, readings: Sequence[Dict[str, Any]]):
+    """
+    Додає до зведень щойно записані вимірювання (список словників)
+    """
+    if not readings:
+        return
+    frame = _readings_frame(
+        [reading['location_id'] for reading in readings],
+        [_naive(reading['timestamp']) for reading in readings],
+        {field: [reading.get(field) for reading in readings] for field in MEASUREMENT_FIELDS},
+    )
+    _add_frame(db, frame)
+
+
+def add_columns_to_rollups(db, columns: Dict[str, Sequence]):
+    """
+    Додає до зведень щойно записані вимірювання у колонковому представленні
+    """
+    _add_frame(db, _readings_frame(columns['location_id'], columns['timestamp'], columns))
+
+
+def refresh_rollups(db, location_id: int, start_date: datetime, end_date: datetime):
+    """
+    Перераховує з вимірювань інтервали зведень, що перетинають [start_date, end_date].
+    Викликається після видалення вимірювань за період: мінімум і максимум
+    не можна зменшити інкрементно, тому інтервали обчислюються заново
+    (після видалення в них лишаються лише вимірювання з країв періоду).
+    """
+    import pandas as pd
+
+    start_date, end_date = _naive(start_date), _naive(end_date) + RESOLUTION
+    ranges = [(table, _floor(start_date, step), _ceil(end_date, step), freq) for table, step, freq in ROLLUP_TABLES]
+
+    load_from = min(bucket_from for _, bucket_from, _, _ in ranges)
+    load_to = max(bucket_to for _, _, bucket_to, _ in ranges)
+    rows = db.execute(
+        select(SensorData.location_id, SensorData.timestamp, *[getattr(SensorData, field) for field in MEASUREMENT_FIELDS])
+        .where(
+            SensorData.location_id == location_id,
+            SensorData.timestamp >= load_from,
+            SensorData.timestamp < load_to,
+        )
+    ).all()
+    frame = pd.DataFrame(rows, columns=['location_id', 'timestamp', *MEASUREMENT_FIELDS])
+    frame['timestamp'] = pd.to_datetime(frame['timestamp'])
+
+    for table, bucket_from, bucket_to, freq in ranges:
+        db.execute(
+            delete(table).where(
+                table.c.location_id == location_id,
+                table.c.bucket_start >= bucket_from,
+                table.c.bucket_start < bucket_to,
+            )
+        )
+        in_range = frame[(frame['timestamp'] >= bucket_from) & (frame['timestamp'] < bucket_to)]
+        if not in_range.empty:
+            _upsert(db, table, _aggregate(in_range, freq))
+
+
+def rebuild_rollups(db, batch_size: int = 50000) -> int:
+    """
+    Перебудовує зведення з усіх вимірювань пакетами за зростанням id
+    однією транзакцією. Повертає кількість оброблених вимірювань.
+    """
+    import pandas as pd
+
+    for table, _, _ in ROLLUP_TABLES:
+        db.execute(delete(table))
+
+    processed = 0
+    last_id = 0
+    fields = [getattr(SensorData, field) for field in MEASUREMENT_FIELDS]
+    while True:
+        rows = db.execute(
+            select(SensorData.id, SensorData.location_id, SensorData.timestamp, *fields)
+            .where(SensorData.id > last_id, SensorData.location_id.is_not(None), SensorData.timestamp.is_not(None))
+            .order_by(SensorData.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        frame = pd.DataFrame(rows, columns=['id', 'location_id', 'timestamp', *MEASUREMENT_FIELDS])
+        frame['timestamp'] = pd.to_datetime(frame['timestamp'])
+        _add_frame(db, frame)
+
+        processed += len(rows)
+        last_id = rows[-1].id
+
+    db.commit()
+    return processed
+
+
+def rollups_missing(db) -> bool:
+    """
+    Чи є вимірювання, для яких ще не побудовано зведень, або зведення, побудовані
+    до появи стовпців <показник>_count (наприклад, після оновлення схеми)
+    """
+    has_readings = db.execute(select(SensorData.id).limit(1)).first() is not None
+    if not has_readings:
+        return False
+    has_rollups = db.execute(select(hourly_rollups.c.location_id).limit(1)).first() is not None
+    counts_missing = any(
+        db.execute(
+            select(table.c.location_id).where(table.c[f'{MEASUREMENT_FIELDS[0]}_count'].is_(None)).limit(1)
+        ).first() is not None
+        for table, _, _ in ROLLUP_TABLES
+    )
+    return not has_rollups or counts_missing
+
+
+def _stats_statement(table, ranges: List[Tuple[datetime, datetime]], location_ids):
+    ranges = [(range_from, range_to) for range_from, range_to in ranges if range_from < range_to]
+    if not ranges:
+        return None
+
+    if table is None:
+        # Неповні інтервали на краях періоду - з вимірювань
+        location_column, time_column = SensorData.location_id, SensorData.timestamp
+        aggregates = [func.count()]
+        for field in MEASUREMENT_FIELDS:
+            column = getattr(SensorData, field)
+            aggregates += [func.count(column), func.sum(column), func.min(column), func.max(column)]
+    else:
+        location_column, time_column = table.c.location_id, table.c.bucket_start
+        aggregates = [func.sum(table.c.reading_count)]
+        for field in MEASUREMENT_FIELDS:
+            aggregates += [
+                func.sum(table.c[f'{field}_count']),
+                func.sum(table.c[f'{field}_sum']),
+                func.min(table.c[f'{field}_min']),
+                func.max(table.c[f'{field}_max']),
+            ]
+
+    statement = (
+        select(location_column, *aggregates)
+        .where(or_(*[and_(time_column >= range_from, time_column < range_to) for range_from, range_to in ranges]))
+        .group_by(location_column)
+    )
+    if location_ids:
+        statement = statement.where(location_column.in_(location_ids))
+    return statement
+
+
+def _combine(first, second, function):
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return function(first, second)
+
+
+def _mean(total, count):
+    return total / count if count and total is not None else None
+
+
+def summarize_readings(
+    db,
+    start_date: datetime,
+    end_date: datetime,
+    location_ids: Optional[Sequence[int]] = None
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Кількість вимірювань, середнє, мінімум і максимум кожного показника
+    за [start_date, end_date] для кожної локації з даними. Середнє рахується
+    лише по вимірюваннях, де показник не NULL.
+
+    Повні доби читаються з добових зведень, повні години на краях періоду -
+    з годинних, і лише неповні години на самих краях - з вимірювань,
+    тому час відповіді не залежить від довжини періоду.
+    """
+    statements = summary_statements(start_date, end_date, location_ids)
+    return combine_summary([db.execute(statement).all() for statement in statements])
+
+
+def summary_statements(
+    start_date: datetime,
+    end_date: datetime,
+    location_ids: Optional[Sequence[int]] = None
+) -> List[Select]:
+    """
+    Запити summarize_readings: зведення за повні доби та години і вимірювання
+    за неповні години на краях періоду (запити можна виконати й асинхронно)
+    """
+    start_date, end_date = _naive(start_date), _naive(end_date) + RESOLUTION
+
+    hour_from, hour_to = _ceil(start_date, HOUR), _floor(end_date, HOUR)
+    if hour_from >= hour_to:
+        sources = [(None, [(start_date, end_date)])]
+    else:
+        day_from, day_to = _ceil(start_date, DAY), _floor(end_date, DAY)
+        if day_from < day_to:
+            sources = [
+                (daily_rollups, [(day_from, day_to)]),
+                (hourly_rollups, [(hour_from, day_from), (day_to, hour_to)]),
+            ]
+        else:
+            sources = [(hourly_rollups, [(hour_from, hour_to)])]
+        sources.append((None, [(start_date, hour_from), (hour_to, end_date)]))
+
+    statements = [_stats_statement(table, ranges, location_ids) for table, ranges in sources]
+    return [statement for statement in statements if statement is not None]
+
+
+def combine_summary(results: Sequence[Sequence]) -> Dict[int, Dict[str, Any]]:
+    """
+    Підсумок summarize_readings з рядків результатів запитів summary_statements
+    """
+    totals = {}
+    for rows in results:
+        for location_id, count, *values in rows:
+            if not count:
+                continue
+            if location_id not in totals:
+                totals[location_id] = [count, *values]
+                continue
+            current = totals[location_id]
+            current[0] += count
+            for index in range(0, len(values), 4):
+                current[index + 1] = _combine(current[index + 1], values[index], lambda a, b: a + b)
+                current[index + 2] = _combine(current[index + 2], values[index + 1], lambda a, b: a + b)
+                current[index + 3] = _combine(current[index + 3], values[index + 2], min)
+                current[index + 4] = _combine(current[index + 4], values[index + 3], max)
+
+    summary = {}
+    for location_id, (count, *values) in totals.items():
+        summary[location_id] = {
+            "count": count,
+            "mean": {
+                field: _mean(values[4 * i + 1], values[4 * i])
+                for i, field in enumerate(MEASUREMENT_FIELDS)
+            },
+            "min": {field: values[4 * i + 2] for i, field in enumerate(MEASUREMENT_FIELDS)},
+            "max": {field: values[4 * i + 3] for i, field in enumerate(MEASUREMENT_FIELDS)},
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Перебудова зведених таблиць вимірювань")
+    parser.add_argument("--batch-size", type=int, default=50000, help="Кількість вимірювань у пакеті")
+    args = parser.parse_args()
+
+    setup_schema(engine)
+
+    db = SessionLocal()
+    try:
+        processed = rebuild_rollups(db, args.batch_size)
+    finally:
+        db.close()
+    print(f"Готово. Оброблено вимірювань: {processed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Керування схемою бази даних: таблиці, нові стовпці та індекси, а на PostgreSQL -
+за бажанням таблиця sensor_readings, розбита на помісячні розділи.
+
+Запуск з каталогу backend:
+    PYTHONPATH=app python -m app.schema setup
+    PYTHONPATH=app python -m app.schema partitions --start-date 2020-01-01 --end-date 2026-01-01
+    PYTHONPATH=app python -m app.schema detach --before 2023-01-01 [--drop]
+"""
+import argparse
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import MetaData, PrimaryKeyConstraint, inspect, text
+from sqlalchemy.engine import Connection
+
+from db import Base, engine, add_missing_columns
+from models import Location, PollutionPrediction, SensorData
+
+
+# Розбиття sensor_readings на PostgreSQL: none або monthly (лише для нової таблиці)
+SENSOR_PARTITIONING = os.getenv('SENSOR_PARTITIONING', 'none')
+
+# На скільки місяців уперед створюються розділи під час налаштування схеми
+PARTITION_MONTHS_AHEAD = int(os.getenv('SENSOR_PARTITION_MONTHS_AHEAD', '3'))
+
+# Індекси попередніх версій схеми, замінені складеним (location_id, timestamp)
+REPLACED_INDEXES = {
+    'sensor_readings': ('ix_sensor_readings_location_id',),
+}
+
+PARTITION_PREFIX = f'{SensorData.__tablename__}_'
+
+# Місяці, для яких розділи вже існують (щоб не виконувати DDL для кожної вставки)
+_known_partitions: Set[Tuple[int, int]] = set()
+_partitions_lock = threading.Lock()
+
+
+def partitioning_enabled(bind) -> bool:
+    return SENSOR_PARTITIONING == 'monthly' and bind.dialect.name == 'postgresql'
+
+
+def _foreign_key_supported(ddl, target, bind, dialect, **kw) -> bool:
+    # Зовнішній ключ на розбиту таблицю має містити ключ розбиття, тому
+    # pollution_predictions.sensor_reading_id створюється без обмеження
+    return not (SENSOR_PARTITIONING == 'monthly' and dialect.name == 'postgresql')
+
+
+for _constraint in PollutionPrediction.__table__.foreign_key_constraints:
+    if _constraint.referred_table is SensorData.__table__:
+        _constraint.ddl_if(callable_=_foreign_key_supported)
+
+
+def setup_schema(bind=engine):
+    """
+    Створює відсутні таблиці, стовпці та індекси і видаляє замінені індекси.
+    З SENSOR_PARTITIONING=monthly на PostgreSQL нова таблиця sensor_readings
+    створюється розбитою за місяцями з первинним ключем (id, timestamp),
+    а розділи - на PARTITION_MONTHS_AHEAD місяців уперед. Наявна нерозбита
+    таблиця не перетворюється (потрібне перенесення даних).
+    """
+    if partitioning_enabled(bind) and not inspect(bind).has_table(SensorData.__tablename__):
+        _create_partitioned_table(bind)
+
+    Base.metadata.create_all(bind=bind)
+    add_missing_columns(bind, Base.metadata)
+    add_missing_indexes(bind, Base.metadata)
+    drop_replaced_indexes(bind)
+
+    if is_partitioned(bind):
+        today = datetime.now()
+        ensure_partitions(bind, today, _add_months(today, PARTITION_MONTHS_AHEAD))
+
+
+def _create_partitioned_table(bind):
+    # Копія таблиці моделі з ключем розбиття в первинному ключі
+    Location.__table__.create(bind, checkfirst=True)
+    metadata = MetaData()
+    Location.__table__.to_metadata(metadata)
+    table = SensorData.__table__.to_metadata(metadata)
+    table.c.timestamp.primary_key = True
+    table.append_constraint(PrimaryKeyConstraint(table.c.id, table.c.timestamp))
+    table.c.id.autoincrement = True
+    table.dialect_options['postgresql']['partition_by'] = 'RANGE (timestamp)'
+    table.create(bind)
+
+
+def add_missing_indexes(bind, metadata):
+    """
+    Створює індекси моделей, відсутні в уже існуючих таблицях
+    (create_all створює індекси лише разом з новою таблицею)
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind)
+
+
+def drop_replaced_indexes(bind):
+    inspector = inspect(bind)
+    for table_name, index_names in REPLACED_INDEXES.items():
+        if not inspector.has_table(table_name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table_name)}
+        with bind.begin() as connection:
+            for index_name in index_names:
+                if index_name in existing:
+                    connection.execute(text(f'DROP INDEX {index_name}'))
+
+
+def is_partitioned(bind) -> bool:
+    if bind.dialect.name != 'postgresql':
+        return False
+    with _connection(bind) as connection:
+        return bool(connection.execute(
+            text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+            {"table": SensorData.__tablename__},
+        ).scalar())
+
+
+@contextmanager
+def _connection(bind):
+    # Рушій - нова транзакція; з'єднання - його поточна транзакція
+    if isinstance(bind, Connection):
+        yield bind
+    else:
+        with bind.begin() as connection:
+            yield connection
+
+
+def _add_months(moment: datetime, months: int) -> datetime:
+    month = moment.year * 12 + moment.month - 1 + months
+    return datetime(month // 12, month % 12 + 1, 1)
+
+
+def _month_starts(start: datetime, end: datetime) -> List[datetime]:
+    month, months = datetime(start.year, start.month, 1), []
+    while month <= end:
+        months.append(month)
+        month = _add_months(month, 1)
+    return months
+
+
+def partition_name(month: datetime) -> str:
+    return f'{PARTITION_PREFIX}y{month.year:04d}m{month.month:02d}'
+
+
+def ensure_partitions(bind, start: datetime, end: datetime) -> List[str]:
+    """
+    Створює відсутні помісячні розділи sensor_readings для періоду [start, end].
+    bind - рушій або з'єднання транзакції запису: створення розділу блокує
+    батьківську таблицю, тому з окремого з'єднання воно чекало б на транзакцію,
+    що вже змінює sensor_readings. Повертає назви створених розділів.
+    """
+    if not partitioning_enabled(bind):
+        return []
+
+    months = [month for month in _month_starts(start, end) if (month.year, month.month) not in _known_partitions]
+    if not months:
+        return []
+
+    created, known = [], []
+    with _connection(bind) as connection:
+        # Наявна таблиця могла бути створена без розбиття
+        partitioned = is_partitioned(connection)
+        for month in months:
+            name = partition_name(month)
+            if partitioned and not connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+                connection.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {SensorData.__tablename__} "
+                    f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_add_months(month, 1):%Y-%m-%d}')"
+                ))
+                created.append(name)
+            else:
+                known.append(month)
+
+    # Розділ, створений у ще не зафіксованій транзакції запису, може бути
+    # скасований, тому запам'ятовуються лише вже наявні розділи
+    if not isinstance(bind, Connection):
+        known = months
+    with _partitions_lock:
+        _known_partitions.update((month.year, month.month) for month in known)
+    return created
+
+
+def ensure_partitions_for(bind, timestamps: Iterable[Optional[datetime]]):
+    """
+    Розділи для часу вимірювань, що записуються (викликається перед вставкою)
+    """
+    if not partitioning_enabled(bind):
+        return
+    present = [timestamp for timestamp in timestamps if timestamp is not None]
+    if present:
+        ensure_partitions(bind, min(present), max(present))
+
+
+def list_partitions(bind) -> List[str]:
+    with bind.connect() as connection:
+        return [
+            name for (name,) in connection.execute(text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = to_regclass(:table) ORDER BY child.relname"
+            ), {"table": SensorData.__tablename__})
+        ]
+
+
+def detach_partitions(bind, before: datetime, drop: bool = False) -> List[str]:
+    """
+    Від'єднує помісячні розділи, що повністю передують before. Від'єднані
+    таблиці лишаються в базі для архівування (або видаляються з drop=True).
+    Зведення в sensor_rollups_* та прогнози для цих місяців зберігаються.
+    Повертає назви від'єднаних розділів.
+    """
+    if not is_partitioned(bind):
+        raise ValueError("Таблиця sensor_readings не розбита на розділи")
+
+    detached = []
+    with bind.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        for name in list_partitions(bind):
+            month = _partition_month(name)
+            if month is None or _add_months(month, 1) > before:
+                continue
+            connection.execute(text(f"ALTER TABLE {SensorData.__tablename__} DETACH PARTITION {name}"))
+            if drop:
+                connection.execute(text(f"DROP TABLE {name}"))
+            with _partitions_lock:
+                _known_partitions.discard((month.year, month.month))
+            detached.append(name)
+    return detached
+
+
+def _partition_month(name: str) -> Optional[datetime]:
+    try:
+        return datetime.strptime(name[len(PARTITION_PREFIX):], 'y%Ym%m') if name.startswith(PARTITION_PREFIX) else None
+    except ValueError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Керування схемою бази даних")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("setup", help="Створити відсутні таблиці, стовпці, індекси та розділи")
+    partitions = commands.add_parser("partitions", help="Створити помісячні розділи для періоду")
+    partitions.add_argument("--start-date", type=datetime.fromisoformat, required=True)
+    partitions.add_argument("--end-date", type=datetime.fromisoformat, required=True)
+    detach = commands.add_parser("detach", help="Від'єднати розділи до дати")
+    detach.add_argument("--before", type=datetime.fromisoformat, required=True)
+    detach.add_argument("--drop", action="store_true", help="Видалити від'єднані розділи")
+    args = parser.parse_args()
+
+    setup_schema(engine)
+    if args.command == "partitions":
+        created = ensure_partitions(engine, args.start_date, args.end_date)
+        print(f"Створено розділів: {len(created)}")
+    elif args.command == "detach":
+        detached = detach_partitions(engine, args.before, args.drop)
+        print(f"Від'єднано розділів: {len(detached)} {' '.join(detached)}")
+    else:
+        print("Схему оновлено")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 class LocationBase(BaseModel):
@@ -51,3 +51,28 @@ class SensorDataResponse(SensorDataCreate):
 
     class Config:
         orm_mode = True
+
+
+class PredictionBatchRequest(BaseModel):
+    # Рядки ознак (назви стовпців sensor_readings) або локація та період
+    rows: Optional[List[Dict[str, float]]] = None
+    location_id: Optional[int] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+
+    # Зберегти прогнози для вимірювань локації в pollution_predictions
+    store: bool = False
+
+
+class TrainingFromReadingsRequest(BaseModel):
+    # Ціль: air_quality_score або pm2_5_next_hour
+    target: str = "air_quality_score"
+    location_ids: Optional[List[int]] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+
+    # Інкрементна модель (SGDRegressor) замість випадкового лісу
+    incremental: bool = False
+    n_estimators: int = 100
+    n_jobs: Optional[int] = None
+    sample_limit: Optional[int] = None
@@ -1,8 +1,69 @@
-from datetime import datetime, timedelta
-import random
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import numpy as np
+import os
 
-from models import SensorData, Location
-from schemas import SensorDataCreate
+from models import Location, PollutionPrediction, SensorData
+from ingest import (
+    BULK_CHUNK_SIZE,
+    IngestReport,
+    RowParser,
+    bulk_insert_sensor_columns,
+    bulk_insert_sensor_readings,
+    validate_rows,
+)
+from rollups import add_columns_to_rollups, add_readings_to_rollups, refresh_rollups
+from response_cache import locations_changed
+from fuzzy_logic import (
+    FuzzySystemPool,
+    INPUT_FIELDS,
+    UNAVAILABLE_DESCRIPTION,
+    interpret_air_quality_score,
+)
+
+
+# Глобальний пул систем нечіткої логіки: запити, що виконуються
+# паралельно в пулі потоків, отримують окремі екземпляри
+# (розмір пулу, кеш оцінок, крок квантування та кількість процесів
+# налаштовуються через змінні середовища)
+fuzzy_system = FuzzySystemPool(
+    size=int(os.getenv("FUZZY_POOL_SIZE", "0")) or None,
+    cache_size=int(os.getenv("FUZZY_CACHE_SIZE", "100000")),
+    quantization_step=float(os.getenv("FUZZY_QUANTIZATION_STEP", "0.01")),
+    processes=int(os.getenv("FUZZY_PROCESSES", "0")),
+    process_threshold=int(os.getenv("FUZZY_PROCESS_THRESHOLD", "200000")),
+)
+
+
+# Крок часу між вимірюваннями для кожної частоти генерації
+CADENCES = {
+    'minute': np.timedelta64(1, 'm'),
+    'hour': np.timedelta64(1, 'h'),
+    'day': np.timedelta64(1, 'D'),
+}
+
+# Діапазон рівномірного розподілу та кількість знаків після коми для кожного показника
+MEASUREMENT_RANGES = {
+    'nitrogen_dioxide': (10, 50, 2),
+    'sulfur_dioxide': (20, 150, 2),
+    'carbon_monoxide': (0.5, 10, 2),
+    'ozone': (5, 50, 2),
+    'pm2_5': (5, 40, 2),
+    'pm10': (10, 70, 2),
+    'lead': (0.005, 0.5, 4),
+    'cadmium': (0.0005, 0.1, 4),
+    'temperature': (-10, 30, 1),
+    'humidity': (20, 80, 1),
+    'wind_speed': (0, 10, 1),
+    'wind_direction': (0, 360, 1),
+    'radiation_level': (0.05, 2.5, 2),
+}
+
+# Показники з ранковим та вечірнім піком (транспорт)
+TRAFFIC_POLLUTANTS = ('nitrogen_dioxide', 'carbon_monoxide', 'pm2_5', 'pm10')
+
+# Показники, вищі в опалювальний сезон
+HEATING_POLLUTANTS = ('sulfur_dioxide', 'carbon_monoxide', 'pm2_5', 'pm10')
 
 
 class EnvironmentalDataGenerator:
@@ -11,47 +72,145 @@ class EnvironmentalDataGenerator:
         cls,
         location_id: int,
         start_date: datetime,
-        end_date: datetime
-    ):
+        end_date: datetime,
+        cadence: str = 'day',
+        seed: Optional[int] = None,
+        diurnal: bool = False,
+        seasonal: bool = False
+    ) -> Dict[str, np.ndarray]:
         """
-        Генерує дані сенсора для певної локації за вказаний період
+        Генерує дані сенсора для певної локації за вказаний період (включно з end_date)
+        у колонковому вигляді: масив значень для кожного поля SensorDataCreate.
+
+        cadence: частота вимірювань (minute, hour або day)
+        seed: зерно генератора для відтворюваних даних
+        diurnal: добові коливання (транспортні піки, денний максимум озону й температури)
+        seasonal: сезонні коливання (опалювальний сезон, літній максимум озону й температури)
         """
-        current_date = start_date
-        sensor_data_list = []
-
-        while current_date <= end_date:
-            # Генеруємо дані для кожної години
-            sensor_data = SensorDataCreate(
-                sensor_id=f"sensor_{location_id}",
-                location_id=location_id,
-                timestamp=current_date,
-                nitrogen_dioxide=round(random.uniform(10, 50), 2),
-                sulfur_dioxide=round(random.uniform(20, 150), 2),
-                carbon_monoxide=round(random.uniform(0.5, 10), 2),
-                ozone=round(random.uniform(5, 50), 2),
-                pm2_5=round(random.uniform(5, 40), 2),
-                pm10=round(random.uniform(10, 70), 2),
-                lead=round(random.uniform(0.005, 0.5), 4),
-                cadmium=round(random.uniform(0.0005, 0.1), 4),
-                temperature=round(random.uniform(-10, 30), 1),
-                humidity=round(random.uniform(20, 80), 1),
-                wind_speed=round(random.uniform(0, 10), 1),
-                wind_direction=round(random.uniform(0, 360), 1),
-                radiation_level=round(random.uniform(0.05, 2.5), 2),
-            )
-            sensor_data_list.append(sensor_data)
-
-            # Переходимо до наступної години
-            current_date += timedelta(days=1)
-
-        return sensor_data_list
+        if cadence not in CADENCES:
+            raise ValueError(f"Невідома частота: {cadence}. Допустимі: {', '.join(CADENCES)}")
+
+        step = CADENCES[cadence]
+        start = np.datetime64(start_date, 'us')
+        end = np.datetime64(end_date, 'us')
+        count = int((end - start) // step) + 1 if end >= start else 0
+        timestamps = start + np.arange(count) * step
+
+        rng = np.random.default_rng(seed)
+        columns = {
+            'sensor_id': np.full(count, f"sensor_{location_id}", dtype=object),
+            'location_id': np.full(count, location_id, dtype=np.int64),
+            'timestamp': timestamps,
+        }
+        for field, (low, high, _) in MEASUREMENT_RANGES.items():
+            columns[field] = rng.uniform(low, high, count)
+
+        if diurnal:
+            hours = (timestamps - timestamps.astype('datetime64[D]')) / np.timedelta64(1, 'h')
+            for field in TRAFFIC_POLLUTANTS:
+                columns[field] *= 1 + 0.3 * np.cos(4 * np.pi * (hours - 8) / 24)
+            columns['ozone'] *= 1 + 0.4 * np.cos(2 * np.pi * (hours - 15) / 24)
+            columns['temperature'] += 4 * np.cos(2 * np.pi * (hours - 15) / 24)
+
+        if seasonal:
+            days = (timestamps.astype('datetime64[D]') - timestamps.astype('datetime64[Y]')).astype(np.int64)
+            for field in HEATING_POLLUTANTS:
+                columns[field] *= 1 + 0.25 * np.cos(2 * np.pi * (days - 15) / 365.25)
+            columns['ozone'] *= 1 + 0.3 * np.cos(2 * np.pi * (days - 196) / 365.25)
+            columns['temperature'] += 10 * np.cos(2 * np.pi * (days - 196) / 365.25)
+
+        for field, (_, _, digits) in MEASUREMENT_RANGES.items():
+            columns[field] = np.round(columns[field], digits)
+
+        return columns
+
+
+def score_sensor_readings(readings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Пакетно обчислює оцінку та категорію якості повітря для вимірювань
+    і додає їх до словників перед записом у sensor_readings
+    """
+    if not readings:
+        return readings
+
+    values = np.array(
+        [[reading.get(field) for field in INPUT_FIELDS] for reading in readings],
+        dtype=np.float64
+    )
+    scores, categories = _score_values(values)
+
+    for reading, score, category in zip(readings, scores, categories):
+        reading['air_quality_score'] = score
+        reading['air_quality_category'] = category
+    return readings
+
+
+def score_sensor_columns(columns: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Те саме для колонкового представлення вимірювань
+    """
+    values = np.column_stack([np.asarray(columns[field], dtype=np.float64) for field in INPUT_FIELDS])
+    columns['air_quality_score'], columns['air_quality_category'] = _score_values(values)
+    return columns
+
+
+def _score_values(values: np.ndarray):
+    scores = fuzzy_system.evaluate_air_quality_batch(values)
+    score_list = [None if np.isnan(score) else float(score) for score in scores]
+    categories = [
+        UNAVAILABLE_DESCRIPTION if score is None else interpret_air_quality_score(score)[0]
+        for score in score_list
+    ]
+    return score_list, categories
+
+
+def store_sensor_readings(db, readings: List[Dict[str, Any]]) -> int:
+    """
+    Оцінює якість повітря та масово записує вимірювання однією транзакцією
+    """
+    bulk_insert_sensor_readings(db, score_sensor_readings(readings))
+    add_readings_to_rollups(db, readings)
+    locations_changed(db, {reading['location_id'] for reading in readings})
+    db.commit()
+    return len(readings)
+
+
+def ingest_sensor_lines(db, lines, parser: RowParser, report: IngestReport) -> None:
+    """
+    Розбирає, перевіряє та записує частину рядків масового завантаження
+    """
+    rows = parser.parse(lines, report)
+    readings = validate_rows(db, rows, report)
+    report.accepted += store_sensor_readings(db, readings)
+
+
+def delete_sensor_readings(db, location_id: int, start_date: datetime, end_date: datetime) -> int:
+    """
+    Видаляє вимірювання локації за період та оновлює зведення для нього (без фіксації транзакції)
+    """
+    filters = (
+        SensorData.location_id == location_id,
+        SensorData.timestamp.between(start_date, end_date)
+    )
+    db.query(PollutionPrediction).filter(
+        PollutionPrediction.sensor_reading_id.in_(db.query(SensorData.id).filter(*filters))
+    ).delete(synchronize_session=False)
+    deleted = db.query(SensorData).filter(*filters).delete(synchronize_session=False)
+    refresh_rollups(db, location_id, start_date, end_date)
+    locations_changed(db, [location_id])
+    return deleted
 
 
 def simulate_sensor_data_for_location(
     db,
     location_id: int,
     start_date: datetime,
-    end_date: datetime
+    end_date: datetime,
+    cadence: str = 'day',
+    seed: Optional[int] = None,
+    diurnal: bool = False,
+    seasonal: bool = False,
+    chunk_size: int = BULK_CHUNK_SIZE
 ):
     """
     Симуляція даних для конкретної локації за певний період
@@ -61,15 +220,20 @@ def simulate_sensor_data_for_location(
     if not location:
         raise ValueError(f"Location with id {location_id} not found")
 
-    # Генеруємо дані для локації
-    sensor_data_list = EnvironmentalDataGenerator.generate_sensor_data_for_period(
-        location_id, start_date, end_date
+    # Генеруємо та оцінюємо дані для локації
+    columns = EnvironmentalDataGenerator.generate_sensor_data_for_period(
+        location_id, start_date, end_date, cadence, seed, diurnal, seasonal
     )
+    score_sensor_columns(columns)
 
-    # Зберігаємо згенеровані дані
-    for sensor_data in sensor_data_list:
-        db_sensor_data = SensorData(**sensor_data.dict())
-        db.add(db_sensor_data)
+    # Зберігаємо згенеровані дані частинами масовою вставкою
+    total = len(columns['timestamp'])
+    for start in range(0, total, chunk_size):
+        bulk_insert_sensor_columns(
+            db, {field: values[start:start + chunk_size] for field, values in columns.items()}
+        )
+    add_columns_to_rollups(db, columns)
+    locations_changed(db, [location_id])
 
     db.commit()
-    return len(sensor_data_list)
+    return total
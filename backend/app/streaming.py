@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator
+
+from fastapi.responses import StreamingResponse
+
+from db import engine
+
+
+# Кількість рядків, що читаються з курсора та кодуються за один раз
+STREAM_BATCH_SIZE = 5000
+
+MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def _json_default(value):
+    # Викликається лише для типів, які json не кодує сам (дата й час)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Тип {type(value).__name__} не підтримується")
+
+
+def _encode_ndjson(columns, rows) -> bytes:
+    lines = [
+        json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=_json_default)
+        for row in rows
+    ]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _encode_csv(rows) -> bytes:
+    # Дата й час записуються через str() у форматі "YYYY-MM-DD HH:MM:SS[.ffffff]"
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def iter_encoded_rows(statement, data_format: str) -> Iterator[bytes]:
+    """
+    Виконує запит з курсором на боці сервера (stream_results) і кодує
+    рядки частинами по STREAM_BATCH_SIZE, тож пам'ять не залежить від обсягу вибірки.
+    Використовує окреме з'єднання, незалежне від сесії запиту.
+    """
+    with engine.connect() as connection:
+        result = connection.execution_options(
+            stream_results=True, yield_per=STREAM_BATCH_SIZE
+        ).execute(statement)
+        columns = list(result.keys())
+
+        if data_format == 'csv':
+            yield _encode_csv([columns])
+
+        for rows in result.partitions():
+            if data_format == 'csv':
+                yield _encode_csv(rows)
+            else:
+                yield _encode_ndjson(columns, rows)
+
+
+def streaming_response(statement, data_format: str, filename: str) -> StreamingResponse:
+    """
+    Потокова відповідь у форматі NDJSON або CSV для Core-запиту
+    """
+    if data_format not in MEDIA_TYPES:
+        raise ValueError(f"Непідтримуваний формат: {data_format}")
+
+    return StreamingResponse(
+        iter_encoded_rows(statement, data_format),
+        media_type=MEDIA_TYPES[data_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{data_format}"'},
+    )
@@ -0,0 +1,134 @@
+import functools
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Float, Select, func, select
+from sqlalchemy.dialects import postgresql
+
+from models import MEASUREMENT_FIELDS, SensorData
+
+
+# Стовпці SensorData, для яких обчислюється статистика
+SUMMARY_FIELDS = MEASUREMENT_FIELDS + ('air_quality_score',)
+
+# Процентилі (неперервні, з лінійною інтерполяцією як у percentile_cont)
+PERCENTILES = (50, 95, 99)
+
+STATISTICS = ('count', 'mean', 'min', 'max', 'stddev') + tuple(f'p{p}' for p in PERCENTILES)
+
+
+def summarize_measurements(
+    db,
+    start_date: datetime,
+    end_date: datetime,
+    fields: Optional[Sequence[str]] = None,
+    location_ids: Optional[Sequence[int]] = None
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Статистика вибраних показників за період для кожної локації:
+    кількість значень, середнє, мінімум, максимум, стандартне відхилення
+    (вибіркове) та процентилі PERCENTILES.
+
+    На PostgreSQL обчислюється одним згрупованим запитом (percentile_cont),
+    на інших СКБД - одним запитом значень і NumPy.
+    Повертає {location_id: {"count": кількість вимірювань, "fields": {поле: статистика}}}.
+    """
+    statement, summarize = summary_query(db.bind.dialect.name, start_date, end_date, fields, location_ids)
+    return summarize(db.execute(statement).all())
+
+
+def summary_query(
+    dialect: str,
+    start_date: datetime,
+    end_date: datetime,
+    fields: Optional[Sequence[str]] = None,
+    location_ids: Optional[Sequence[int]] = None
+) -> Tuple[Select, Callable[[Sequence], Dict[int, Dict[str, Any]]]]:
+    """
+    Запит для summarize_measurements на СКБД dialect та функція, що перетворює
+    рядки його результату на статистику (запит можна виконати й асинхронно).
+    ValueError для невідомих показників.
+    """
+    fields = list(fields or SUMMARY_FIELDS)
+    unknown = [field for field in fields if field not in SUMMARY_FIELDS]
+    if unknown:
+        raise ValueError(f"Невідомі показники: {', '.join(unknown)}")
+
+    filters = [SensorData.timestamp.between(start_date, end_date)]
+    if location_ids:
+        filters.append(SensorData.location_id.in_(location_ids))
+
+    if dialect == 'postgresql':
+        return _sql_statement(fields, filters), functools.partial(_sql_summary, fields)
+    statement = select(SensorData.location_id, *[getattr(SensorData, field) for field in fields]).where(*filters)
+    return statement, functools.partial(_numpy_summary, fields)
+
+
+def _sql_statement(fields: List[str], filters) -> Select:
+    fractions = postgresql.array([p / 100 for p in PERCENTILES])
+    aggregates = [func.count()]
+    for field in fields:
+        column = getattr(SensorData, field)
+        aggregates += [
+            func.count(column),
+            func.avg(column),
+            func.min(column),
+            func.max(column),
+            func.stddev_samp(column),
+            func.percentile_cont(fractions).within_group(column).cast(postgresql.ARRAY(Float)),
+        ]
+    return select(SensorData.location_id, *aggregates).where(*filters).group_by(SensorData.location_id)
+
+
+def _sql_summary(fields: List[str], rows: Sequence) -> Dict[int, Dict[str, Any]]:
+    summary = {}
+    for location_id, total, *values in rows:
+        statistics = {}
+        for index, field in enumerate(fields):
+            count, mean, minimum, maximum, stddev, percentiles = values[6 * index:6 * index + 6]
+            statistics[field] = dict(zip(
+                STATISTICS,
+                (count, mean, minimum, maximum, stddev, *(percentiles or [None] * len(PERCENTILES)))
+            ))
+        summary[location_id] = {"count": total, "fields": statistics}
+    return summary
+
+
+def _numpy_summary(fields: List[str], rows: Sequence) -> Dict[int, Dict[str, Any]]:
+    if not rows:
+        return {}
+
+    # None перетворюється на NaN і не враховується в статистиці
+    data = np.array(rows, dtype=float)
+    location_column = data[:, 0].astype(np.int64)
+    order = np.argsort(location_column, kind='stable')
+    location_column, values = location_column[order], data[order, 1:]
+    locations, starts = np.unique(location_column, return_index=True)
+    ends = np.append(starts[1:], len(location_column))
+
+    summary = {}
+    for location_id, start, end in zip(locations.tolist(), starts, ends):
+        block = values[start:end]
+        summary[location_id] = {
+            "count": int(end - start),
+            "fields": {field: _column_statistics(block[:, index]) for index, field in enumerate(fields)},
+        }
+    return summary
+
+
+def _column_statistics(column: np.ndarray) -> Dict[str, Any]:
+    column = column[~np.isnan(column)]
+    count = len(column)
+    if not count:
+        return dict(zip(STATISTICS, (0,) + (None,) * (len(STATISTICS) - 1)))
+
+    percentiles = np.percentile(column, PERCENTILES).tolist()
+    return dict(zip(STATISTICS, (
+        count,
+        float(column.mean()),
+        float(column.min()),
+        float(column.max()),
+        float(column.std(ddof=1)) if count > 1 else None,
+        *percentiles,
+    )))
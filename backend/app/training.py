@@ -0,0 +1,400 @@
+"""
+Навчання моделі прогнозування: фонові завдання та навчання з sensor_readings.
+
+Нічне перенавчання на всій історії (запуск з каталогу backend):
+    PYTHONPATH=app python -m app.training --target air_quality_score --incremental
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from db import SessionLocal
+from features import (
+    FEATURE_NAMES,
+    TRAINING_CHUNK_SIZE,
+    TRAINING_TARGETS,
+    count_training_readings,
+    iter_training_chunks,
+)
+from app.ai_model import MODEL_REGISTRY_DIR, ModelRegistry, PollutionPredictionModel
+
+
+# Кількість завершених завдань, що зберігаються для перегляду статусу
+MAX_FINISHED_JOBS = 100
+
+# Розмір частини під час копіювання завантаженого файлу
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Кожне п'яте вимірювання (за id) відкладається для оцінки моделі;
+# для оцінки зберігається не більше MAX_EVALUATION_ROWS таких вимірювань
+EVALUATION_MODULO = 5
+MAX_EVALUATION_ROWS = 100_000
+
+FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled')
+
+
+class TrainingCancelled(Exception):
+    pass
+
+
+class _Reservoir:
+    """
+    Рівномірна вибірка не більше limit рядків з потоку частин (limit=None - усі рядки)
+    """
+
+    def __init__(self, limit: Optional[int] = None, seed: int = 42):
+        self.limit = limit
+        self.seen = 0
+        self._rng = np.random.default_rng(seed)
+        self._chunks = []
+        self._X = None
+        self._y = None
+
+    def add(self, X: np.ndarray, y: np.ndarray):
+        if self.limit is None:
+            self._chunks.append((X, y))
+            self.seen += len(y)
+            return
+
+        if self._X is None:
+            self._X = np.empty((0, X.shape[1]))
+            self._y = np.empty(0)
+        free = max(0, self.limit - len(self._y))
+        if free:
+            self._X = np.concatenate([self._X, X[:free]])
+            self._y = np.concatenate([self._y, y[:free]])
+            self.seen += min(free, len(y))
+            X, y = X[free:], y[free:]
+        if not len(y):
+            return
+
+        # Алгоритм R: рядок з номером k замінює випадковий слот з імовірністю limit / k
+        slots = (self._rng.random(len(y)) * (self.seen + np.arange(1, len(y) + 1))).astype(np.int64)
+        replace = slots < self.limit
+        self._X[slots[replace]] = X[replace]
+        self._y[slots[replace]] = y[replace]
+        self.seen += len(y)
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self.limit is None:
+            if not self._chunks:
+                return np.empty((0, len(FEATURE_NAMES))), np.empty(0)
+            return np.concatenate([X for X, _ in self._chunks]), np.concatenate([y for _, y in self._chunks])
+        if self._X is None:
+            return np.empty((0, len(FEATURE_NAMES))), np.empty(0)
+        return self._X, self._y
+
+
+def train_from_readings(
+    db,
+    target: str = 'air_quality_score',
+    location_ids: Optional[Sequence[int]] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    incremental: bool = False,
+    n_estimators: int = 100,
+    n_jobs: Optional[int] = None,
+    sample_limit: Optional[int] = None,
+    chunk_size: int = TRAINING_CHUNK_SIZE,
+    progress: Optional[Callable[[float, str], None]] = None
+) -> Tuple[PollutionPredictionModel, Dict[str, Any]]:
+    """
+    Навчає модель на вимірюваннях з sensor_readings, читаючи їх частинами.
+
+    incremental=True - SGDRegressor донавчається на кожній частині (partial_fit),
+    тож пам'ять не залежить від обсягу історії. Інакше ознаки частин
+    збираються в масив NumPy (не більше sample_limit рядків рівномірною
+    вибіркою) і навчається випадковий ліс. Кожне п'яте вимірювання
+    відкладається для оцінки MSE.
+    Повертає модель та метадані для реєстру.
+    """
+    # pandas потрібен лише для навчання, тому імпортується під час першого використання
+    import pandas as pd
+
+    report = progress or (lambda fraction, stage: None)
+    total = count_training_readings(db, location_ids, start_date, end_date)
+    if not total:
+        raise ValueError("Немає вимірювань для навчання")
+
+    model = PollutionPredictionModel(n_estimators=n_estimators, n_jobs=n_jobs, incremental=incremental)
+    training = _Reservoir(sample_limit)
+    evaluation = _Reservoir(MAX_EVALUATION_ROWS)
+    # Для лісу читання даних - перша половина прогресу, побудова дерев - друга
+    reading_share = 1.0 if incremental else 0.5
+
+    read = 0
+    trained = 0
+    for X, y, ids, chunk_read in iter_training_chunks(db, target, location_ids, start_date, end_date, chunk_size):
+        read += chunk_read
+        held_out = ids % EVALUATION_MODULO == 0
+        features = X.to_numpy()
+        evaluation.add(features[held_out], y[held_out])
+        if incremental:
+            if (~held_out).any():
+                model.partial_fit(pd.DataFrame(features[~held_out], columns=FEATURE_NAMES), y[~held_out])
+                trained += int((~held_out).sum())
+        else:
+            training.add(features[~held_out], y[~held_out])
+        report(reading_share * read / total, "Читання вимірювань")
+
+    if incremental:
+        samples = trained
+    else:
+        X_train, y_train = training.arrays()
+        if not len(y_train):
+            raise ValueError("Немає вимірювань з ознаками та ціллю для навчання")
+        samples = len(y_train)
+        model.fit(
+            pd.DataFrame(X_train, columns=FEATURE_NAMES), y_train,
+            progress=lambda fraction: report(reading_share + (1 - reading_share) * fraction, "Побудова дерев")
+        )
+
+    X_test, y_test = evaluation.arrays()
+    mse = model.evaluate(pd.DataFrame(X_test, columns=FEATURE_NAMES), y_test) if len(y_test) else None
+
+    metadata = {
+        "mse": None if mse is None else float(mse),
+        "features": FEATURE_NAMES,
+        "samples": int(samples),
+        "target": target,
+        "learner": "sgd" if incremental else "random_forest",
+        "source": {
+            "table": "sensor_readings",
+            "location_ids": list(location_ids) if location_ids else None,
+            "start_date": start_date.isoformat() if start_date else None,
+            "end_date": end_date.isoformat() if end_date else None,
+        },
+    }
+    if not incremental:
+        metadata["n_estimators"] = n_estimators
+    return model, metadata
+
+
+def train_from_csv(
+    filepath: str,
+    target: str = "Target",
+    n_estimators: int = 100,
+    n_jobs: Optional[int] = None,
+    progress: Optional[Callable[[float, str], None]] = None
+) -> Tuple[PollutionPredictionModel, Dict[str, Any]]:
+    """
+    Навчає випадковий ліс на CSV-файлі з ознаками та стовпцем target
+    """
+    import pandas as pd
+
+    report = progress or (lambda fraction, stage: None)
+    report(0.0, "Читання даних")
+    df = pd.read_csv(filepath)
+    if target not in df.columns:
+        raise ValueError(f"Стовпець '{target}' відсутній у файлі.")
+    X = df.drop(columns=[target])
+    y = df[target]
+    del df
+
+    model = PollutionPredictionModel(n_estimators=n_estimators, n_jobs=n_jobs)
+    mse = model.train(X, y, progress=lambda fraction: report(0.05 + 0.95 * fraction, "Побудова дерев"))
+    return model, {
+        "mse": float(mse),
+        "features": list(X.columns),
+        "samples": len(X),
+        "n_estimators": n_estimators,
+    }
+
+
+class TrainingJob:
+    """
+    Фонове навчання моделі: статус, прогрес та результат
+    """
+
+    def __init__(self, source: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.source = source
+
+        self.status = 'queued'
+        self.stage = "Очікує в черзі"
+        self.progress = 0.0
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.cancel_requested = threading.Event()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "source": self.source,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class TrainingJobManager:
+    """
+    Черга фонових завдань навчання. Завдання виконуються у max_workers потоках,
+    а дерева кожної моделі будуються паралельно на n_jobs ядрах.
+    """
+
+    def __init__(self, registry: ModelRegistry, max_workers: int = 1):
+        self.registry = registry
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="training")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        upload: BinaryIO,
+        target: str = "Target",
+        n_estimators: int = 100,
+        n_jobs: Optional[int] = None
+    ) -> TrainingJob:
+        """
+        Копіює завантажений файл частинами у тимчасовий файл завдання
+        (без читання в пам'ять) і ставить навчання в чергу
+        """
+        with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as copy:
+            shutil.copyfileobj(upload, copy, COPY_CHUNK_SIZE)
+
+        return self._enqueue(
+            TrainingJob({"type": "csv", "n_estimators": n_estimators, "n_jobs": n_jobs}),
+            lambda progress: train_from_csv(copy.name, target, n_estimators, n_jobs, progress),
+            cleanup=lambda: os.remove(copy.name)
+        )
+
+    def submit_readings(self, **parameters) -> TrainingJob:
+        """
+        Ставить у чергу навчання з sensor_readings (параметри train_from_readings)
+        """
+        def train(progress):
+            db = SessionLocal()
+            try:
+                return train_from_readings(db, progress=progress, **parameters)
+            finally:
+                db.close()
+
+        source = {"type": "sensor_readings", **{
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in parameters.items()
+        }}
+        return self._enqueue(TrainingJob(source), train)
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[TrainingJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[TrainingJob]:
+        """
+        Скасовує завдання: у черзі - одразу, під час навчання - після поточної частини
+        """
+        job = self._jobs.get(job_id)
+        if job is not None and job.status not in FINISHED_STATUSES:
+            job.cancel_requested.set()
+            job.stage = "Скасування"
+        return job
+
+    def shutdown(self):
+        for job in self.list():
+            job.cancel_requested.set()
+        self._executor.shutdown(wait=True)
+
+    def _enqueue(self, job: TrainingJob, train, cleanup=None) -> TrainingJob:
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, train, cleanup)
+        return job
+
+    def _run(self, job: TrainingJob, train, cleanup=None):
+        try:
+            self._check_cancelled(job)
+            job.status = 'running'
+            job.started_at = datetime.now()
+
+            model, metadata = train(lambda fraction, stage: self._report(job, fraction, stage))
+
+            job.stage = "Збереження моделі"
+            job.result = self.registry.register(model, metadata)
+            job.status = 'succeeded'
+            job.stage = "Завершено"
+            job.progress = 1.0
+        except TrainingCancelled:
+            job.status = 'cancelled'
+            job.stage = "Скасовано"
+        except Exception as e:
+            job.status = 'failed'
+            job.stage = "Помилка"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now()
+            if cleanup is not None:
+                cleanup()
+
+    def _report(self, job: TrainingJob, fraction: float, stage: str):
+        # Викликається після кожної частини даних або дерев
+        job.progress = 0.95 * fraction
+        if not job.cancel_requested.is_set():
+            job.stage = stage
+        self._check_cancelled(job)
+
+    @staticmethod
+    def _check_cancelled(job: TrainingJob):
+        if job.cancel_requested.is_set():
+            raise TrainingCancelled()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATUSES]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Навчання моделі прогнозування на вимірюваннях з бази даних")
+    parser.add_argument("--target", choices=TRAINING_TARGETS, default="air_quality_score")
+    parser.add_argument("--location-id", type=int, action="append", dest="location_ids", help="Локація (можна кілька)")
+    parser.add_argument("--start-date", type=datetime.fromisoformat)
+    parser.add_argument("--end-date", type=datetime.fromisoformat)
+    parser.add_argument("--incremental", action="store_true", help="Інкрементна модель (SGDRegressor, partial_fit)")
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--sample-limit", type=int, help="Найбільша кількість рядків для випадкового лісу")
+    parser.add_argument("--chunk-size", type=int, default=TRAINING_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        model, metadata = train_from_readings(
+            db, args.target, args.location_ids, args.start_date, args.end_date,
+            incremental=args.incremental,
+            n_estimators=args.n_estimators,
+            n_jobs=args.n_jobs,
+            sample_limit=args.sample_limit,
+            chunk_size=args.chunk_size,
+            progress=lambda fraction, stage: print(f"{stage}: {fraction:.0%}"),
+        )
+    finally:
+        db.close()
+
+    version = ModelRegistry(MODEL_REGISTRY_DIR).register(model, metadata)
+    print(f"Готово. Версія {version['name']}, MSE: {version['mse']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Прогрів робочого процесу. Важкі підсистеми (scikit-fuzzy з SciPy, scikit-learn,
+pandas) імпортуються під час першого використання, тож імпорт додатку швидкий,
+а прогрів після старту завантажує систему нечіткої логіки, активну модель
+та бібліотеки наперед. Готовність процесу - ендпоінт /api/ready.
+"""
+import importlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from services import fuzzy_system
+
+
+# Прогрів після старту: background (у фоновому потоці, запити обслуговуються одразу,
+# а /api/ready повертає 503 до його завершення), blocking (до початку обслуговування
+# запитів) або off (підсистеми завантажуються лише під час першого використання)
+WARMUP_MODE = os.getenv("WARMUP_MODE", "background")
+
+WARMUP_MODES = ("background", "blocking", "off")
+
+# Бібліотеки, потрібні для прогнозування та навчання моделі
+WARMUP_IMPORTS = ("pandas", "sklearn.ensemble", "sklearn.linear_model")
+
+# Тривалість (с) та помилки кроків прогріву
+_timings: Dict[str, float] = {}
+_errors: Dict[str, str] = {}
+
+logger = logging.getLogger(__name__)
+
+
+def _import_libraries():
+    for name in WARMUP_IMPORTS:
+        importlib.import_module(name)
+
+
+def warm_up(model_registry):
+    """
+    Завантажує систему нечіткої логіки, активну версію моделі та бібліотеки.
+    Помилка одного кроку записується і не перериває інші.
+    """
+    steps = (
+        ("fuzzy", fuzzy_system.warm_up),
+        ("model", model_registry.warm_up),
+        ("libraries", _import_libraries),
+    )
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+            _errors.pop(name, None)
+        except Exception as e:
+            logger.exception("Помилка прогріву (%s)", name)
+            _errors[name] = str(e)
+        _timings[name] = round(time.perf_counter() - started, 3)
+
+
+def start_warm_up(model_registry, mode: str = WARMUP_MODE) -> Optional[threading.Thread]:
+    """
+    Запускає прогрів відповідно до mode (викликається під час старту додатку)
+    """
+    if mode not in WARMUP_MODES:
+        raise ValueError(f"Невідомий режим прогріву: {mode}")
+    if mode == "off":
+        return None
+    if mode == "blocking":
+        warm_up(model_registry)
+        return None
+
+    thread = threading.Thread(target=warm_up, args=(model_registry,), name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def readiness(model_registry) -> Dict[str, Any]:
+    """
+    Стан готовності: процес готовий, коли система нечіткої логіки побудована,
+    а реєстр моделі прочитано й активну версію (якщо вона є) завантажено
+    """
+    components = {
+        "fuzzy": fuzzy_system.loaded,
+        "model": model_registry.loaded,
+    }
+    return {
+        "ready": all(components.values()),
+        "components": components,
+        "warm_up": {
+            "mode": WARMUP_MODE,
+            "seconds": dict(_timings),
+            "errors": dict(_errors),
+        },
+    }
@@ -0,0 +1,90 @@
+"""
+Спільні фікстури тестів. Змінні середовища встановлюються до імпорту модулів
+додатку: тести працюють з тимчасовою базою SQLite, тимчасовим реєстром моделі
+та без прогріву після старту.
+
+Запуск з каталогу backend:
+    python -m pytest -q
+"""
+import os
+import tempfile
+
+TEST_DIR = tempfile.mkdtemp(prefix="geo_monitoring_tests_")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}"
+os.environ["MODEL_REGISTRY_DIR"] = os.path.join(TEST_DIR, "model_registry")
+os.environ["WARMUP_MODE"] = "off"
+os.environ["RESPONSE_CACHE"] = "lru"
+os.environ["PROFILE_DIR"] = os.path.join(TEST_DIR, "profiles")
+
+import pytest
+
+from db import Base, SessionLocal, engine
+from response_cache import LRUCacheBackend, response_cache
+from schema import setup_schema
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    setup_schema(engine)
+    yield engine
+
+
+@pytest.fixture(autouse=True)
+def clean_state(database):
+    """
+    Порожні таблиці та кеш відповідей для кожного тесту
+    """
+    response_cache.backend = LRUCacheBackend()
+    yield
+    with database.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture(scope="session")
+def client(database):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def location(db):
+    from models import Location
+
+    location = Location(name="Київ", latitude=50.45, longitude=30.52)
+    db.add(location)
+    db.commit()
+    return location.id
+
+
+@pytest.fixture
+def make_reading():
+    """
+    Вимірювання з полями SensorDataCreate: усі показники 10.0, якщо не вказані
+    """
+    from models import MEASUREMENT_FIELDS
+
+    def make(location_id: int, timestamp, **values):
+        return {
+            "sensor_id": "sensor-1",
+            "location_id": location_id,
+            "timestamp": timestamp,
+            **{field: 10.0 for field in MEASUREMENT_FIELDS},
+            **values,
+        }
+
+    return make
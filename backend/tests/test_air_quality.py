@@ -0,0 +1,140 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql
+
+from api import _stored_score
+from fuzzy_logic import INPUT_FIELDS, UNAVAILABLE_DESCRIPTION
+from models import Location, SensorData
+from services import fuzzy_system, store_sensor_readings
+
+PERIOD = {"start_date": "2024-01-01T00:00:00", "end_date": "2024-01-02T00:00:00"}
+
+
+@pytest.fixture
+def readings(db, location, make_reading):
+    """Три вимірювання з оцінкою та одне з пропущеним показником (без оцінки)"""
+    store_sensor_readings(db, [
+        make_reading(location, datetime(2024, 1, 1, 1), pm2_5=5.0),
+        make_reading(location, datetime(2024, 1, 1, 2), pm2_5=50.0),
+        make_reading(location, datetime(2024, 1, 1, 3), pm2_5=150.0),
+        make_reading(location, datetime(2024, 1, 1, 4), pm2_5=None),
+    ])
+    return location
+
+
+def test_scores_are_persisted_at_ingest(db, readings):
+    rows = db.query(SensorData).order_by(SensorData.timestamp).all()
+
+    for row in rows[:3]:
+        expected = fuzzy_system.evaluate_air_quality({field: getattr(row, field) for field in INPUT_FIELDS})
+        assert round(row.air_quality_score, 2) == expected["score"]
+        assert row.air_quality_category == expected["description"]
+    assert rows[3].air_quality_score is None
+    assert rows[3].air_quality_category == UNAVAILABLE_DESCRIPTION
+
+
+def test_location_counts_unscored_readings(client, db, readings):
+    body = client.get(f"/api/air-quality/location/{readings}", params=PERIOD).json()
+
+    scores = [score for (score,) in db.query(SensorData.air_quality_score) if score is not None]
+    assert body["total_readings"] == 4
+    assert body["unscored_readings"] == 1
+    assert body["score_statistics"]["average"] == round(sum(scores) / len(scores), 2)
+    assert body["score_statistics"]["worst"] == round(max(scores), 2)
+
+
+def test_comparative_counts_unscored_readings(client, db, readings, make_reading):
+    other = Location(name="Львів")
+    db.add(other)
+    db.commit()
+    store_sensor_readings(db, [make_reading(other.id, datetime(2024, 1, 1, 1))])
+
+    response = client.get(
+        "/api/air-quality/comparative-analysis",
+        params={**PERIOD, "location_ids": [readings, other.id], "include_stats": True},
+    )
+
+    statistics = {item["location_id"]: item["statistics"] for item in response.json()["comparative_analysis"]}
+    assert statistics[readings]["total_readings"] == 4
+    assert statistics[readings]["unscored_readings"] == 1
+    assert statistics[other.id]["unscored_readings"] == 0
+
+
+def test_postgresql_treats_nan_score_as_null():
+    score = _stored_score(SimpleNamespace(bind=SimpleNamespace(dialect=postgresql.dialect())))
+    statement = select(func.count(score), func.avg(score))
+
+    sql = str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    assert sql.count("nullif(sensor_readings.air_quality_score, CAST('NaN' AS FLOAT))") == 2
+
+
+@pytest.fixture
+def count_queries(database):
+    from sqlalchemy import event
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(database, "before_cursor_execute", record)
+    yield statements
+    event.remove(database, "before_cursor_execute", record)
+
+
+def _locations(db, make_reading, levels):
+    locations = [Location(name=f"Локація {index}") for index in range(len(levels))]
+    db.add_all(locations)
+    db.commit()
+    store_sensor_readings(db, [
+        make_reading(location.id, datetime(2024, 1, 1, hour), pm2_5=level + hour)
+        for location, level in zip(locations, levels)
+        for hour in range(3)
+    ])
+    return [location.id for location in locations]
+
+
+def _compare(client, location_ids, **params):
+    return client.get(
+        "/api/air-quality/comparative-analysis", params={**PERIOD, "location_ids": location_ids, **params}
+    )
+
+
+def test_comparative_ranks_locations_and_reports_missing(client, db, make_reading):
+    location_ids = _locations(db, make_reading, [5.0, 150.0, 60.0])
+
+    body = _compare(client, [*location_ids, 999999]).json()
+
+    # Представник локації - вимірювання з оцінкою, найближчою до середньої
+    expected = {}
+    for location_id in location_ids:
+        scores = [score for (score,) in db.query(SensorData.air_quality_score).filter(SensorData.location_id == location_id)]
+        average = sum(scores) / len(scores)
+        expected[location_id] = round(min(scores, key=lambda score: abs(score - average)), 2)
+    ranking = body["comparative_analysis"]
+    assert {item["location_id"]: item["air_quality"]["score"] for item in ranking} == expected
+    # Упорядкування за оцінкою, за однакової оцінки - за id локації
+    assert [item["location_id"] for item in ranking] == sorted(location_ids, key=lambda i: (expected[i], i))
+    assert body["best_location"] == ranking[0]
+    assert body["worst_location"] == ranking[-1]
+    assert body["locations_without_data"] == [999999]
+
+
+def test_comparative_query_count_does_not_grow_with_locations(client, db, make_reading, count_queries):
+    location_ids = _locations(db, make_reading, [5.0, 40.0, 80.0, 120.0, 160.0, 200.0])
+
+    _compare(client, location_ids[:1])
+    count_queries.clear()
+    _compare(client, location_ids[:2])
+    two = len(count_queries)
+    count_queries.clear()
+    _compare(client, location_ids)
+
+    assert len(count_queries) == two
+
+
+def test_comparative_without_data_is_404(client, location):
+    assert _compare(client, [location]).status_code == 404
@@ -0,0 +1,111 @@
+import concurrent.futures
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import api
+import db as database
+from response_cache import LRUCacheBackend, response_cache
+from services import store_sensor_readings
+
+PERIOD = {"start_date": "2024-01-01T00:00:00", "end_date": "2024-01-02T00:00:00"}
+
+
+@pytest.fixture
+def async_client(monkeypatch):
+    pytest.importorskip("aiosqlite")
+    import async_api
+
+    # Рушій створюється заново в циклі подій клієнта і закривається під час його зупинки
+    monkeypatch.setattr(database, "async_engine", None)
+    monkeypatch.setattr(database, "AsyncSessionLocal", None)
+    app = FastAPI()
+    app.include_router(async_api.router, prefix="/api")
+    app.on_event("shutdown")(database.dispose_async_engine)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_async_endpoints_match_sync(client, async_client, db, location, make_reading):
+    store_sensor_readings(db, [
+        make_reading(location, datetime(2024, 1, 1) + timedelta(hours=hour), pm2_5=float(hour))
+        for hour in range(5)
+    ])
+    requests = [
+        ("/api/locations", {}),
+        ("/api/sensor-data/", PERIOD),
+        ("/api/sensor-data/", {**PERIOD, "limit": 3}),
+        ("/api/sensor-data/", {**PERIOD, "layout": "columns"}),
+        (f"/api/sensor-data/location/{location}", PERIOD),
+        (f"/api/sensor-data/location/{location}", {**PERIOD, "limit": 2, "layout": "columns"}),
+        (f"/api/sensor-data/location/{location}", {**PERIOD, "max_points": 3, "fields": ["pm2_5"]}),
+        (f"/api/air-quality/location/{location}", PERIOD),
+        (f"/api/air-quality/location/{location}", {**PERIOD, "layout": "columns", "aggregation_method": "worst"}),
+        ("/api/air-quality/comparative-analysis", {**PERIOD, "location_ids": [location, location + 1], "include_stats": True}),
+        ("/api/locations/pollution-summary/", {**PERIOD, "location_ids": [location]}),
+        ("/api/locations/pollution-summary-extended/", {**PERIOD, "fields": ["pm2_5"]}),
+    ]
+
+    for path, params in requests:
+        response = async_client.get(path, params=params)
+        assert response.status_code == 200, path
+        # Синхронна версія не повинна отримати відповідь з кешу
+        response_cache.backend = LRUCacheBackend()
+        assert response.json() == client.get(path, params=params).json(), path
+
+    assert str(database.async_engine.url).startswith("sqlite+aiosqlite:///")
+    assert async_client.get("/api/sensor-data/", params={**PERIOD, "limit": 1, "cursor": "?"}).status_code == 400
+
+
+def test_slow_request_does_not_block_event_loop(async_client, db, location, make_reading, monkeypatch):
+    store_sensor_readings(db, [make_reading(location, datetime(2024, 1, 1))])
+    started, release = threading.Event(), threading.Event()
+    released = []
+    describe_reading = api._describe_reading
+
+    def slow_describe(row):
+        # Оцінка нечіткою логікою чекає, доки завершиться інший запит
+        started.set()
+        released.append(release.wait(10))
+        return describe_reading(row)
+
+    monkeypatch.setattr(api, "_describe_reading", slow_describe)
+    slow = concurrent.futures.ThreadPoolExecutor(1)
+    future = slow.submit(async_client.get, f"/api/air-quality/location/{location}", params=PERIOD)
+    assert started.wait(10)
+
+    # Якби оцінка виконувалась у циклі подій, цей запит чекав би на неї
+    assert async_client.get("/api/locations").status_code == 200
+    release.set()
+
+    assert future.result(10).status_code == 200
+    assert released and all(released)
+    slow.shutdown()
+
+
+def test_async_database_url():
+    assert database.async_database_url("postgresql://user:secret@db/geo") == "postgresql+asyncpg://user:secret@db/geo"
+    assert database.async_database_url("postgresql+psycopg2://db/geo") == "postgresql+asyncpg://db/geo"
+    assert database.async_database_url("sqlite:///data.db") == "sqlite+aiosqlite:///data.db"
+    with pytest.raises(ValueError):
+        database.async_database_url("mysql://db/geo")
+
+
+def test_engine_options(monkeypatch):
+    monkeypatch.setattr(database, "DB_STATEMENT_TIMEOUT_MS", 1500)
+    monkeypatch.setattr(database, "DB_POOL_SIZE", 7)
+
+    assert database.engine_options("sqlite:///data.db") == {"pool_pre_ping": True}
+
+    options = database.engine_options("postgresql://db/geo")
+    assert (options["pool_size"], options["max_overflow"]) == (7, 10)
+    assert options["connect_args"] == {"options": "-c statement_timeout=1500"}
+    assert database.engine_options("postgresql+asyncpg://db/geo")["connect_args"] == {
+        "server_settings": {"statement_timeout": "1500"}
+    }
+
+    monkeypatch.setattr(database, "DB_STATEMENT_TIMEOUT_MS", 0)
+    assert "connect_args" not in database.engine_options("postgresql://db/geo")
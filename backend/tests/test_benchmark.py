@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+
+import pytest
+
+import benchmark
+from schemas import SensorDataCreate
+
+
+def _report(**medians):
+    return {"scale": "10k", "database": "sqlite", "results": {
+        name: {"median_s": median} for name, median in medians.items()
+    }}
+
+
+def test_compare_statuses():
+    current = _report(seed=9.0, slower=1.3, faster=0.5, same=1.1, new=1.0)
+    baseline = _report(seed=1.0, slower=1.0, faster=1.0, same=1.0, removed=1.0)
+
+    rows = benchmark.compare(current, baseline, threshold=0.2)
+
+    assert [(row["name"], row["status"]) for row in rows] == [
+        ("faster", "improvement"), ("same", "ok"), ("slower", "regression"),
+    ]
+    assert rows[2]["ratio"] == 1.3
+
+
+def test_compare_command_exit_code(tmp_path, monkeypatch, capsys):
+    current, baseline = tmp_path / "current.json", tmp_path / "baseline.json"
+    current.write_text(json.dumps(_report(fuzzy_batch=1.5)))
+    baseline.write_text(json.dumps({**_report(fuzzy_batch=1.0), "scale": "1m"}))
+
+    for threshold, code in (("0.2", 1), ("0.6", 0)):
+        monkeypatch.setattr("sys.argv", ["benchmark", "compare", str(current), str(baseline), "--threshold", threshold])
+        with pytest.raises(SystemExit) as exit_info:
+            benchmark.main()
+        assert exit_info.value.code == code
+
+    output = capsys.readouterr().out
+    assert "Увага: scale відрізняється" in output
+    assert "Регресії (поріг 20%): fuzzy_batch" in output
+
+
+def test_timed_discards_first_run():
+    calls = []
+
+    result = benchmark.timed(lambda: calls.append(1) or 4, repeat=3)
+
+    assert len(calls) == 4
+    assert (result["repeat"], result["items"]) == (3, 4)
+    assert result["min_s"] <= result["median_s"] <= result["max_s"]
+
+
+def test_ingest_body_is_accepted_by_bulk_upload(client, location):
+    body = benchmark.ingest_body(location, 50)
+
+    header, *rows = list(csv.reader(io.StringIO(body.decode())))
+    assert header == list(SensorDataCreate.model_fields)
+    assert len(rows) == 50
+    report = client.post("/api/sensor-data/bulk", params={"format": "csv"}, content=body).json()
+    assert (report["accepted"], report["rejected"]) == (50, 0)
+
+
+def test_cases_run_against_seeded_database(client, monkeypatch):
+    monkeypatch.setattr(benchmark, "FUZZY_BATCH_ROWS", 50)
+    monkeypatch.setattr(benchmark, "FUZZY_SINGLE_ROWS", 5)
+    monkeypatch.setattr(benchmark, "INGEST_ROWS", 20)
+
+    seeded = benchmark.seed_database(200)
+    assert seeded["items"] == 200
+    assert benchmark.seed_database(200) is None
+
+    cases = benchmark.benchmark_cases(client, 200)
+    items = {name: case() for name, case in cases.items()}
+
+    assert items["fuzzy_batch"] == 50
+    assert items["ingest_bulk_csv"] == 20
+    assert items["sensor_data_day"] == items["sensor_data_day_columns"] == items["predict_batch"] == 20
+    # Завантажені вимірювання видалено, база лишилась тією ж
+    assert benchmark.seed_database(200) is None
@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from downsampling import format_timestamps, load_columns, lttb_indices, minmax_indices
+from models import SensorData
+from services import store_sensor_readings
+
+
+def _reference_lttb(x, y, threshold):
+    """Покрокова реалізація LTTB за описом алгоритму (Steinarsson, 2013)"""
+    n = len(x)
+    every = (n - 2) / (threshold - 2)
+    selected, a = [0], 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)
+        if i == threshold - 3:
+            next_start, next_end = n - 1, n
+        average_x = np.mean(x[next_start:next_end])
+        average_y = np.mean(y[next_start:next_end])
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((x[a] - average_x) * (y[j] - y[a]) - (x[a] - x[j]) * (average_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return np.array(selected)
+
+
+@pytest.mark.parametrize("n, threshold", [(1000, 50), (962, 50), (97, 10), (500, 7), (10, 3)])
+def test_lttb_matches_reference(n, threshold):
+    rng = np.random.default_rng(n)
+    x = np.cumsum(rng.uniform(0.5, 1.5, n))
+    y = np.cumsum(rng.normal(size=n))
+
+    indices = lttb_indices(x, y, threshold)
+
+    assert len(indices) == threshold
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert (np.diff(indices) > 0).all()
+    np.testing.assert_array_equal(indices, _reference_lttb(x, y, threshold))
+
+
+def test_lttb_keeps_short_series():
+    x = np.arange(5.0)
+    np.testing.assert_array_equal(lttb_indices(x, x, 10), np.arange(5))
+    np.testing.assert_array_equal(lttb_indices(x, x, 2), np.arange(5))
+
+
+def test_minmax_keeps_extremes_of_each_bucket():
+    rng = np.random.default_rng(0)
+    x = np.arange(1000.0)
+    y = rng.normal(size=1000)
+    y[123], y[777] = 50.0, -50.0
+
+    indices = minmax_indices(x, y, 20)
+
+    assert len(indices) <= 20
+    assert (np.diff(indices) > 0).all()
+    assert {123, 777} <= set(indices.tolist())
+    for bucket in range(10):
+        chunk = slice(bucket * 100, (bucket + 1) * 100)
+        in_bucket = indices[(indices >= bucket * 100) & (indices < (bucket + 1) * 100)]
+        assert y[chunk].max() in y[in_bucket] and y[chunk].min() in y[in_bucket]
+
+
+def test_load_columns_returns_numpy_arrays(db, location, make_reading):
+    store_sensor_readings(db, [
+        make_reading(location, datetime(2024, 1, 1, 10, 0, 0, 250000), pm2_5=1.5),
+        make_reading(location, datetime(2024, 1, 1, 11), pm2_5=None),
+    ])
+
+    columns = load_columns(
+        db, select(SensorData.timestamp, SensorData.pm2_5).order_by(SensorData.timestamp)
+    )
+
+    assert columns["timestamp"].dtype == np.dtype("datetime64[us]")
+    assert columns["timestamp"][0] == np.datetime64("2024-01-01T10:00:00.250000")
+    np.testing.assert_array_equal(columns["pm2_5"], [1.5, np.nan])
+    assert all(column.flags.c_contiguous for column in columns.values())
+
+
+def test_load_columns_of_empty_result(db):
+    columns = load_columns(db, select(SensorData.timestamp, SensorData.pm2_5))
+
+    assert len(columns["timestamp"]) == len(columns["pm2_5"]) == 0
+
+
+def test_format_timestamps_keeps_fractional_seconds():
+    timestamps = np.array(["2024-01-01T10:00:00", "2024-01-01T10:00:00.000250"], dtype="datetime64[us]")
+
+    assert format_timestamps(timestamps) == ["2024-01-01T10:00:00", "2024-01-01T10:00:00.000250"]
+
+
+def test_endpoint_downsamples_each_series(client, db, location, make_reading):
+    start = datetime(2024, 1, 1)
+    store_sensor_readings(db, [
+        make_reading(location, start + timedelta(minutes=5 * i, milliseconds=500 * (i % 2)),
+                     pm2_5=float(i % 17), ozone=None if i % 3 else float(i))
+        for i in range(300)
+    ])
+
+    body = client.get(
+        f"/api/sensor-data/location/{location}",
+        params={"start_date": "2024-01-01T00:00:00", "end_date": "2024-01-03T00:00:00",
+                "max_points": 20, "fields": ["pm2_5", "ozone"]},
+    ).json()
+
+    assert body["total_points"] == 300
+    pm2_5, ozone = body["series"]["pm2_5"], body["series"]["ozone"]
+    assert len(pm2_5["values"]) == len(pm2_5["timestamps"]) == 20
+    assert pm2_5["timestamps"][0] == "2024-01-01T00:00:00"
+    assert pm2_5["timestamps"][-1] == (start + timedelta(minutes=1495, milliseconds=500)).isoformat()
+    # NULL пропускаються: ряд ozone будується лише зі 100 наявних значень
+    assert len(ozone["values"]) == 20 and None not in ozone["values"]
@@ -0,0 +1,101 @@
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from starlette.requests import Request
+
+from encoding import accept_qualities, encode_json, to_columns, wants_msgpack
+from services import store_sensor_readings
+
+PERIOD = {"start_date": "2024-01-01T00:00:00", "end_date": "2024-01-02T00:00:00"}
+
+
+@pytest.fixture
+def readings(db, location, make_reading):
+    store_sensor_readings(db, [
+        make_reading(location, datetime(2024, 1, 1) + timedelta(hours=hour), pm2_5=float(hour * 10))
+        for hour in range(5)
+    ])
+    return location
+
+
+def test_encode_json_handles_numpy_and_dates():
+    content = {
+        "array": np.array([1.5, np.nan]),
+        "scalar": np.int64(3),
+        "timestamp": datetime(2024, 1, 1, 10, 30),
+        1: "ключ",
+    }
+
+    decoded = json.loads(encode_json(content))
+
+    assert decoded == {"array": [1.5, None], "scalar": 3, "timestamp": "2024-01-01T10:30:00", "1": "ключ"}
+
+
+def test_to_columns():
+    assert to_columns([(datetime(2024, 1, 1), 1.0), (datetime(2024, 1, 2), 2.0)], ["timestamp", "pm2_5"]) == {
+        "timestamps": [datetime(2024, 1, 1), datetime(2024, 1, 2)],
+        "pm2_5": [1.0, 2.0],
+    }
+    assert to_columns([], ["timestamp", "pm2_5"]) == {"timestamps": [], "pm2_5": []}
+
+
+def test_accept_qualities():
+    assert accept_qualities("application/json, application/msgpack;q=0") == {
+        "application/json": 1.0, "application/msgpack": 0.0,
+    }
+    assert accept_qualities(" Application/MsgPack ; Q=0.5 ,*/*;q=x,") == {"application/msgpack": 0.5, "*/*": 0.0}
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("application/msgpack", True),
+    ("application/x-msgpack, application/json", True),
+    ("application/json, application/msgpack;q=0", False),
+    ("application/json;q=0.9, application/msgpack;q=0.5", False),
+    ("application/json;q=0.5, application/msgpack;q=0.9", True),
+    ("application/msgpack;q=0.5, */*", False),
+    ("application/msgpack;q=0.5, text/html", True),
+    ("*/*", False),
+    ("", False),
+])
+def test_wants_msgpack_honours_quality(accept, expected):
+    pytest.importorskip("msgpack")
+    request = Request({"type": "http", "headers": [(b"accept", accept.encode())]})
+
+    assert wants_msgpack(request) is expected
+
+
+def test_sensor_data_columns_match_rows(client, readings):
+    rows = client.get("/api/sensor-data/", params=PERIOD).json()
+    columns = client.get("/api/sensor-data/", params={**PERIOD, "layout": "columns"}).json()["sensor_data"]
+
+    assert columns["timestamps"] == [row["timestamp"] for row in rows]
+    for key in ("id", "pm2_5", "location_id", "air_quality_score"):
+        assert columns[key] == [row[key] for row in rows]
+
+
+def test_msgpack_matches_json(client, readings):
+    msgpack = pytest.importorskip("msgpack")
+    params = {**PERIOD, "layout": "columns"}
+
+    response = client.get(f"/api/air-quality/location/{readings}", params=params, headers={"Accept": "application/msgpack"})
+
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content) == client.get(f"/api/air-quality/location/{readings}", params=params).json()
+
+
+def test_air_quality_layouts_and_summary_only(client, readings):
+    path = f"/api/air-quality/location/{readings}"
+    rows = client.get(path, params=PERIOD).json()
+    columns = client.get(path, params={**PERIOD, "layout": "columns"}).json()
+    summary = client.get(path, params={**PERIOD, "summary_only": True}).json()
+
+    detailed = columns.pop("detailed_results")
+    assert detailed["timestamps"] == [item["timestamp"] for item in rows["detailed_results"]]
+    assert detailed["score"] == [item["air_quality_result"].get("score") for item in rows["detailed_results"]]
+    assert detailed["description"] == [item["air_quality_result"]["description"] for item in rows["detailed_results"]]
+    assert detailed["pm2_5"] == [0.0, 10.0, 20.0, 30.0, 40.0]
+    assert "detailed_results" not in summary
+    assert summary == columns == {key: value for key, value in rows.items() if key != "detailed_results"}
@@ -0,0 +1,68 @@
+import io
+from datetime import datetime, timedelta
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet  # noqa: E402
+
+from export import export_schema, export_statement, iter_arrow_stream, write_partitioned_parquet  # noqa: E402
+from models import Location, SensorData  # noqa: E402
+from services import store_sensor_readings  # noqa: E402
+
+
+@pytest.fixture
+def readings(db, make_reading):
+    first, second = Location(name="A"), Location(name="B")
+    db.add_all([first, second])
+    db.commit()
+    store_sensor_readings(db, [
+        make_reading(location.id, datetime(2024, 1, 30, 12, 0, 0, 500) + timedelta(days=day), pm2_5=float(day))
+        for location in (first, second)
+        for day in range(4)
+    ] + [make_reading(first.id, datetime(2024, 1, 31), ozone=None)])
+    return first.id, second.id
+
+
+def test_arrow_stream_matches_table(db, readings):
+    stream = b"".join(iter_arrow_stream(export_statement(), batch_size=3))
+
+    table = pa.ipc.open_stream(io.BytesIO(stream)).read_all()
+
+    assert table.schema == export_schema()
+    assert table.num_rows == db.query(SensorData).count() == 9
+    rows = table.to_pylist()
+    assert [(row["location_id"], row["timestamp"]) for row in rows] == sorted(
+        (row["location_id"], row["timestamp"]) for row in rows
+    )
+    assert rows[0]["timestamp"] == datetime(2024, 1, 30, 12, 0, 0, 500)
+    assert sum(row["ozone"] is None for row in rows) == 1
+
+
+def test_partitioned_parquet_by_location_and_month(tmp_path, readings):
+    first, second = readings
+
+    files = write_partitioned_parquet(export_statement(), str(tmp_path), batch_size=4)
+
+    relative = {str(path.relative_to(tmp_path)) for path in tmp_path.rglob("*.parquet")}
+    assert relative == {
+        f"location_id={location}/month={month}/part-0.parquet"
+        for location in (first, second) for month in ("2024-01", "2024-02")
+    }
+    assert sum(files.values()) == 9
+    dataset = pa.parquet.read_table(str(tmp_path))
+    assert dataset.num_rows == 9
+    assert pa.parquet.read_schema(next(iter(files))).get_field_index("location_id") == -1
+
+
+def test_export_endpoint(client, readings):
+    first, _ = readings
+
+    parquet = client.get("/api/sensor-data/export", params={"location_ids": [first], "end_date": "2024-01-31T23:00:00"})
+    arrow = client.get("/api/sensor-data/export", params={"format": "arrow", "start_date": "2024-02-01T00:00:00"})
+
+    assert parquet.headers["content-type"] == "application/vnd.apache.parquet"
+    table = pa.parquet.read_table(io.BytesIO(parquet.content))
+    assert table.column("location_id").to_pylist() == [first] * 3
+    assert arrow.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    assert pa.ipc.open_stream(io.BytesIO(arrow.content)).read_all().num_rows == 4
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from features import (
+    FEATURE_FIELDS, NEXT_HOUR, NEXT_HOUR_TOLERANCE, _next_hour_targets, iter_training_chunks,
+)
+from models import SensorData
+
+
+def _jittered_timestamps(count: int, seed: int = 0) -> np.ndarray:
+    # Щогодинні вимірювання зі зсувом до ±20 хв: наступне вимірювання буває і раніше, і пізніше t+1h
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2024-01-01T00:00', 'us')
+    jitter = rng.integers(-20 * 60, 20 * 60, count).astype('timedelta64[s]')
+    return np.sort(start + np.arange(count) * NEXT_HOUR + jitter)
+
+
+def _expected_targets(timestamps: np.ndarray, pm2_5: np.ndarray) -> np.ndarray:
+    expected = np.full(len(timestamps), np.nan)
+    for i, timestamp in enumerate(timestamps):
+        distances = np.abs(timestamps - (timestamp + NEXT_HOUR))
+        distances[i] = np.timedelta64(365, 'D')
+        nearest = int(np.argmin(distances))
+        if distances[nearest] <= NEXT_HOUR_TOLERANCE:
+            expected[i] = pm2_5[nearest]
+    return expected
+
+
+def _buffer(timestamps: np.ndarray) -> dict:
+    features = np.tile(np.arange(len(timestamps), dtype=float)[:, None], (1, len(FEATURE_FIELDS)))
+    return {
+        'id': np.arange(len(timestamps), dtype=np.int64),
+        'timestamp': timestamps,
+        'score': np.full(len(timestamps), np.nan),
+        'features': features,
+    }
+
+
+def test_next_hour_target_matches_readings_before_and_after_the_hour():
+    timestamps = np.array(
+        ['2024-01-01T00:00', '2024-01-01T00:55', '2024-01-01T02:10', '2024-01-01T02:40', '2024-01-01T05:00'],
+        dtype='datetime64[us]',
+    )
+    ready, targets, pending = _next_hour_targets(_buffer(timestamps), last=True)
+
+    pm2_5 = ready['features'][:, FEATURE_FIELDS.index('pm2_5')]
+    # 00:00 -> 00:55 (на 5 хв раніше за t+1h), 00:55 -> 02:10 (на 15 хв пізніше, межа включно)
+    assert targets[0] == pm2_5[1]
+    assert targets[1] == pm2_5[2]
+    # 02:10 -> немає в межах 03:10 ±15 хв, 02:40 та 05:00 - немає наступного
+    assert np.isnan(targets[2:]).all()
+    assert not len(pending['id'])
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_next_hour_target_is_nearest_within_tolerance(seed):
+    timestamps = _jittered_timestamps(300, seed)
+    buffer = _buffer(timestamps)
+
+    _, targets, _ = _next_hour_targets(buffer, last=True)
+
+    expected = _expected_targets(timestamps, buffer['features'][:, FEATURE_FIELDS.index('pm2_5')])
+    np.testing.assert_array_equal(targets, expected)
+    # Зі зсувом ±20 хв частина цілей лежить раніше за t+1h
+    earlier = [
+        i for i in range(len(timestamps) - 1)
+        if not np.isnan(targets[i]) and timestamps[i + 1] < timestamps[i] + NEXT_HOUR
+    ]
+    assert earlier
+
+
+def test_next_hour_targets_across_chunks(db, location):
+    timestamps = _jittered_timestamps(60, seed=3)
+    rng = np.random.default_rng(3)
+    readings = []
+    for timestamp in timestamps:
+        values = {field: float(rng.uniform(1, 100)) for field in FEATURE_FIELDS}
+        readings.append(SensorData(location_id=location, timestamp=timestamp.astype(datetime), **values))
+    db.add_all(readings)
+    db.commit()
+
+    targets, ids = [], []
+    for _, chunk_targets, chunk_ids, _ in iter_training_chunks(db, 'pm2_5_next_hour', chunk_size=7):
+        targets.extend(chunk_targets)
+        ids.extend(chunk_ids)
+
+    by_timestamp = sorted(readings, key=lambda reading: reading.timestamp)
+    expected = _expected_targets(timestamps, np.array([reading.pm2_5 for reading in by_timestamp]))
+    expected_ids = [reading.id for reading, target in zip(by_timestamp, expected) if not np.isnan(target)]
+
+    assert ids == expected_ids
+    np.testing.assert_allclose(targets, expected[~np.isnan(expected)])
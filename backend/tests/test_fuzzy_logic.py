@@ -0,0 +1,160 @@
+import numpy as np
+import pytest
+
+from fuzzy_logic import BATCH_SCORE_TOLERANCE, INPUT_FIELDS, AdvancedAirQualityFuzzySystem, ScoreCache
+
+
+@pytest.fixture(scope="module")
+def reference():
+    """Система без кешу: її ControlSystemSimulation - еталон для пакетних оцінок"""
+    return AdvancedAirQualityFuzzySystem()
+
+
+def _simulate(system, values: np.ndarray) -> np.ndarray:
+    """Оцінки skfuzzy ControlSystemSimulation по одному рядку (NaN, якщо не спрацювало жодне правило)"""
+    simulation = system.air_quality_simulation
+    scores = []
+    for row in values:
+        for variable, value in zip(system.batch_inputs, row):
+            simulation.input[variable.label] = value
+        try:
+            simulation.compute()
+            scores.append(simulation.output['Air Quality'])
+        except (KeyError, ValueError, AssertionError):
+            scores.append(np.nan)
+    return np.array(scores)
+
+
+def _random_inputs(system, seed: int, size: int = 200) -> np.ndarray:
+    """Випадкові входи, частина з яких виходить за межі універсумів (від'ємні та завеликі)"""
+    rng = np.random.default_rng(seed)
+    lower = np.array([variable.universe.min() for variable in system.batch_inputs])
+    upper = np.array([variable.universe.max() for variable in system.batch_inputs])
+    span = upper - lower
+    return lower + rng.uniform(-0.1, 1.2, (size, len(INPUT_FIELDS))) * span
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_batch_matches_simulation(reference, seed):
+    values = _random_inputs(reference, seed)
+    assert (values < 0).any() and (values > np.array([v.universe.max() for v in reference.batch_inputs])).any()
+
+    batch = reference.evaluate_air_quality_batch(values)
+
+    np.testing.assert_allclose(batch, _simulate(reference, values), rtol=0, atol=BATCH_SCORE_TOLERANCE)
+
+
+def test_batch_returns_nan_only_for_incomplete_rows(reference):
+    values = _random_inputs(reference, seed=2, size=20)
+    values[[3, 7], [0, 8]] = np.nan
+
+    batch = reference.evaluate_air_quality_batch(values, chunk_size=6)
+
+    complete = ~np.isnan(values).any(axis=1)
+    assert np.isnan(batch[~complete]).all()
+    np.testing.assert_allclose(
+        batch[complete], _simulate(reference, values[complete]), rtol=0, atol=BATCH_SCORE_TOLERANCE
+    )
+
+
+def test_batch_returns_nan_when_no_rule_fires(reference):
+    # Жодне правило не спрацьовує: ControlSystemSimulation не має виходу
+    values = np.array([
+        [26.53, 31.19, 33.29, 110.8, 5.59, 29.13, 0.3899, 0.0607, 1.07],
+        [10.0] * len(INPUT_FIELDS),
+    ])
+
+    batch = reference.evaluate_air_quality_batch(values)
+
+    np.testing.assert_allclose(batch, _simulate(reference, values), rtol=0, atol=BATCH_SCORE_TOLERANCE)
+    assert np.isnan(batch[0]) and not np.isnan(batch[1])
+
+
+def test_cached_batch_matches_simulation_on_quantized_inputs(reference):
+    system = AdvancedAirQualityFuzzySystem(cache_size=1000)
+    values = _random_inputs(system, seed=3)
+    values[5, 2] = np.nan
+
+    batch = system.evaluate_air_quality_batch(values)
+
+    # З кешем входи квантуються до вузлів сітки; еталон - симуляція на тих самих вузлах
+    quantized = np.column_stack([
+        table.lower + table.quantize(values[:, column]) * table.step
+        for column, table in enumerate(system.membership_tables)
+    ])
+    complete = ~np.isnan(values).any(axis=1)
+    assert np.isnan(batch[5])
+    np.testing.assert_allclose(
+        batch[complete], _simulate(reference, quantized[complete]), rtol=0, atol=BATCH_SCORE_TOLERANCE
+    )
+
+
+def test_cached_batch_matches_cached_single_evaluation():
+    values = _random_inputs(AdvancedAirQualityFuzzySystem(), seed=4, size=50)
+    batch_system = AdvancedAirQualityFuzzySystem(cache_size=1000)
+    single_system = AdvancedAirQualityFuzzySystem(cache_size=1000)
+
+    batch = batch_system.evaluate_air_quality_batch(values)
+    single = [
+        single_system.evaluate_air_quality(dict(zip(INPUT_FIELDS, row)))["score"] for row in values
+    ]
+
+    np.testing.assert_allclose(np.round(batch, 2), single, rtol=0, atol=BATCH_SCORE_TOLERANCE)
+
+    # Повторна оцінка тих самих входів обслуговується з кешу
+    hits = batch_system.score_cache.hits
+    np.testing.assert_array_equal(batch_system.evaluate_air_quality_batch(values), batch)
+    assert batch_system.score_cache.hits == hits + len(np.unique(
+        np.column_stack([table.quantize(values[:, i]) for i, table in enumerate(batch_system.membership_tables)]),
+        axis=0,
+    ))
+
+
+def test_lookup_tables_match_memberships_on_the_grid(reference):
+    import skfuzzy as fuzz
+
+    system = AdvancedAirQualityFuzzySystem(cache_size=10)
+    rng = np.random.default_rng(5)
+    for variable, table in zip(reference.batch_inputs, system.membership_tables):
+        values = rng.uniform(table.lower - 1, table.upper + 1, 50)
+        indices = table.quantize(values)
+
+        assert indices.tolist() == [table.index(value) for value in values]
+        assert indices.min() >= 0 and table.lower + indices.max() * table.step <= table.upper + 1e-9
+        grid = table.lower + indices * table.step
+        assert np.abs(np.clip(values, table.lower, table.upper) - grid).max() <= table.step / 2 + 1e-9
+        for term in variable.terms.values():
+            np.testing.assert_allclose(
+                table.memberships[term.label][indices],
+                fuzz.interp_membership(variable.universe, term.mf, grid),
+                rtol=0, atol=1e-12,
+            )
+
+
+def test_score_cache_evicts_least_recently_used():
+    cache = ScoreCache(maxsize=2)
+    cache.put((1,), 1.0)
+    cache.put((2,), 2.0)
+    assert cache.get((1,)) == 1.0
+    cache.put((3,), 3.0)
+
+    assert cache.get((2,)) is None
+    assert cache.get((3,)) == 3.0
+    assert cache.stats() == {
+        "size": 2, "maxsize": 2, "hits": 2, "misses": 1, "evictions": 1, "hit_rate": round(2 / 3, 4),
+    }
+    cache.clear()
+    assert cache.stats()["size"] == cache.stats()["hits"] == 0
+
+
+def test_cache_is_shared_and_disabled_by_default():
+    assert AdvancedAirQualityFuzzySystem().cache_stats() == {"enabled": False}
+
+    shared = ScoreCache(100)
+    first = AdvancedAirQualityFuzzySystem(score_cache=shared)
+    second = AdvancedAirQualityFuzzySystem(score_cache=shared)
+    reading = {field: 12.0 for field in INPUT_FIELDS}
+
+    assert first.evaluate_air_quality(reading) == second.evaluate_air_quality(reading)
+    assert (shared.misses, shared.hits) == (1, 1)
+    assert second.cache_stats()["enabled"] is True
@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from fuzzy_logic import INPUT_FIELDS, AdvancedAirQualityFuzzySystem, FuzzySystemPool
+
+
+def _readings(seed: int, size: int):
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(0, 1, (size, len(INPUT_FIELDS))) * [250, 250, 400, 400, 80, 250, 4, 0.8, 8]
+    return values, [dict(zip(INPUT_FIELDS, row)) for row in values.tolist()]
+
+
+def test_parallel_single_evaluations_match_serial():
+    values, readings = _readings(seed=0, size=60)
+    expected = [AdvancedAirQualityFuzzySystem().evaluate_air_quality(reading)["score"] for reading in readings]
+    pool = FuzzySystemPool(size=3)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        scores = list(executor.map(lambda reading: pool.evaluate_air_quality(reading)["score"], readings))
+
+    assert scores == expected
+    # Екземплярів не більше за розмір пулу, навіть якщо потоків більше
+    assert 1 <= pool.cache_stats()["pool_created"] <= 3
+
+
+def test_checkout_gives_exclusive_instances():
+    pool = FuzzySystemPool(size=2)
+
+    with pool.checkout() as first, pool.checkout() as second:
+        assert first is not second
+    with pool.checkout() as again:
+        assert again in (first, second)
+
+
+def test_process_mode_matches_in_process_batch():
+    values, _ = _readings(seed=1, size=500)
+    values[10, 3] = np.nan
+    pool = FuzzySystemPool(size=1, processes=2, process_threshold=100)
+
+    try:
+        scores = pool.evaluate_air_quality_batch(values)
+        assert pool._executor is not None
+    finally:
+        pool.shutdown()
+
+    np.testing.assert_array_equal(scores, FuzzySystemPool(size=1).evaluate_air_quality_batch(values))
+    assert np.isnan(scores[10])
+
+
+def test_pool_shares_the_score_cache():
+    pool = FuzzySystemPool(size=2, cache_size=100)
+    reading = {field: 20.0 for field in INPUT_FIELDS}
+
+    pool.evaluate_air_quality(reading)
+    pool.evaluate_air_quality_batch(np.array([[20.0] * len(INPUT_FIELDS)]))
+
+    stats = pool.cache_stats()
+    assert (stats["misses"], stats["hits"]) == (1, 1)
+    assert not FuzzySystemPool(size=1).loaded
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+from contextlib import nullcontext
+
+import numpy as np
+import pytest
+
+import hooks
+from fuzzy_logic import INPUT_FIELDS, FuzzySystemPool
+from metrics import FUZZY_ROWS_SCORED, registry
+
+
+def test_domain_modules_do_not_import_observability():
+    code = (
+        "import sys, fuzzy_logic, ai_model\n"
+        "loaded = {'metrics', 'profiling', 'sqlalchemy', 'starlette'} & set(sys.modules)\n"
+        "assert not loaded, loaded\n"
+    )
+    app = os.path.join(os.path.dirname(__file__), os.pardir, "app")
+    subprocess.run([sys.executable, "-c", code], cwd=app, env={**os.environ, "PYTHONPATH": app}, check=True)
+
+
+@pytest.fixture
+def events(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(hooks, "_observers", [
+        *hooks._observers,
+        lambda event, labels, rows: recorded.append((event, labels, rows)) or nullcontext(),
+    ])
+    return recorded
+
+
+def test_fuzzy_pool_reports_evaluations(events):
+    pool = FuzzySystemPool(size=1)
+    batch_rows = FUZZY_ROWS_SCORED._values.get(("batch",), 0)
+
+    pool.evaluate_air_quality({field: 10.0 for field in INPUT_FIELDS})
+    pool.evaluate_air_quality_batch(np.full((3, len(INPUT_FIELDS)), 10.0))
+
+    assert events == [
+        (hooks.FUZZY_EVALUATION, ("single",), 1),
+        (hooks.FUZZY_EVALUATION, ("batch",), 3),
+    ]
+    assert FUZZY_ROWS_SCORED._values[("batch",)] == batch_rows + 3
+    assert "fuzzy_evaluation_duration_seconds_count" in registry.render()
+
+
+def test_observe_without_observers_is_a_no_op(monkeypatch):
+    monkeypatch.setattr(hooks, "_observers", [])
+
+    assert hooks.observe(hooks.MODEL_PREDICT, rows=5) is hooks._NOTHING
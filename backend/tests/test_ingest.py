@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+import api
+from ingest import IngestReport, RowParser, detect_format, iter_lines
+from models import MEASUREMENT_FIELDS, SensorData
+
+
+def _row(location_id, hour, **values):
+    return {
+        "sensor_id": "sensor-1",
+        "location_id": location_id,
+        "timestamp": f"2024-01-01T{hour:02d}:00:00",
+        **{field: 10.0 for field in MEASUREMENT_FIELDS},
+        **values,
+    }
+
+
+def _post(client, body: str, content_type: str, **params):
+    return client.post("/api/sensor-data/bulk", content=body.encode(), headers={"Content-Type": content_type}, params=params)
+
+
+def test_ndjson_rejects_bad_rows_and_stores_the_rest(client, db, location, monkeypatch):
+    monkeypatch.setattr(api, "BULK_CHUNK_SIZE", 2)
+    lines = [
+        json.dumps(_row(location, 1)),
+        "{not json",
+        "[1, 2]",
+        json.dumps(_row(location, 2, pm2_5="багато")),
+        "",
+        json.dumps(_row(location + 1000, 3)),
+        json.dumps(_row(location, 4)),
+    ]
+
+    report = _post(client, "\n".join(lines), "application/x-ndjson").json()
+
+    assert (report["accepted"], report["rejected"]) == (2, 4)
+    assert [error["line"] for error in report["errors"]] == [2, 3, 4, 6]
+    assert "pm2_5" in report["errors"][2]["error"]
+    assert report["errors"][3]["error"] == f"Локацію з id {location + 1000} не знайдено"
+    stored = db.query(SensorData).order_by(SensorData.timestamp).all()
+    assert [row.timestamp.hour for row in stored] == [1, 4]
+    assert all(row.air_quality_score is not None for row in stored)
+
+
+def test_csv_with_header_and_crlf(client, db, location):
+    header = list(_row(location, 0))
+    rows = [
+        ",".join(str(value) for value in _row(location, 1).values()),
+        ",".join(str(value) for value in _row(location, 2).values())[:-5],
+        ",".join("" if key == "ozone" else str(value) for key, value in _row(location, 3).items()),
+    ]
+    body = "\r\n".join([",".join(header), *rows]) + "\r\n"
+
+    report = _post(client, body, "text/csv; charset=utf-8").json()
+
+    assert (report["accepted"], report["rejected"]) == (1, 2)
+    assert report["errors"][0]["line"] == 3
+    assert report["errors"][1]["error"].startswith("ozone")
+    assert db.query(SensorData).count() == 1
+
+
+def test_unknown_format_is_rejected(client):
+    response = _post(client, "{}", "application/json")
+    assert response.status_code == 415
+
+    # Параметр format має перевагу над заголовком
+    assert _post(client, "", "application/json", format="ndjson").json()["accepted"] == 0
+
+
+def test_iter_lines_splits_across_chunks():
+    async def stream():
+        for chunk in (b'{"a"', b': 1}\n{"b": 2}\r', b"\n\n", b"tail"):
+            yield chunk
+
+    async def collect():
+        return [item async for item in iter_lines(stream())]
+
+    assert asyncio.run(collect()) == [(1, '{"a": 1}'), (2, '{"b": 2}'), (3, ""), (4, "tail")]
+
+
+def test_parsers():
+    assert detect_format("application/jsonl") == "ndjson"
+    assert detect_format("TEXT/CSV; charset=utf-8") == "csv"
+    assert detect_format(None) is None
+
+    report = IngestReport()
+    parser = RowParser("csv")
+    assert parser.parse([(1, "a,b"), (2, "1,2")], report) == [(2, {"a": "1", "b": "2"})]
+    # Заголовок запам'ятовується для наступних частин
+    assert parser.parse([(3, "3,")], report) == [(3, {"a": "3"})]
+    assert report.as_dict() == {"accepted": 0, "rejected": 0, "errors": []}
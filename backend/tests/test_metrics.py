@@ -0,0 +1,72 @@
+import re
+from datetime import datetime
+
+from metrics import CONTENT_TYPE, UNMATCHED_ROUTE, Counter, Histogram, _statement_kind
+from services import store_sensor_readings
+
+
+def _sample(text: str, name: str, **labels) -> float:
+    label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf"^{re.escape(name)}{re.escape('{' + label_text + '}' if labels else '')} (\S+)$", text, re.M)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_histogram_exposition():
+    histogram = Histogram("latency_seconds", "Затримка", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, '/a"b')
+
+    assert histogram.collect() == [
+        "# HELP latency_seconds Затримка",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a\\"b",le="0.1"} 2',
+        'latency_seconds_bucket{route="/a\\"b",le="1"} 3',
+        'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a\\"b"} 3.65',
+        'latency_seconds_count{route="/a\\"b"} 4',
+    ]
+
+
+def test_counter_exposition():
+    counter = Counter("rows_total", "Рядки", ("mode",))
+    counter.inc("batch", amount=3)
+    counter.inc("single")
+    counter.inc("batch", amount=0.5)
+
+    assert counter.collect()[2:] == ['rows_total{mode="batch"} 3.5', 'rows_total{mode="single"} 1']
+
+
+def test_statement_kind():
+    assert _statement_kind("  select 1") == "SELECT"
+    assert _statement_kind("WITH x AS (SELECT 1) SELECT * FROM x") == "WITH"
+    assert _statement_kind("PRAGMA table_info(x)") == "OTHER"
+    assert _statement_kind("") == "OTHER"
+
+
+def test_metrics_endpoint_reports_routes_and_queries(client, db, location, make_reading):
+    store_sensor_readings(db, [make_reading(location, datetime(2024, 1, 1))])
+    route = "/api/sensor-data/location/{location_id}"
+    before = client.get("/metrics").text
+
+    params = {"start_date": "2024-01-01T00:00:00", "end_date": "2024-01-02T00:00:00"}
+    client.get(f"/api/sensor-data/location/{location}", params=params)
+    client.get(f"/api/sensor-data/location/{location + 1}", params=params)
+    client.get("/не-існує")
+    response = client.get("/metrics")
+
+    assert response.headers["content-type"] == CONTENT_TYPE
+    after = response.text
+    requests = "http_request_duration_seconds_count"
+    assert _sample(after, requests, method="GET", route=route, status="200") - \
+        _sample(before, requests, method="GET", route=route, status="200") == 2
+    assert _sample(after, requests, method="GET", route=UNMATCHED_ROUTE, status="404") - \
+        _sample(before, requests, method="GET", route=UNMATCHED_ROUTE, status="404") == 1
+    # Кожен запит до ендпоінту виконує хоча б один SQL-запит
+    queries = _sample(after, "db_queries_per_request_sum", route=route) - \
+        _sample(before, "db_queries_per_request_sum", route=route)
+    assert queries >= 2
+    assert _sample(after, "db_query_duration_seconds_count", statement="SELECT") > 0
+    assert _sample(after, "db_pool_size", engine="sync") > 0
+    # Сам ендпоінт /metrics не вимірюється
+    assert 'route="/metrics"' not in after
+    assert after.endswith("\n")
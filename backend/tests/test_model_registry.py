@@ -0,0 +1,151 @@
+import os
+import subprocess
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+from app.ai_model import ModelRegistry, PollutionPredictionModel
+
+
+def _trained_model(seed: int) -> PollutionPredictionModel:
+    rng = np.random.default_rng(seed)
+    X = rng.random((40, 3))
+    model = PollutionPredictionModel(n_estimators=5)
+    model.fit(X, X.sum(axis=1) * seed)
+    return model
+
+
+def test_register_into_missing_directory_then_activate_and_rollback(tmp_path):
+    directory = tmp_path / "registry"
+    registry = ModelRegistry(str(directory))
+
+    names = [registry.register(_trained_model(seed), {"mse": seed / 10})["name"] for seed in (1, 2, 3)]
+
+    assert names == ["v1", "v2", "v3"]
+    assert all(os.path.exists(directory / f"{name}.pkl") for name in names)
+    assert registry.versions()["active"] == "v3"
+
+    registry.activate("v1")
+    assert registry.active()[1]["name"] == "v1"
+
+    registry.rollback()
+    model, metadata = registry.active()
+    assert metadata["name"] == "v3"
+    assert model.predict(np.ones((1, 3)))[0] == pytest.approx(_trained_model(3).predict(np.ones((1, 3)))[0])
+
+    assert registry.rollback()["name"] == "v2"
+    assert registry.rollback()["name"] == "v1"
+    with pytest.raises(KeyError):
+        registry.rollback()
+
+
+def test_active_version_is_shared_through_manifest(tmp_path):
+    writer = ModelRegistry(str(tmp_path))
+    reader = ModelRegistry(str(tmp_path))
+
+    with pytest.raises(LookupError):
+        reader.active()
+
+    writer.register(_trained_model(1), {})
+    assert reader.active()[1]["name"] == "v1"
+    assert reader.loaded
+
+
+def test_register_rejects_existing_version(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    registry.register(_trained_model(1), {}, name="base")
+
+    with pytest.raises(ValueError):
+        registry.register(_trained_model(2), {}, name="base")
+
+
+def test_activate_unknown_version_keeps_active(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    registry.register(_trained_model(1), {})
+
+    with pytest.raises(KeyError):
+        registry.activate("v9")
+    assert registry.versions()["active"] == "v1"
+
+
+def test_registers_from_several_processes_get_distinct_versions(tmp_path):
+    code = (
+        "import sys\n"
+        "from ai_model import ModelRegistry, PollutionPredictionModel\n"
+        "registry = ModelRegistry(sys.argv[1])\n"
+        "for _ in range(3):\n"
+        "    registry.register(PollutionPredictionModel(n_estimators=1), {'process': sys.argv[2]})\n"
+    )
+    app = os.path.join(os.path.dirname(__file__), os.pardir, "app")
+    env = {**os.environ, "PYTHONPATH": app}
+    processes = [
+        subprocess.Popen([sys.executable, "-c", code, str(tmp_path), str(number)], env=env) for number in range(4)
+    ]
+    assert [process.wait(60) for process in processes] == [0] * 4
+
+    versions = ModelRegistry(str(tmp_path)).versions()["versions"]
+    assert sorted(version["name"] for version in versions) == sorted(f"v{number}" for number in range(1, 13))
+    assert sorted(path.name for path in tmp_path.iterdir() if path.suffix not in (".pkl",)) == [
+        "registry.json", "registry.lock",
+    ]
+
+
+def test_version_files_are_never_overwritten(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    (tmp_path / "v1.pkl").write_bytes(b"interrupted")
+    (tmp_path / "base.pkl").write_bytes(b"interrupted")
+
+    assert registry.register(_trained_model(1), {})["name"] == "v2"
+    with pytest.raises(ValueError):
+        registry.register(_trained_model(1), {}, name="base")
+    assert (tmp_path / "v1.pkl").read_bytes() == (tmp_path / "base.pkl").read_bytes() == b"interrupted"
+    assert "base" not in {version["name"] for version in registry.versions()["versions"]}
+
+
+def test_legacy_model_is_imported_once_and_reads_have_no_side_effects(tmp_path):
+    legacy = tmp_path / "model.pkl"
+    _trained_model(1).save_model(str(legacy))
+    directory = tmp_path / "registry"
+    registry = ModelRegistry(str(directory), legacy_filepath=str(legacy))
+
+    assert registry.versions() == {"active": None, "versions": []}
+    with pytest.raises(LookupError):
+        registry.active()
+    assert not directory.exists()
+
+    assert registry.import_legacy() == "legacy"
+    assert registry.import_legacy() is None
+    assert registry.active()[1]["name"] == "legacy"
+    assert registry.register(_trained_model(2), {})["name"] == "v1"
+    assert registry.rollback()["name"] == "legacy"
+
+
+def test_rollback_and_activate_do_not_interleave(tmp_path, monkeypatch):
+    registry = ModelRegistry(str(tmp_path))
+    for seed in (1, 2, 3):
+        registry.register(_trained_model(seed), {})
+    load_version = registry._load_version
+    loading, release = threading.Event(), threading.Event()
+
+    def slow_load(metadata):
+        if metadata["name"] == "v2":
+            loading.set()
+            release.wait(10)
+        return load_version(metadata)
+
+    monkeypatch.setattr(registry, "_load_version", slow_load)
+    rollback = threading.Thread(target=registry.rollback)
+    rollback.start()
+    assert loading.wait(10)
+    activate = threading.Thread(target=registry.activate, args=("v1",))
+    activate.start()
+    release.set()
+    rollback.join(10)
+    activate.join(10)
+
+    # Активація виконується після відкату, а не між читанням історії та зміною версії
+    manifest = registry.versions()
+    assert manifest["active"] == "v1"
+    assert registry._read_manifest()["history"] == []
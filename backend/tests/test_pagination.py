@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from pagination import decode_cursor, encode_cursor
+from services import store_sensor_readings
+
+PERIOD = {"start_date": "2024-01-01T00:00:00", "end_date": "2024-01-02T00:00:00"}
+
+
+@pytest.fixture
+def readings(db, location, make_reading):
+    """11 вимірювань, по кілька з однаковим часом (курсор має розрізняти їх за id)"""
+    store_sensor_readings(db, [
+        make_reading(location, datetime(2024, 1, 1) + timedelta(hours=index // 3), pm2_5=float(index))
+        for index in range(11)
+    ])
+    return location
+
+
+def _walk(client, path, limit, **params):
+    pages, cursor = [], None
+    while True:
+        body = client.get(path, params={**PERIOD, **params, "limit": limit, **({"cursor": cursor} if cursor else {})}).json()
+        pages.append(body["sensor_data"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("path", ["/api/sensor-data/", "/api/sensor-data/location/{location}"])
+def test_pages_cover_all_rows_once_in_key_order(client, readings, path):
+    pages = _walk(client, path.format(location=readings), limit=4)
+
+    assert [len(page) for page in pages] == [4, 4, 3]
+    rows = [row for page in pages for row in page]
+    assert [row["pm2_5"] for row in rows] == [float(index) for index in range(11)]
+    keys = [(row["timestamp"], row["id"]) for row in rows]
+    assert keys == sorted(keys)
+
+
+def test_exact_multiple_ends_with_empty_cursor(client, readings):
+    pages = _walk(client, "/api/sensor-data/", limit=11)
+
+    assert [len(page) for page in pages] == [11]
+
+
+def test_columns_layout_pages(client, readings):
+    first = client.get("/api/sensor-data/", params={**PERIOD, "limit": 5, "layout": "columns"}).json()
+    second = client.get(
+        "/api/sensor-data/", params={**PERIOD, "limit": 10, "layout": "columns", "cursor": first["next_cursor"]}
+    ).json()
+
+    assert first["sensor_data"]["pm2_5"] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert second["sensor_data"]["pm2_5"] == [float(index) for index in range(5, 11)]
+    assert second["next_cursor"] is None
+
+
+def test_invalid_cursor_is_rejected(client, readings):
+    response = client.get("/api/sensor-data/", params={**PERIOD, "limit": 2, "cursor": "не-курсор"})
+
+    assert response.status_code == 400
+    assert "Некоректний курсор" in response.json()["detail"]
+
+
+def test_cursor_round_trip():
+    timestamp = datetime(2024, 1, 1, 10, 30, 0, 123456)
+
+    cursor = encode_cursor(timestamp, 42)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (timestamp, 42)
+    with pytest.raises(ValueError):
+        decode_cursor(cursor[:-3])
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import api
+from ai_model import ModelRegistry, PollutionPredictionModel
+from models import PollutionPrediction
+from services import store_sensor_readings
+
+FEATURES = ["PM2.5", "Ozone"]
+PERIOD = {"start_date": "2024-01-01T00:00:00", "end_date": "2024-01-02T00:00:00"}
+
+
+@pytest.fixture
+def active_model(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.uniform(0, 100, (60, 2)), columns=FEATURES)
+    model = PollutionPredictionModel(n_estimators=5)
+    model.fit(X, X["PM2.5"] * 2 + X["Ozone"])
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    registry.register(model, {"features": FEATURES})
+    monkeypatch.setattr(api, "model_registry", registry)
+    return model
+
+
+def test_rows_are_predicted_in_one_call(client, active_model):
+    rows = [{"pm2_5": float(value), "ozone": float(100 - value)} for value in range(0, 100, 7)]
+
+    body = client.post("/api/predict/batch", json={"rows": rows + [{"pm2_5": 1.0, "ozone": "NaN"}]}).json()
+
+    expected = active_model.predict(pd.DataFrame([[row["pm2_5"], row["ozone"]] for row in rows], columns=FEATURES))
+    assert body["model_version"] == "v1"
+    assert body["count"] == len(rows) + 1
+    np.testing.assert_allclose(body["predictions"][:-1], expected)
+    # Рядок з пропущеною ознакою отримує null
+    assert body["predictions"][-1] is None
+
+
+def test_missing_feature_and_missing_model(client, active_model, tmp_path, monkeypatch):
+    response = client.post("/api/predict/batch", json={"rows": [{"pm2_5": 1.0}]})
+    assert response.status_code == 400
+    assert "ozone" in response.json()["detail"]
+
+    assert client.post("/api/predict/batch", json={}).status_code == 400
+
+    monkeypatch.setattr(api, "model_registry", ModelRegistry(str(tmp_path / "empty")))
+    assert client.post("/api/predict/batch", json={"rows": []}).status_code == 400
+
+
+def test_location_predictions_are_stored_once_per_model_version(client, db, location, make_reading, active_model):
+    store_sensor_readings(db, [
+        make_reading(location, datetime(2024, 1, 1) + timedelta(hours=hour), pm2_5=float(hour * 5))
+        for hour in range(6)
+    ] + [make_reading(location, datetime(2024, 1, 1, 6, 30), ozone=None)])
+    request = {"location_id": location, **PERIOD, "store": True}
+
+    body = client.post("/api/predict/batch", json=request).json()
+    assert client.post("/api/predict/batch", json=request).json()["stored"] == 6
+
+    assert body["count"] == 7 and body["stored"] == 6
+    assert body["timestamps"][0] == "2024-01-01T00:00:00"
+    assert body["timestamps"][-1] == "2024-01-01T06:30:00"
+    assert body["predictions"][-1] is None
+    stored = {
+        prediction.sensor_reading_id: prediction.predicted_value
+        for prediction in db.query(PollutionPrediction).filter(PollutionPrediction.model_version == "v1")
+    }
+    # Повторний запуск замінює прогнози, а не дублює їх
+    assert db.query(PollutionPrediction).count() == 6
+    assert stored == pytest.approx(dict(zip(body["reading_ids"][:-1], body["predictions"][:-1])))
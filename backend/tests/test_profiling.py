@@ -0,0 +1,89 @@
+import json
+import logging
+import re
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+import hooks
+import profiling
+from profiling import ProfilingMiddleware, stage
+from services import store_sensor_readings
+
+PERIOD = {"start_date": "2024-01-01T00:00:00", "end_date": "2024-01-02T00:00:00"}
+
+
+@pytest.fixture
+def profiled(client, tmp_path, monkeypatch):
+    """Додаток з профілюванням за токеном і префіксом шляху та етапом fuzzy з hooks"""
+    import main
+
+    monkeypatch.setattr(hooks, "_observers", [*hooks._observers, profiling._observe])
+    app = ProfilingMiddleware(main.app, token="secret", paths=["/api/ready"], directory=str(tmp_path))
+    return TestClient(app), tmp_path
+
+
+def _timings(response):
+    return {
+        name: float(duration)
+        for name, duration in re.findall(r"([a-z]+);dur=([0-9.]+)", response.headers["server-timing"])
+    }
+
+
+def test_requests_without_token_are_not_profiled(profiled, location):
+    test_client, directory = profiled
+
+    for headers in ({}, {"X-Profile": "wrong"}):
+        response = test_client.get(f"/api/air-quality/location/{location}", params=PERIOD, headers=headers)
+        assert response.status_code == 200
+        assert "server-timing" not in response.headers
+    assert not list(directory.iterdir())
+
+
+def test_profiled_request_reports_stages(profiled, db, location, make_reading):
+    test_client, directory = profiled
+    store_sensor_readings(db, [make_reading(location, datetime(2024, 1, 1, 10))])
+
+    response = test_client.get(
+        f"/api/air-quality/location/{location}", params=PERIOD, headers={"X-Profile": "secret"}
+    )
+
+    timings = _timings(response)
+    assert {"orm", "fuzzy", "sql", "other", "total"} <= set(timings)
+    parts = sum(duration for name, duration in timings.items() if name != "total")
+    assert parts == pytest.approx(timings["total"], abs=0.1)
+
+    profile_id = response.headers["x-profile-id"]
+    report = json.loads((directory / f"{profile_id}.json").read_text())
+    assert report["status"] == 200
+    assert report["sql"]["queries"] >= 2
+    assert report["stages"]["orm"]["sql_queries"] >= 2
+    assert (directory / f"{profile_id}.collapsed").exists()
+
+
+def test_path_prefix_profiles_without_header(profiled):
+    test_client, directory = profiled
+
+    response = test_client.get("/api/ready")
+
+    assert "x-profile-id" in response.headers
+    assert (directory / f"{response.headers['x-profile-id']}.json").exists()
+
+
+def test_saved_and_failed_profiles_are_logged(client, tmp_path, caplog):
+    import main
+
+    caplog.set_level(logging.INFO, logger="profiling")
+    TestClient(ProfilingMiddleware(main.app, paths=["/api/ready"], directory=str(tmp_path))).get("/api/ready")
+    assert "збережено" in caplog.records[-1].getMessage()
+
+    blocked = tmp_path / "file"
+    blocked.write_text("")
+    TestClient(ProfilingMiddleware(main.app, paths=["/api/ready"], directory=str(blocked))).get("/api/ready")
+    assert caplog.records[-1].levelno == logging.WARNING
+    assert "Не вдалося зберегти профіль" in caplog.records[-1].getMessage()
+
+
+def test_stage_outside_profiled_request_is_a_no_op():
+    assert stage("orm") is profiling._NO_STAGE
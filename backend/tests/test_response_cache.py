@@ -0,0 +1,180 @@
+import json
+from datetime import datetime
+
+import pytest
+from fastapi.responses import Response
+from starlette.requests import Request
+
+from response_cache import LRUCacheBackend, RedisCacheBackend, ResponseCache, response_cache
+from services import delete_sensor_readings, store_sensor_readings
+
+PERIOD = {"start_date": "2024-01-01T00:00:00", "end_date": "2024-01-02T00:00:00"}
+
+
+@pytest.fixture(params=["lru", "redis"])
+def backend(request):
+    if request.param == "lru":
+        return LRUCacheBackend()
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisCacheBackend(fakeredis.FakeRedis())
+
+
+def _request(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+class Builder:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"value": self.calls}
+
+
+def test_miss_then_hit(backend):
+    cache = ResponseCache(backend, ttl=60)
+    build = Builder()
+
+    first = cache.respond(_request(), "endpoint", {"a": 1}, [1], build)
+    second = cache.respond(_request(), "endpoint", {"a": 1}, [1], build)
+    other = cache.respond(_request(), "endpoint", {"a": 2}, [1], build)
+
+    assert build.calls == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert first.body == second.body == b'{"value":1}'
+    assert first.headers["etag"] == second.headers["etag"]
+    assert json.loads(other.body) == {"value": 2}
+
+
+def test_invalidate_bumps_only_affected_locations(backend):
+    cache = ResponseCache(backend, ttl=60)
+    build = Builder()
+    for locations in ([1], [2], None):
+        cache.respond(_request(), "endpoint", {}, locations, build)
+
+    cache.invalidate([1])
+
+    for locations in ([1], [2], None):
+        cache.respond(_request(), "endpoint", {}, locations, build)
+    # Локація 1 та запис без переліку локацій ("all") обчислюються знову, локація 2 - з кешу
+    assert build.calls == 5
+    assert cache.hits == 1
+
+
+def test_if_none_match_returns_304(backend):
+    cache = ResponseCache(backend, ttl=60)
+    build = Builder()
+    etag = cache.respond(_request(), "endpoint", {}, [1], build).headers["etag"]
+
+    cached = cache.respond(_request(if_none_match=etag), "endpoint", {}, [1], build)
+    any_tag = cache.respond(_request(if_none_match="*"), "endpoint", {}, [1], build)
+    listed = cache.respond(_request(if_none_match=f'"other", {etag}'), "endpoint", {}, [1], build)
+    changed = cache.respond(_request(if_none_match='"other"'), "endpoint", {}, [1], build)
+
+    assert cached.status_code == any_tag.status_code == listed.status_code == 304
+    assert cached.body == b"" and cached.headers["etag"] == etag
+    assert changed.status_code == 200
+    assert cache.not_modified == 3
+    assert build.calls == 1
+
+
+def test_error_responses_are_not_cached(backend):
+    cache = ResponseCache(backend, ttl=60)
+    calls = []
+
+    def build():
+        calls.append(1)
+        return Response(status_code=404)
+
+    cache.respond(_request(), "endpoint", {}, [1], build)
+    response = cache.respond(_request(), "endpoint", {}, [1], build)
+
+    assert response.status_code == 404
+    assert len(calls) == 2
+
+
+def test_lru_evicts_least_recently_used():
+    backend = LRUCacheBackend(max_entries=2)
+    backend.set("a", b"1", 60)
+    backend.set("b", b"2", 60)
+    backend.get("a")
+    backend.set("c", b"3", 60)
+
+    assert backend.get("a") == b"1"
+    assert backend.get("b") is None
+    assert backend.get("c") == b"3"
+
+
+def test_lru_entries_expire():
+    backend = LRUCacheBackend()
+    backend.set("a", b"1", -1)
+    assert backend.get("a") is None
+
+
+# Ендпоінт через HTTP: запис і видалення вимірювань скидають кеш після фіксації транзакції
+
+def _air_quality(client, location_id, **headers):
+    return client.get(f"/api/air-quality/location/{location_id}", params=PERIOD, headers=headers)
+
+
+def test_endpoint_cache_invalidated_after_commit(client, db, location, backend, make_reading):
+    response_cache.backend = backend
+    store_sensor_readings(db, [make_reading(location, datetime(2024, 1, 1, 10))])
+
+    first = _air_quality(client, location)
+    hits = response_cache.hits
+    second = _air_quality(client, location)
+    assert response_cache.hits == hits + 1
+    assert second.json() == first.json()
+    assert first.json()["total_readings"] == 1
+
+    # Запис: покоління локації збільшується після commit
+    store_sensor_readings(db, [make_reading(location, datetime(2024, 1, 1, 11))])
+    assert _air_quality(client, location).json()["total_readings"] == 2
+
+    # Видалення без фіксації (rollback) кеш не скидає
+    hits = response_cache.hits
+    delete_sensor_readings(db, location, datetime(2024, 1, 1), datetime(2024, 1, 2))
+    db.rollback()
+    assert _air_quality(client, location).json()["total_readings"] == 2
+    assert response_cache.hits == hits + 1
+
+    # Видалення з фіксацією
+    delete_sensor_readings(db, location, datetime(2024, 1, 1), datetime(2024, 1, 2))
+    db.commit()
+    assert _air_quality(client, location).json()["message"] == "Немає даних для аналізу"
+
+
+def test_endpoint_writes_to_other_location_keep_cache(client, db, backend, make_reading):
+    from models import Location
+
+    response_cache.backend = backend
+    first, second = Location(name="A"), Location(name="B")
+    db.add_all([first, second])
+    db.commit()
+    store_sensor_readings(db, [make_reading(first.id, datetime(2024, 1, 1, 10))])
+    _air_quality(client, first.id)
+
+    hits = response_cache.hits
+    store_sensor_readings(db, [make_reading(second.id, datetime(2024, 1, 1, 10))])
+    _air_quality(client, first.id)
+    assert response_cache.hits == hits + 1
+
+
+def test_endpoint_etag_returns_304(client, db, location, backend, make_reading):
+    response_cache.backend = backend
+    store_sensor_readings(db, [make_reading(location, datetime(2024, 1, 1, 10))])
+
+    response = _air_quality(client, location)
+    etag = response.headers["etag"]
+    not_modified = _air_quality(client, location, **{"If-None-Match": etag})
+
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import func, select, update
+
+from models import MEASUREMENT_FIELDS, SensorData, daily_rollups, hourly_rollups
+from rollups import rebuild_rollups, rollups_missing, summarize_readings
+from services import delete_sensor_readings, simulate_sensor_data_for_location, store_sensor_readings
+
+START, END = datetime(2024, 1, 1, 10, 30), datetime(2024, 1, 4, 13, 15)
+
+
+def _raw_summary(db, start, end):
+    """Та сама статистика агрегатами SQL безпосередньо з вимірювань"""
+    aggregates = [func.count()]
+    for field in MEASUREMENT_FIELDS:
+        column = getattr(SensorData, field)
+        aggregates += [func.avg(column), func.min(column), func.max(column)]
+    rows = db.execute(
+        select(SensorData.location_id, *aggregates)
+        .where(SensorData.timestamp.between(start, end))
+        .group_by(SensorData.location_id)
+    ).all()
+    return {
+        location_id: {
+            "count": count,
+            "mean": {field: values[3 * i] for i, field in enumerate(MEASUREMENT_FIELDS)},
+            "min": {field: values[3 * i + 1] for i, field in enumerate(MEASUREMENT_FIELDS)},
+            "max": {field: values[3 * i + 2] for i, field in enumerate(MEASUREMENT_FIELDS)},
+        }
+        for location_id, count, *values in rows
+    }
+
+
+def _assert_same_summary(actual, expected):
+    assert actual.keys() == expected.keys()
+    for location_id, stats in expected.items():
+        assert actual[location_id]["count"] == stats["count"]
+        for key in ("mean", "min", "max"):
+            for field, value in stats[key].items():
+                assert actual[location_id][key][field] == pytest.approx(value), (key, field)
+
+
+@pytest.fixture
+def readings_with_gaps(db, location, make_reading):
+    """Вимірювання кожні 20 хвилин; частина показників пропущена (NULL)"""
+    rng = np.random.default_rng(0)
+    readings = []
+    timestamp = datetime(2024, 1, 1)
+    while timestamp < datetime(2024, 1, 5):
+        values = {field: float(rng.uniform(0, 100)) for field in MEASUREMENT_FIELDS}
+        for field in rng.choice(MEASUREMENT_FIELDS, size=3, replace=False):
+            values[field] = None
+        # Показник, що зникає на цілі доби, та показник без жодного значення
+        if timestamp.day in (2, 3):
+            values["lead"] = None
+        values["cadmium"] = None
+        readings.append(make_reading(location, timestamp, **values))
+        timestamp += timedelta(minutes=20)
+    store_sensor_readings(db, readings)
+    return location
+
+
+def test_summary_with_null_measurements_matches_raw(db, readings_with_gaps):
+    summary = summarize_readings(db, START, END)
+
+    _assert_same_summary(summary, _raw_summary(db, START, END))
+    assert summary[readings_with_gaps]["mean"]["cadmium"] is None
+
+
+def test_rollups_store_per_field_counts(db, readings_with_gaps):
+    day = db.execute(
+        select(daily_rollups).where(daily_rollups.c.bucket_start == datetime(2024, 1, 2))
+    ).mappings().one()
+
+    raw = db.execute(
+        select(func.count(), func.count(SensorData.pm2_5), func.count(SensorData.lead))
+        .where(SensorData.timestamp >= datetime(2024, 1, 2), SensorData.timestamp < datetime(2024, 1, 3))
+    ).one()
+    assert (day["reading_count"], day["pm2_5_count"], day["lead_count"]) == tuple(raw)
+    assert day["lead_count"] == 0 and day["lead_sum"] is None
+
+
+def test_upsert_merges_writes_into_existing_buckets(db, location, make_reading):
+    store_sensor_readings(db, [make_reading(location, datetime(2024, 1, 1, 10, 5), pm2_5=4.0)])
+    store_sensor_readings(db, [
+        make_reading(location, datetime(2024, 1, 1, 10, 40), pm2_5=None),
+        make_reading(location, datetime(2024, 1, 1, 10, 50), pm2_5=10.0),
+    ])
+
+    hour = db.execute(select(hourly_rollups)).mappings().one()
+    assert (hour["reading_count"], hour["pm2_5_count"], hour["pm2_5_sum"]) == (3, 2, 14.0)
+    assert (hour["pm2_5_min"], hour["pm2_5_max"]) == (4.0, 10.0)
+    assert summarize_readings(db, datetime(2024, 1, 1), datetime(2024, 1, 2))[location]["mean"]["pm2_5"] == 7.0
+
+
+def test_refresh_after_delete_matches_raw(db, readings_with_gaps):
+    delete_sensor_readings(db, readings_with_gaps, datetime(2024, 1, 2, 5, 10), datetime(2024, 1, 3, 7))
+    db.commit()
+
+    _assert_same_summary(summarize_readings(db, START, END), _raw_summary(db, START, END))
+
+
+def test_rebuild_matches_incremental_rollups(db, location):
+    simulate_sensor_data_for_location(db, location, datetime(2024, 1, 1), datetime(2024, 1, 3), cadence='hour', seed=2)
+    incremental = summarize_readings(db, START, END)
+
+    assert rebuild_rollups(db, batch_size=10) == db.query(SensorData).count()
+    _assert_same_summary(summarize_readings(db, START, END), incremental)
+
+
+def test_rollups_missing_detects_rollups_without_counts(db, readings_with_gaps):
+    assert not rollups_missing(db)
+
+    # Зведення, побудовані до появи стовпців <показник>_count
+    db.execute(update(daily_rollups).values(**{f"{field}_count": None for field in MEASUREMENT_FIELDS}))
+    db.commit()
+    assert rollups_missing(db)
+
+    rebuild_rollups(db)
+    assert not rollups_missing(db)
+    _assert_same_summary(summarize_readings(db, START, END), _raw_summary(db, START, END))
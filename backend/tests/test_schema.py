@@ -0,0 +1,86 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+import plan_check
+import schema
+from models import PollutionPrediction
+
+
+@pytest.fixture
+def bind(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    yield engine
+    engine.dispose()
+
+
+def _indexes(bind):
+    return {index["name"] for index in inspect(bind).get_indexes("sensor_readings")}
+
+
+def test_setup_schema_replaces_legacy_index_and_adds_columns(bind):
+    with bind.begin() as connection:
+        connection.execute(text("CREATE TABLE sensor_readings (id INTEGER PRIMARY KEY, location_id INTEGER, timestamp DATETIME)"))
+        connection.execute(text("CREATE INDEX ix_sensor_readings_location_id ON sensor_readings (location_id)"))
+
+    schema.setup_schema(bind)
+    schema.setup_schema(bind)
+
+    indexes = _indexes(bind)
+    assert "ix_sensor_readings_location_timestamp" in indexes
+    assert "ix_sensor_readings_location_id" not in indexes
+    columns = {column["name"] for column in inspect(bind).get_columns("sensor_readings")}
+    assert {"pm2_5", "air_quality_score", "air_quality_category"} <= columns
+
+
+def test_hot_queries_use_location_index_on_sqlite(bind, capsys):
+    schema.setup_schema(bind)
+    plan_check.simulate_sqlite_statistics(bind, rows=10_000_000, locations=100)
+
+    assert plan_check.check_plans(bind, locations=100)
+    output = capsys.readouterr().out
+    assert "FAIL" not in output
+    assert "ix_sensor_readings_location_timestamp" in output
+
+
+def test_uses_index():
+    location = [(True, "ix_sensor_readings_location_timestamp")]
+    partition = [(True, "sensor_readings_y2024m01_location_id_timestamp_idx")]
+
+    assert plan_check.uses_index(location, location_index=True)
+    assert plan_check.uses_index(partition, location_index=True)
+    assert plan_check.uses_index([(True, "ix_sensor_readings_timestamp")], location_index=False)
+    assert not plan_check.uses_index([(True, "ix_sensor_readings_timestamp")], location_index=True)
+    assert not plan_check.uses_index(location + [(False, "")], location_index=True)
+    assert not plan_check.uses_index([], location_index=False)
+
+
+def test_partition_names_and_months():
+    months = schema._month_starts(datetime(2023, 11, 15), datetime(2024, 2, 1))
+
+    assert [schema.partition_name(month) for month in months] == [
+        "sensor_readings_y2023m11", "sensor_readings_y2023m12", "sensor_readings_y2024m01", "sensor_readings_y2024m02",
+    ]
+    assert schema._partition_month("sensor_readings_y2024m02") == datetime(2024, 2, 1)
+    assert schema._partition_month("sensor_readings_default") is None
+    assert schema._add_months(datetime(2024, 11, 20), 3) == datetime(2025, 2, 1)
+
+
+def test_partitioning_is_postgresql_only(bind, monkeypatch):
+    monkeypatch.setattr(schema, "SENSOR_PARTITIONING", "monthly")
+    schema.setup_schema(bind)
+
+    assert not schema.partitioning_enabled(bind)
+    assert schema.ensure_partitions(bind, datetime(2024, 1, 1), datetime(2024, 6, 1)) == []
+    with pytest.raises(ValueError):
+        schema.detach_partitions(bind, datetime(2024, 1, 1))
+
+    # Зовнішній ключ прогнозів на розбиту таблицю не створюється
+    ddl = str(CreateTable(PollutionPrediction.__table__).compile(dialect=postgresql.dialect()))
+    assert "REFERENCES sensor_readings" not in ddl
+    monkeypatch.setattr(schema, "SENSOR_PARTITIONING", "none")
+    ddl = str(CreateTable(PollutionPrediction.__table__).compile(dialect=postgresql.dialect()))
+    assert "REFERENCES sensor_readings" in ddl
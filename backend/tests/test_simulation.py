@@ -0,0 +1,74 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from fuzzy_logic import UNAVAILABLE_DESCRIPTION
+from models import SensorData
+from services import (
+    MEASUREMENT_RANGES,
+    EnvironmentalDataGenerator,
+    simulate_sensor_data_for_location,
+)
+
+
+@pytest.mark.parametrize("cadence, count", [("minute", 61), ("hour", 25), ("day", 2)])
+def test_generator_cadence_includes_end_date(cadence, count):
+    columns = EnvironmentalDataGenerator.generate_sensor_data_for_period(
+        1, datetime(2024, 1, 1), datetime(2024, 1, 2) if cadence != "minute" else datetime(2024, 1, 1, 1), cadence
+    )
+
+    assert len(columns["timestamp"]) == count
+    assert columns["timestamp"][0] == np.datetime64("2024-01-01T00:00")
+    assert all(len(values) == count for values in columns.values())
+
+
+def test_generator_is_reproducible_and_within_ranges():
+    generate = EnvironmentalDataGenerator.generate_sensor_data_for_period
+    first = generate(1, datetime(2024, 1, 1), datetime(2024, 2, 1), "hour", seed=7)
+    second = generate(1, datetime(2024, 1, 1), datetime(2024, 2, 1), "hour", seed=7)
+
+    for field, (low, high, digits) in MEASUREMENT_RANGES.items():
+        np.testing.assert_array_equal(first[field], second[field])
+        assert low <= first[field].min() and first[field].max() <= high
+        np.testing.assert_array_equal(first[field], np.round(first[field], digits))
+
+
+def test_diurnal_profile_peaks_in_rush_hour():
+    columns = EnvironmentalDataGenerator.generate_sensor_data_for_period(
+        1, datetime(2024, 1, 1), datetime(2024, 3, 1), "hour", seed=1, diurnal=True
+    )
+    hours = columns["timestamp"].astype("datetime64[h]").astype(np.int64) % 24
+
+    assert columns["pm2_5"][hours == 8].mean() > columns["pm2_5"][hours == 14].mean()
+    assert columns["ozone"][hours == 15].mean() > columns["ozone"][hours == 3].mean()
+
+
+def test_unknown_cadence():
+    with pytest.raises(ValueError):
+        EnvironmentalDataGenerator.generate_sensor_data_for_period(1, datetime(2024, 1, 1), datetime(2024, 1, 2), "week")
+
+
+def test_simulation_bulk_inserts_scored_readings(db, location):
+    total = simulate_sensor_data_for_location(
+        db, location, datetime(2024, 1, 1), datetime(2024, 1, 3), cadence="hour", seed=3, chunk_size=10
+    )
+
+    assert total == db.query(SensorData).count() == 49
+    # Оцінка збережена для кожного вимірювання, де спрацювало хоча б одне правило
+    scored = db.query(SensorData).filter(SensorData.air_quality_score.isnot(None)).count()
+    unavailable = db.query(SensorData).filter(SensorData.air_quality_category == UNAVAILABLE_DESCRIPTION).count()
+    assert scored > 0 and scored + unavailable == total
+    assert {sensor_id for (sensor_id,) in db.query(SensorData.sensor_id).distinct()} == {f"sensor_{location}"}
+
+
+def test_endpoint_replaces_previous_data(client, db, location):
+    params = {
+        "location_id": location, "start_date": "2024-01-01T00:00:00", "end_date": "2024-01-02T00:00:00",
+        "cadence": "hour", "seed": 1,
+    }
+
+    assert client.post("/api/simulate-data/", params=params).json()["generated_records"] == 25
+    assert client.post("/api/simulate-data/", params=params).json()["generated_records"] == 25
+    assert db.query(SensorData).count() == 25
+    assert client.post("/api/simulate-data/", params={**params, "location_id": location + 1000}).status_code == 400
@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+import streaming
+from models import SensorData
+from services import store_sensor_readings
+
+PERIOD = {"start_date": "2024-01-01T00:00:00", "end_date": "2024-01-02T00:00:00"}
+
+
+def _store(db, location, make_reading, count=7):
+    store_sensor_readings(db, [
+        make_reading(location, datetime(2024, 1, 1) + timedelta(hours=hour), pm2_5=float(hour))
+        for hour in range(count)
+    ])
+
+
+def test_ndjson_stream(client, db, location, make_reading):
+    _store(db, location, make_reading)
+
+    response = client.get("/api/sensor-data/", params={**PERIOD, "format": "ndjson"})
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert 'filename="sensor_data.ndjson"' in response.headers["content-disposition"]
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["pm2_5"] for row in rows] == [float(hour) for hour in range(7)]
+    assert rows[0]["location_name"] == "Київ"
+    assert rows[0]["timestamp"] == "2024-01-01T00:00:00"
+
+
+def test_csv_stream_for_location(client, db, location, make_reading):
+    _store(db, location, make_reading)
+
+    response = client.get(f"/api/sensor-data/location/{location}", params={**PERIOD, "format": "csv"})
+
+    assert response.headers["content-type"].startswith("text/csv")
+    header, *rows = list(csv.reader(io.StringIO(response.text)))
+    assert header == [column.name for column in SensorData.__table__.columns]
+    assert len(rows) == 7
+    assert rows[1][header.index("timestamp")] == "2024-01-01 01:00:00"
+
+
+def test_stream_is_encoded_in_batches(db, location, make_reading, monkeypatch):
+    _store(db, location, make_reading)
+    monkeypatch.setattr(streaming, "STREAM_BATCH_SIZE", 3)
+
+    chunks = list(streaming.iter_encoded_rows(
+        select(SensorData.id, SensorData.pm2_5).order_by(SensorData.timestamp), "ndjson"
+    ))
+
+    assert [chunk.count(b"\n") for chunk in chunks] == [3, 3, 1]
+
+
+def test_empty_csv_stream_has_only_header(client):
+    response = client.get("/api/sensor-data/", params={**PERIOD, "format": "csv"})
+
+    assert response.text.strip().split(",")[-1] == "location_name"
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from models import Location
+from services import store_sensor_readings
+from summary import PERCENTILES, STATISTICS, SUMMARY_FIELDS, summarize_measurements
+
+PERIOD = {"start_date": "2024-01-01T00:00:00", "end_date": "2024-01-02T00:00:00"}
+
+
+@pytest.fixture
+def two_locations(db, make_reading):
+    first, second = Location(name="A"), Location(name="B")
+    db.add_all([first, second])
+    db.commit()
+    rng = np.random.default_rng(0)
+    values = rng.uniform(0, 100, 40)
+    store_sensor_readings(db, [
+        make_reading(first.id, datetime(2024, 1, 1) + timedelta(minutes=30 * i),
+                     pm2_5=float(value), ozone=None if i % 4 == 0 else float(i))
+        for i, value in enumerate(values)
+    ] + [make_reading(second.id, datetime(2024, 1, 1, 5), pm2_5=1.0)])
+    return first.id, second.id, values
+
+
+def test_statistics_match_numpy(db, two_locations):
+    first, second, values = two_locations
+
+    summary = summarize_measurements(db, datetime(2024, 1, 1), datetime(2024, 1, 2))
+
+    pm2_5 = summary[first]["fields"]["pm2_5"]
+    assert summary[first]["count"] == 40
+    assert pm2_5["count"] == 40
+    assert pm2_5["mean"] == pytest.approx(values.mean())
+    assert pm2_5["stddev"] == pytest.approx(values.std(ddof=1))
+    assert (pm2_5["min"], pm2_5["max"]) == (values.min(), values.max())
+    for percentile in PERCENTILES:
+        assert pm2_5[f"p{percentile}"] == pytest.approx(np.percentile(values, percentile))
+
+    # NULL не враховуються; одне значення - без стандартного відхилення
+    assert summary[first]["fields"]["ozone"]["count"] == 30
+    assert summary[second]["fields"]["pm2_5"]["stddev"] is None
+    assert set(summary[first]["fields"]) == set(SUMMARY_FIELDS)
+    assert set(pm2_5) == set(STATISTICS)
+
+
+def test_endpoint_filters_fields_and_locations(client, two_locations):
+    first, second, _ = two_locations
+
+    body = client.get(
+        "/api/locations/pollution-summary-extended/",
+        params={**PERIOD, "location_ids": [second], "fields": ["pm2_5", "air_quality_score"]},
+    ).json()
+
+    assert [item["location_id"] for item in body] == [second]
+    assert body[0]["location_name"] == "B"
+    assert set(body[0]["statistics"]) == {"pm2_5", "air_quality_score"}
+
+    response = client.get("/api/locations/pollution-summary-extended/", params={**PERIOD, "fields": ["невідоме"]})
+    assert response.status_code == 400
+
+
+def test_postgresql_summary_is_a_single_grouped_query():
+    statements = []
+
+    class Recorder:
+        bind = SimpleNamespace(dialect=postgresql.dialect())
+
+        def execute(self, statement):
+            statements.append(str(statement.compile(dialect=postgresql.dialect())))
+            return SimpleNamespace(all=lambda: [])
+
+    assert summarize_measurements(Recorder(), datetime(2024, 1, 1), datetime(2024, 1, 2), ["pm2_5", "ozone"]) == {}
+    assert len(statements) == 1
+    assert statements[0].count("percentile_cont(") == 2
+    assert "GROUP BY sensor_readings.location_id" in statements[0]
@@ -0,0 +1,27 @@
+import json
+import sys
+from datetime import datetime
+
+import training
+from services import simulate_sensor_data_for_location
+
+
+def _simulate(db, location_id: int):
+    simulate_sensor_data_for_location(
+        db, location_id, datetime(2024, 1, 1), datetime(2024, 1, 5), cadence='hour', seed=1
+    )
+
+
+def test_cli_trains_and_registers_into_new_registry(db, location, tmp_path, monkeypatch, capsys):
+    _simulate(db, location)
+    directory = tmp_path / "registry"
+    monkeypatch.setattr(training, "MODEL_REGISTRY_DIR", str(directory))
+    monkeypatch.setattr(sys, "argv", ["training", "--target", "pm2_5_next_hour", "--n-estimators", "5", "--n-jobs", "1"])
+
+    training.main()
+
+    manifest = json.loads((directory / "registry.json").read_text())
+    assert manifest["active"] == "v1"
+    assert manifest["versions"]["v1"]["target"] == "pm2_5_next_hour"
+    assert manifest["versions"]["v1"]["samples"] > 0
+    assert "Готово. Версія v1" in capsys.readouterr().out
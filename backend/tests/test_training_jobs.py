@@ -0,0 +1,139 @@
+import io
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import api
+import training
+from ai_model import ModelRegistry, PollutionPredictionModel
+from training import FINISHED_STATUSES, TrainingJob, TrainingJobManager
+
+
+def _csv(rows: int = 60, target: str = "Target") -> bytes:
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame(rng.random((rows, 3)), columns=["a", "b", "c"])
+    frame[target] = frame.sum(axis=1)
+    return frame.to_csv(index=False).encode()
+
+
+def _wait(job: TrainingJob, timeout: float = 30.0) -> TrainingJob:
+    deadline = time.monotonic() + timeout
+    while job.status not in FINISHED_STATUSES:
+        assert time.monotonic() < deadline, job.as_dict()
+        time.sleep(0.01)
+    return job
+
+
+@pytest.fixture
+def manager(tmp_path):
+    jobs = TrainingJobManager(ModelRegistry(str(tmp_path / "registry")))
+    yield jobs
+    jobs.shutdown()
+
+
+def test_fit_in_steps_matches_single_fit():
+    rng = np.random.default_rng(1)
+    X, y = rng.random((80, 4)), rng.random(80)
+    reported = []
+
+    stepped = PollutionPredictionModel(n_estimators=25)
+    stepped.fit(X, y, progress=reported.append, trees_per_step=10)
+    single = PollutionPredictionModel(n_estimators=25)
+    single.fit(X, y)
+
+    assert reported == [0.4, 0.8, 1.0]
+    assert len(stepped.model.estimators_) == 25
+    assert not stepped.model.warm_start
+    np.testing.assert_allclose(stepped.predict(X), single.predict(X))
+
+
+def test_csv_job_registers_model_and_removes_copy(manager, monkeypatch):
+    copies = []
+    named_temporary_file = training.tempfile.NamedTemporaryFile
+
+    def recording(*args, **kwargs):
+        copy = named_temporary_file(*args, **kwargs)
+        copies.append(copy.name)
+        return copy
+
+    monkeypatch.setattr(training.tempfile, "NamedTemporaryFile", recording)
+
+    job = _wait(manager.submit(io.BytesIO(_csv()), n_estimators=20, n_jobs=1))
+
+    assert job.status == "succeeded", job.error
+    assert job.progress == 1.0
+    assert job.result["name"] == "v1" and job.result["features"] == ["a", "b", "c"]
+    assert manager.registry.active()[1]["name"] == "v1"
+    assert not os.path.exists(copies[0])
+
+
+def test_failed_job_reports_error(manager):
+    job = _wait(manager.submit(io.BytesIO(_csv(target="Інша")), n_estimators=5))
+
+    assert job.status == "failed"
+    assert "Target" in job.error
+    assert job.finished_at is not None
+
+
+def test_cancel_running_and_queued_jobs(manager):
+    started, release = threading.Event(), threading.Event()
+    steps = []
+
+    def train(progress):
+        started.set()
+        release.wait(10)
+        for step in range(1, 5):
+            steps.append(step)
+            progress(step / 4, "Крок")
+        raise AssertionError("скасування мало перервати навчання")
+
+    running = manager._enqueue(TrainingJob({"type": "test"}), train)
+    queued = manager._enqueue(TrainingJob({"type": "test"}), train)
+    assert started.wait(10)
+
+    assert manager.cancel(queued.id).stage == "Скасування"
+    assert manager.cancel(running.id) is running
+    release.set()
+
+    assert _wait(running).status == "cancelled"
+    assert _wait(queued).status == "cancelled"
+    # Навчання зупиняється на першому звіті про прогрес; завдання з черги не починається
+    assert steps == [1]
+    assert running.stage == "Скасовано" and queued.started_at is None
+    assert manager.cancel("невідоме") is None
+
+
+def test_finished_jobs_are_pruned(manager, monkeypatch):
+    monkeypatch.setattr(training, "MAX_FINISHED_JOBS", 2)
+    jobs = [_wait(manager._enqueue(TrainingJob({"type": "test"}), lambda progress: 1 / 0)) for _ in range(4)]
+    manager._enqueue(TrainingJob({"type": "test"}), lambda progress: 1 / 0)
+
+    assert [job.id for job in jobs[2:]] == [job.id for job in manager.list()[:2]]
+
+
+def test_job_endpoints(client):
+    response = client.post("/api/train-model/", files={"file": ("data.csv", b"a,b\n1,2\n", "text/csv")})
+    assert response.status_code == 400
+
+    assert client.get("/api/train-model/jobs/невідоме").status_code == 404
+    assert client.post("/api/train-model/jobs/невідоме/cancel").status_code == 404
+    assert client.post("/api/train-model/from-readings", json={"target": "ozone"}).status_code == 400
+
+
+def test_background_training_uses_one_core_by_default(client, manager, monkeypatch):
+    # Моделі реєструються у тимчасовому реєстрі, а не в реєстрі додатку
+    monkeypatch.setattr(api, "training_jobs", manager)
+    response = client.post("/api/train-model/", files={"file": ("data.csv", _csv(), "text/csv")}, params={"n_estimators": 5})
+
+    assert response.status_code == 202
+    assert response.json()["source"]["n_jobs"] == 1
+    _wait(manager.get(response.json()["job_id"]))
+
+    explicit = client.post("/api/train-model/", files={"file": ("data.csv", _csv(), "text/csv")},
+                           params={"n_estimators": 5, "n_jobs": -1}).json()
+    assert explicit["source"]["n_jobs"] == -1
+    _wait(manager.get(explicit["job_id"]))
@@ -0,0 +1,94 @@
+import logging
+
+import pytest
+
+import api
+import warmup
+from ai_model import ModelRegistry
+from import_budget import IMPORT_TIME_BUDGET_MS, loaded_lazy_modules, measure_import
+
+
+class BrokenRegistry:
+    loaded = False
+
+    def warm_up(self):
+        raise RuntimeError("реєстр недоступний")
+
+
+def test_failed_step_is_logged_and_reported(caplog, monkeypatch):
+    monkeypatch.setattr(warmup, "WARMUP_IMPORTS", ())
+    caplog.set_level(logging.ERROR, logger="warmup")
+
+    warmup.warm_up(BrokenRegistry())
+
+    record = caplog.records[-1]
+    assert record.getMessage() == "Помилка прогріву (model)"
+    assert record.exc_info[0] is RuntimeError
+    state = warmup.readiness(BrokenRegistry())
+    assert state["warm_up"]["errors"] == {"model": "реєстр недоступний"}
+    assert not state["ready"]
+
+
+class FakeSubsystem:
+    loaded = False
+
+    def __init__(self):
+        self.calls = 0
+
+    def warm_up(self):
+        self.calls += 1
+        self.loaded = True
+
+
+@pytest.fixture
+def fuzzy(monkeypatch):
+    monkeypatch.setattr(warmup, "WARMUP_IMPORTS", ())
+    subsystem = FakeSubsystem()
+    monkeypatch.setattr(warmup, "fuzzy_system", subsystem)
+    return subsystem
+
+
+def test_warm_up_modes(fuzzy):
+    registry = FakeSubsystem()
+
+    assert warmup.start_warm_up(registry, "off") is None
+    assert (fuzzy.calls, registry.calls) == (0, 0)
+
+    assert warmup.start_warm_up(registry, "blocking") is None
+    assert (fuzzy.calls, registry.calls) == (1, 1)
+
+    thread = warmup.start_warm_up(registry, "background")
+    thread.join(10)
+    assert (fuzzy.calls, registry.calls) == (2, 2)
+    assert warmup.readiness(registry)["ready"]
+
+    with pytest.raises(ValueError):
+        warmup.start_warm_up(registry, "later")
+
+
+def test_ready_endpoint(client, fuzzy, monkeypatch):
+    registry = FakeSubsystem()
+    monkeypatch.setattr(api, "model_registry", registry)
+
+    response = client.get("/api/ready")
+    assert response.status_code == 503
+    assert response.json()["components"] == {"fuzzy": False, "model": False}
+
+    warmup.warm_up(registry)
+    assert client.get("/api/ready").status_code == 200
+
+
+def test_registry_is_loaded_on_warm_up(tmp_path):
+    registry = ModelRegistry(str(tmp_path / "registry"))
+
+    assert not registry.loaded
+    assert registry.warm_up() is None
+    assert registry.loaded
+
+
+def test_app_import_defers_heavy_libraries():
+    # Як і import_budget.main: найкраще з кількох вимірювань, щоб не залежати від шуму
+    total, modules = min((measure_import("main") for _ in range(3)), key=lambda run: run[0])
+
+    assert loaded_lazy_modules(modules) == []
+    assert total <= IMPORT_TIME_BUDGET_MS, f"Імпорт main: {total:.0f} мс > {IMPORT_TIME_BUDGET_MS} мс"